@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Armor extractor: writes the ItemDefinitions_*.csv summaries of this folder.
+Replaces the parse_*.ps1 scripts, which each reloaded
+ItemListDefinitions_ArmorItems and Loc_TLS and filtered levels inside nested
+loops. Here the Base/Special tag index and the item name map are built once,
+each item file is streamed with iterparse (levels indexed by Id per item), and
+all five CSVs are written in one run with the same columns as before.
+
+Usage (from the script directory):
+  python extract_armor_info.py [Helmets Pants ...] [--source ../../base_files]
+                               [--loc ../../base_files/Loc_TLS] [--output .]
+"""
+
+import csv
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+SOURCE_DIR = '../../base_files'
+LOC_FILE = 'Loc_TLS'
+ITEM_LIST_FILE = 'ItemListDefinitions_ArmorItems'
+ARMOR_FILES = ['Helmets', 'BodyArmors', 'Pants', 'Shields', 'Trinkets']
+LEVELS = [str(i) for i in range(6)]
+BOM = b'\xef\xbb\xbf'
+
+
+def open_definition_file(path):
+    """Open a definition file in binary mode, positioned after any (repeated) BOM"""
+    f = open(path, 'rb')
+    offset = 0
+    while f.read(len(BOM)) == BOM:
+        offset += len(BOM)
+    f.seek(offset)
+    return f
+
+
+def load_item_tags(path):
+    """Return {item_id: 'Base' | 'Special'} from the ...Base / ...Special item lists"""
+    tags = {}
+    with open_definition_file(path) as f:
+        root = ET.parse(f).getroot()
+    for item_list in root.iter('ItemsListDefinition'):
+        list_id = item_list.get('Id', '')
+        if list_id.endswith('Base'):
+            tag = 'Base'
+        elif list_id.endswith('Special'):
+            tag = 'Special'
+        else:
+            continue
+        for item in item_list.findall('Item'):
+            tags[item.get('Id')] = tag
+    return tags
+
+
+def load_item_names(path):
+    """Return {item_id: English name} from the ItemName_* rows of Loc_TLS"""
+    names = {}
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) > 1 and row[0].startswith('ItemName_'):
+                names[row[0][len('ItemName_'):]] = row[1]
+    return names
+
+
+def iter_items(path):
+    """Stream the ItemDefinition elements of a file, freeing each one after use"""
+    with open_definition_file(path) as f:
+        for _, element in ET.iterparse(f):
+            if element.tag == 'ItemDefinition':
+                yield element
+                element.clear()
+
+
+def summarize_item(item, tags, names):
+    """Return (fixed columns, [(attribute name, values)], base prices) for one item"""
+    levels = {}
+    for level in item.iter('Level'):
+        levels.setdefault(level.get('Id'), level)
+    present = [levels[i] for i in LEVELS if i in levels]
+
+    skill = levels['0'].findtext('Skills/Skill', '') if '0' in levels else ''
+    main_name = ''
+    main_values = []
+    for level in present:
+        bonus = level.find('MainStatBonus')
+        if not main_name and bonus is not None:
+            main_name = bonus.get('Stat', '')
+        main_values.append(bonus.text if bonus is not None else '')
+
+    # Attribute k is the k-th BaseStatBonus of each level, named after the first level that has one
+    per_level = [level.findall('BaseStatBonuses/BaseStatBonus') for level in present]
+    attributes = []
+    for k in range(max((len(bonuses) for bonuses in per_level), default=0)):
+        name = next((bonuses[k].get('Stat', '') for bonuses in per_level if k < len(bonuses)), '')
+        values = [bonuses[k].text for bonuses in per_level if k < len(bonuses) and bonuses[k].text]
+        attributes.append((name, '/'.join(values)) if name and values else ('', ''))
+
+    fixed = {
+        'Tag': tags.get(item.get('Id'), ''),
+        'Name': names.get(item.get('Id'), ''),
+        'Level0Skill': skill,
+        'MainStatBonus_Name': main_name,
+        'MainStatBonusLevels0-5': '/'.join(main_values),
+    }
+    prices = '/'.join(level.findtext('BasePrice', '') for level in present)
+    return fixed, attributes, prices
+
+
+def extract_file(path, tags, names):
+    """Return (header, rows) for one ItemDefinitions_* file"""
+    items = [summarize_item(item, tags, names) for item in iter_items(path)]
+    width = max((len(attributes) for _, attributes, _ in items), default=0)
+
+    header = ['Tag', 'Name', 'Level0Skill', 'MainStatBonus_Name', 'MainStatBonusLevels0-5']
+    for k in range(1, width + 1):
+        header += [f'Attribute{k}_Name', f'Attribute{k}_Values']
+    header.append('BasePrice')
+
+    rows = []
+    for fixed, attributes, prices in items:
+        row = [fixed[column] for column in header[:5]]
+        for k in range(width):
+            row.extend(attributes[k] if k < len(attributes) else ('', ''))
+        row.append(prices)
+        rows.append(row)
+    return header, rows
+
+
+def write_csv(path, header, rows):
+    # Same layout as PowerShell's Export-Csv: every field quoted
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def main(argv):
+    source_dir = SOURCE_DIR
+    loc_path = None
+    output_dir = '.'
+    selected = []
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--source':
+            source_dir = next(args)
+        elif arg == '--loc':
+            loc_path = next(args)
+        elif arg == '--output':
+            output_dir = next(args)
+        else:
+            selected.append(arg)
+    loc_path = loc_path or os.path.join(source_dir, LOC_FILE)
+
+    print("=" * 80)
+    print(f"ARMOR EXTRACTION from {source_dir}")
+    print("=" * 80)
+
+    tags = load_item_tags(os.path.join(source_dir, ITEM_LIST_FILE))
+    if os.path.exists(loc_path):
+        names = load_item_names(loc_path)
+    else:
+        print(f"⚠ {loc_path} not found, Name column left empty (use --loc)")
+        names = {}
+    print(f"✓ {len(tags)} tagged items, {len(names)} item names\n")
+
+    exit_code = 0
+    for category in selected or ARMOR_FILES:
+        name = f'ItemDefinitions_{category}'
+        path = os.path.join(source_dir, name)
+        if not os.path.exists(path):
+            print(f"⚠ {path} not found")
+            exit_code = 1
+            continue
+        header, rows = extract_file(path, tags, names)
+        output = os.path.join(output_dir, f'{name}.csv')
+        write_csv(output, header, rows)
+        print(f"✓ {output}: {len(rows)} items, {(len(header) - 6) // 2} attribute columns")
+    return exit_code
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
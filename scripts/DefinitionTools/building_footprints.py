@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tile-footprint bitmasks for the BuildingDefinitions blueprints.
+Every Blueprint/Tiles grid (e.g. the 3x3 "BBB" MagicCircle) is compiled once
+into a packed bitmask: one bit per tile, row after row, set for every tile
+but '_' (B building, H gate passage, E...). Ragged rows are padded with '_'.
+The footprints are indexed by GroundCategory, blueprint Category, size and
+distinct shape.
+
+A map is a bitboard of the same layout (one Python int, row stride = map
+width, bit x + y * width), so placing a building is one shift of its mask,
+and the ground and overlap checks are one AND each. The building's origin
+(Tiles OriginX/OriginY) is the tile given as its position; rows go down
+with y. Every position a building fits at is found by AND-ing the free
+bitboard shifted by each of its tiles.
+
+A layout is a JSON file: {"ground": ["OOCC...", ...], "buildings": [["Id", x, y], ...]}
+with C (City) / O (Outside) per tile, anything else meaning no ground.
+Buildings without GroundCategories may stand on any tile.
+
+Usage (from the script directory):
+  python building_footprints.py                    # index summary
+  python building_footprints.py --show MagicCircle,GateHorizontal
+  python building_footprints.py LAYOUT.json ... [--fits MagicCircle,Wall]
+"""
+
+import json
+import os
+import sys
+import time
+
+from definition_scan import BASE_DIR, MODDED_DIR, load_root, resolve_definition_files
+
+BUILDING_FILE = 'BuildingDefinitions'
+EMPTY_TILE = '_'
+GROUND_CODES = {'C': 'City', 'O': 'Outside'}
+
+
+class Footprint:
+    """Packed tile bitmask of one blueprint: bit x + y * width for every occupied tile"""
+
+    def __init__(self, building_id, rows, origin, category=None, ground=()):
+        self.id = building_id
+        self.width = max((len(row) for row in rows), default=0)
+        self.height = len(rows)
+        self.rows = [row.ljust(self.width, EMPTY_TILE) for row in rows]
+        self.origin = origin
+        self.category = category
+        self.ground = tuple(ground)
+        self.row_masks = [sum(1 << x for x, tile in enumerate(row) if tile != EMPTY_TILE) for row in self.rows]
+        self._strides = {}
+        self.mask = self.at_stride(self.width)
+        self.tiles = bin(self.mask).count('1')
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def shape(self):
+        """Hashable shape key: buildings with the same tiles and origin share it"""
+        return self.width, self.height, self.mask, self.origin
+
+    def at_stride(self, stride):
+        """The mask laid out on rows of stride bits (top-left tile at bit 0)"""
+        mask = self._strides.get(stride)
+        if mask is None:
+            mask = 0
+            for y, row_mask in enumerate(self.row_masks):
+                mask |= row_mask << (y * stride)
+            self._strides[stride] = mask
+        return mask
+
+    def offsets(self):
+        """(x, y) of every occupied tile, relative to the top-left tile"""
+        return [(x, y) for y, row_mask in enumerate(self.row_masks)
+                for x in range(self.width) if row_mask >> x & 1]
+
+
+def load_footprints(files):
+    """{building Id: Footprint} of every building with a Blueprint/Tiles grid"""
+    footprints = {}
+    for definition in load_root(files[BUILDING_FILE]).iter('BuildingDefinition'):
+        tiles = definition.find('Blueprint/Tiles')
+        if tiles is None:
+            continue
+        rows = [row.strip() for row in (tiles.text or '').splitlines() if row.strip()]
+        origin = (int(tiles.get('OriginX', 0)), int(tiles.get('OriginY', 0)))
+        ground = [category.text.strip() for category in definition.iterfind('Construction/GroundCategories/GroundCategory')]
+        footprints[definition.get('Id')] = Footprint(
+            definition.get('Id'), rows, origin, definition.findtext('Blueprint/Category'), ground)
+    return footprints
+
+
+class FootprintIndex:
+    """Building Ids by GroundCategory, blueprint Category, size and shape"""
+
+    def __init__(self, footprints):
+        self.footprints = footprints
+        self.by_ground = {}
+        self.by_category = {}
+        self.by_size = {}
+        self.by_shape = {}
+        for building_id, footprint in footprints.items():
+            for ground in footprint.ground or ('Any',):
+                self.by_ground.setdefault(ground, []).append(building_id)
+            self.by_category.setdefault(footprint.category or 'None', []).append(building_id)
+            self.by_size.setdefault(footprint.size, []).append(building_id)
+            self.by_shape.setdefault(footprint.shape, []).append(building_id)
+
+
+class LayoutGrid:
+    """Bitboards of a map: one per ground category, plus the tiles taken by buildings"""
+
+    def __init__(self, ground_rows):
+        self.height = len(ground_rows)
+        self.width = max((len(row) for row in ground_rows), default=0)
+        self.ground = {category: 0 for category in GROUND_CODES.values()}
+        for y, row in enumerate(ground_rows):
+            for x, code in enumerate(row):
+                if code in GROUND_CODES:
+                    self.ground[GROUND_CODES[code]] |= 1 << (x + y * self.width)
+        self.any_ground = (1 << (self.width * self.height)) - 1
+        self.occupied = 0
+        self.placed = []  # (building Id, x, y, mask)
+
+    def allowed(self, footprint):
+        """Bitboard of the tiles footprint may stand on"""
+        if not footprint.ground:
+            return self.any_ground
+        allowed = 0
+        for category in footprint.ground:
+            allowed |= self.ground.get(category, 0)
+        return allowed
+
+    def placement_mask(self, footprint, x, y):
+        """Bitboard of footprint with its origin on (x, y), or None when it leaves the map"""
+        left, top = x - footprint.origin[0], y - footprint.origin[1]
+        if left < 0 or top < 0 or left + footprint.width > self.width or top + footprint.height > self.height:
+            return None
+        return footprint.at_stride(self.width) << (left + top * self.width)
+
+    def place(self, footprint, x, y):
+        """Place footprint with its origin on (x, y); return its problems (placed only when there are none)"""
+        mask = self.placement_mask(footprint, x, y)
+        if mask is None:
+            return ["outside the map"]
+        problems = []
+        if mask & ~self.allowed(footprint):
+            problems.append(f"needs {' or '.join(footprint.ground)} ground on every tile")
+        if mask & self.occupied:
+            others = [f"{other} at ({ox}, {oy})" for other, ox, oy, other_mask in self.placed if mask & other_mask]
+            problems.append(f"overlaps {', '.join(others)}")
+        if not problems:
+            self.occupied |= mask
+            self.placed.append((footprint.id, x, y, mask))
+        return problems
+
+    def fits(self, footprint):
+        """Every origin (x, y) where footprint could be placed now"""
+        if footprint.width > self.width or footprint.height > self.height:
+            return []
+        free = self.allowed(footprint) & ~self.occupied & self.any_ground
+        # Top-left tiles that keep the footprint inside the map
+        row = (1 << (self.width - footprint.width + 1)) - 1
+        candidates = 0
+        for top in range(self.height - footprint.height + 1):
+            candidates |= row << (top * self.width)
+        # A top-left tile is valid when every tile of the footprint, shifted from it, is free
+        for dx, dy in footprint.offsets():
+            candidates &= free >> (dx + dy * self.width)
+        positions = []
+        while candidates:
+            bit = candidates & -candidates
+            index = bit.bit_length() - 1
+            positions.append((index % self.width + footprint.origin[0], index // self.width + footprint.origin[1]))
+            candidates ^= bit
+        return positions
+
+
+def draw_footprint(footprint):
+    """Tile rows with the origin tile as 'o' when it is empty, 'O' otherwise"""
+    lines = []
+    for y, row in enumerate(footprint.rows):
+        if y == footprint.origin[1]:
+            x = footprint.origin[0]
+            row = row[:x] + ('o' if row[x:x + 1] in ('', EMPTY_TILE) else 'O') + row[x + 1:]
+        lines.append(row)
+    return lines
+
+
+def validate_layout(path, footprints, fits=()):
+    """Place the buildings of a layout file in order; return (grid, problems, {Id: free positions})"""
+    with open(path, 'r', encoding='utf-8') as f:
+        layout = json.load(f)
+    grid = LayoutGrid(layout['ground'])
+    problems = []
+    for building_id, x, y in layout.get('buildings', []):
+        footprint = footprints.get(building_id)
+        if footprint is None:
+            problems.append(f"{building_id} at ({x}, {y}): unknown building")
+            continue
+        problems += [f"{building_id} at ({x}, {y}): {problem}" for problem in grid.place(footprint, x, y)]
+    free = {building_id: grid.fits(footprints[building_id]) for building_id in fits if building_id in footprints}
+    return grid, problems, free
+
+
+def main(argv):
+    layouts = []
+    shown = []
+    fits = []
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--show':
+            shown = next(args).split(',')
+        elif arg == '--fits':
+            fits = next(args).split(',')
+        else:
+            layouts.append(arg)
+
+    start = time.perf_counter()
+    footprints = load_footprints(resolve_definition_files(MODDED_DIR, BASE_DIR))
+    index = FootprintIndex(footprints)
+    elapsed = time.perf_counter() - start
+
+    print("=" * 80)
+    print(f"BUILDING FOOTPRINTS: {len(footprints)} blueprints, {len(index.by_shape)} distinct shapes "
+          f"({1000 * elapsed:.1f} ms)")
+    print("=" * 80)
+    exit_code = 0
+    for building_id in shown + fits:
+        if building_id not in footprints:
+            print(f"⚠ Unknown building {building_id}")
+            exit_code = 1
+
+    if not layouts:
+        print("\nBy size (width x height):")
+        for (width, height), ids in sorted(index.by_size.items()):
+            print(f"  {width}x{height}  {len(ids):4}  {', '.join(ids[:6])}{', ...' if len(ids) > 6 else ''}")
+        print("\nBy GroundCategory:")
+        for ground, ids in sorted(index.by_ground.items()):
+            print(f"  {ground:12} {len(ids):4}")
+        print("\nBy Category:")
+        for category, ids in sorted(index.by_category.items(), key=lambda entry: -len(entry[1])):
+            print(f"  {category:24} {len(ids):4}")
+
+    for building_id in shown:
+        footprint = footprints.get(building_id)
+        if footprint is None:
+            continue
+        print(f"\n{building_id}: {footprint.width}x{footprint.height}, {footprint.tiles} tiles, "
+              f"origin {footprint.origin}, mask {footprint.mask:#x}, "
+              f"ground {', '.join(footprint.ground) or 'any'}, category {footprint.category or '-'}")
+        for line in draw_footprint(footprint):
+            print(f"  {line}")
+
+    for path in layouts:
+        start = time.perf_counter()
+        grid, problems, free = validate_layout(path, footprints, fits)
+        elapsed = time.perf_counter() - start
+        print(f"\n{os.path.basename(path)}: {grid.width}x{grid.height}, {len(grid.placed)} buildings placed "
+              f"({1000 * elapsed:.1f} ms)")
+        for problem in problems:
+            print(f"  ⚠ {problem}")
+        if problems:
+            exit_code = 1
+        else:
+            print("  ✓ Every building fits")
+        for building_id, positions in free.items():
+            print(f"  {building_id} fits at {len(positions)} positions"
+                  + (f", e.g. {', '.join(map(str, positions[:5]))}" if positions else ''))
+    return exit_code
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent SQLite index of every definition Id across modded_files.
+Each indexed definition records its type (tag), Id, file, byte range, depth,
+enclosing definition and a content hash. Refreshing is incremental: files
+whose mtime and size are unchanged are skipped, files whose content hash is
+unchanged only get their mtime updated, and only really changed files are
+rescanned.
+
+Usage (from the script directory):
+  python definition_index.py [ID ...] [--type TAG] [--rebuild]
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+from definition_scan import MODDED_DIR, definition_hash, list_definition_files, scan_definitions
+
+INDEX_FILE = 'definitions_index.sqlite'
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    file TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    indexed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS definitions (
+    id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    file TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    parent_id TEXT,
+    sha1 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS definitions_id ON definitions (id);
+CREATE INDEX IF NOT EXISTS definitions_type ON definitions (type, id);
+CREATE INDEX IF NOT EXISTS definitions_file ON definitions (file);
+"""
+
+
+class DefinitionIndex:
+    """SQLite-backed Id -> (type, file, byte range) index of the definition files"""
+
+    def __init__(self, modded_dir=MODDED_DIR, index_path=INDEX_FILE):
+        self.modded_dir = modded_dir
+        self.index_path = index_path
+        self.conn = sqlite3.connect(index_path)
+        self.conn.row_factory = sqlite3.Row
+        self._check_schema()
+
+    def _check_schema(self):
+        """Create the tables, dropping an index written by another schema version"""
+        version = None
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            version = row[0] if row else None
+        except sqlite3.OperationalError:
+            pass
+        if version is not None and int(version) != SCHEMA_VERSION:
+            self.conn.executescript(
+                "DROP TABLE IF EXISTS definitions; DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS meta;")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM definitions")
+            self.conn.execute("DELETE FROM files")
+
+    def refresh(self):
+        """Bring the index up to date with modded_dir; return what was done per file"""
+        stats = {'scanned': [], 'touched': [], 'unchanged': 0, 'removed': [], 'definitions': 0}
+        known = {row['file']: row for row in self.conn.execute("SELECT * FROM files")}
+        names = list_definition_files(self.modded_dir)
+
+        with self.conn:
+            for name in names:
+                st = os.stat(os.path.join(self.modded_dir, name))
+                row = known.get(name)
+                if row and row['mtime_ns'] == st.st_mtime_ns and row['size'] == st.st_size:
+                    stats['unchanged'] += 1
+                    continue
+
+                with open(os.path.join(self.modded_dir, name), 'rb') as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()
+                if row and row['sha256'] == digest:
+                    # Touched but not modified
+                    self.conn.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE file = ?",
+                                      (st.st_mtime_ns, st.st_size, name))
+                    stats['touched'].append(name)
+                    continue
+
+                records = scan_definitions(data)
+                self.conn.execute("DELETE FROM definitions WHERE file = ?", (name,))
+                self.conn.executemany(
+                    "INSERT INTO definitions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(r['id'], r['type'], name, r['start'], r['end'], r['depth'], r['parent_id'],
+                      definition_hash(data, r)) for r in records])
+                self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                                  (name, st.st_mtime_ns, st.st_size, digest, time.strftime('%Y-%m-%dT%H:%M:%S')))
+                stats['scanned'].append(name)
+                stats['definitions'] += len(records)
+
+            for name in set(known) - set(names):
+                self.conn.execute("DELETE FROM definitions WHERE file = ?", (name,))
+                self.conn.execute("DELETE FROM files WHERE file = ?", (name,))
+                stats['removed'].append(name)
+        return stats
+
+    def lookup(self, definition_id, definition_type=None):
+        """Return every indexed definition with this Id (optionally of one type)"""
+        if definition_type:
+            cursor = self.conn.execute(
+                "SELECT * FROM definitions WHERE id = ? AND type = ? ORDER BY file, start",
+                (definition_id, definition_type))
+        else:
+            cursor = self.conn.execute(
+                "SELECT * FROM definitions WHERE id = ? ORDER BY file, start", (definition_id,))
+        return [dict(row) for row in cursor]
+
+    def ids_by_type(self, definition_type):
+        """Return {id: [rows]} for every definition of one type"""
+        result = {}
+        for row in self.conn.execute(
+                "SELECT * FROM definitions WHERE type = ? ORDER BY file, start", (definition_type,)):
+            result.setdefault(row['id'], []).append(dict(row))
+        return result
+
+    def counts(self):
+        """Return {type: count} over the whole index"""
+        return {row[0]: row[1] for row in self.conn.execute(
+            "SELECT type, COUNT(*) FROM definitions GROUP BY type ORDER BY type")}
+
+    def read_definition(self, row):
+        """Read the source bytes of one indexed definition straight from its file"""
+        with open(os.path.join(self.modded_dir, row['file']), 'rb') as f:
+            f.seek(row['start'])
+            return f.read(row['end'] - row['start'])
+
+
+def main(argv):
+    ids = []
+    definition_type = None
+    rebuild = False
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--type':
+            definition_type = next(args)
+        elif arg == '--rebuild':
+            rebuild = True
+        else:
+            ids.append(arg)
+
+    index = DefinitionIndex()
+    if rebuild:
+        index.clear()
+
+    start = time.perf_counter()
+    stats = index.refresh()
+    elapsed = time.perf_counter() - start
+    print(f"Index refreshed in {elapsed:.3f}s: {len(stats['scanned'])} files scanned "
+          f"({stats['definitions']} definitions), {len(stats['touched'])} touched, "
+          f"{stats['unchanged']} unchanged, {len(stats['removed'])} removed")
+
+    if not ids:
+        print("\nDefinitions by type:")
+        for tag, count in index.counts().items():
+            print(f"  {tag:40} {count:>6}")
+        index.close()
+        return 0
+
+    missing = 0
+    for definition_id in ids:
+        rows = index.lookup(definition_id, definition_type)
+        if not rows:
+            print(f"  ⚠ {definition_id}: not found")
+            missing += 1
+            continue
+        for row in rows:
+            parent = f" in {row['parent_id']}" if row['parent_id'] else ''
+            print(f"  ✓ {definition_id}: {row['type']} {row['file']} [{row['start']}:{row['end']}]{parent}")
+    index.close()
+    return 1 if missing else 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
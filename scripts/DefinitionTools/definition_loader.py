@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped lazy definition loader.
+Each definition file is memory-mapped on first use and scanned once
+(definition_scan.py) into an Id -> byte range table; a definition's subtree is
+parsed from its bytes only when it is first requested and kept in an LRU
+cache. Tools that need a few definitions no longer parse whole files, and
+memory is bounded by the cache size, not by the number of files opened.
+
+Usage (from the script directory):
+  python definition_loader.py ID [ID ...] [--type SkillDefinition]
+                              [--file SkillDefinitions_Enemies] [--repeat 1000]
+"""
+
+import mmap
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+from definition_scan import MODDED_DIR, list_definition_files, scan_definitions
+
+CACHE_SIZE = 512
+
+
+class MappedDefinitionFile:
+    """One memory-mapped definition file and its Id -> [(type, start, end)] table"""
+
+    def __init__(self, path):
+        self.path = path
+        self.data = b''
+        self._map = None
+        if os.path.getsize(path):
+            with open(path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = self._map
+        self.ranges = {}
+        for record in scan_definitions(self.data):
+            self.ranges.setdefault(record['id'], []).append((record['type'], record['start'], record['end']))
+
+    def find(self, definition_id, definition_type=None):
+        """(type, start, end) of the first definition with this Id (and type), else None"""
+        for entry in self.ranges.get(definition_id, ()):
+            if definition_type is None or entry[0] == definition_type:
+                return entry
+        return None
+
+    def source(self, start, end):
+        return self.data[start:end]
+
+    def parse(self, start, end):
+        """Parse one definition's bytes into an Element"""
+        fragment = self.data[start:end]
+        try:
+            return ET.fromstring(fragment)
+        except ET.ParseError:
+            # Prefixes declared on the root element: parse inside a wrapper that declares them
+            root_tag = re.search(rb'<[^?!][^>]*>', self.data).group(0)
+            declarations = b' '.join(re.findall(rb'xmlns:[\w.-]+\s*=\s*"[^"]*"', root_tag))
+            return ET.fromstring(b'<wrapper ' + declarations + b'>' + fragment + b'</wrapper>')[0]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self.data = b''
+
+
+class DefinitionLoader:
+    """Lazy Id -> Element access to every definition file of a directory
+
+    Returned elements are shared with the cache: treat them as read-only.
+    """
+
+    def __init__(self, modded_dir=MODDED_DIR, cache_size=CACHE_SIZE):
+        self.modded_dir = modded_dir
+        self.cache_size = cache_size
+        self.names = list_definition_files(modded_dir)
+        self.files = {}
+        self.where = None  # Id -> [file names], built on the first lookup without a file name
+        self.cache = OrderedDict()  # (name, start) -> Element, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def file(self, name):
+        """The MappedDefinitionFile for a file name, mapped and scanned on first use"""
+        mapped = self.files.get(name)
+        if mapped is None:
+            mapped = MappedDefinitionFile(os.path.join(self.modded_dir, name))
+            self.files[name] = mapped
+        return mapped
+
+    def locate(self, definition_id, definition_type=None, name=None):
+        """Return (file name, type, start, end) of a definition, or None
+
+        Without a file name every file is mapped and scanned (once per
+        loader) and the first file, by name, holding the Id is used.
+        """
+        if name is None and self.where is None:
+            self.where = {}
+            for candidate in self.names:
+                for definition in self.file(candidate).ranges:
+                    self.where.setdefault(definition, []).append(candidate)
+        for candidate in ([name] if name else self.where.get(definition_id, ())):
+            entry = self.file(candidate).find(definition_id, definition_type)
+            if entry is not None:
+                return (candidate,) + entry
+        return None
+
+    def get(self, definition_id, definition_type=None, name=None):
+        """Return the parsed definition element, or None if the Id is unknown"""
+        location = self.locate(definition_id, definition_type, name)
+        if location is None:
+            return None
+        name, _, start, end = location
+        key = (name, start)
+        element = self.cache.get(key)
+        if element is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return element
+
+        self.misses += 1
+        element = self.files[name].parse(start, end)
+        self.cache[key] = element
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return element
+
+    def source(self, definition_id, definition_type=None, name=None):
+        """Return the raw bytes of a definition, or None"""
+        location = self.locate(definition_id, definition_type, name)
+        if location is None:
+            return None
+        name, _, start, end = location
+        return self.files[name].source(start, end)
+
+    def ids(self, name):
+        """Every indexed Id of one file"""
+        return list(self.file(name).ranges)
+
+    def close(self):
+        for mapped in self.files.values():
+            mapped.close()
+        self.files = {}
+        self.where = None
+        self.cache.clear()
+
+
+def main(argv):
+    ids = []
+    definition_type = None
+    name = None
+    repeat = 1000
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--type':
+            definition_type = next(args)
+        elif arg == '--file':
+            name = next(args)
+        elif arg == '--repeat':
+            repeat = int(next(args))
+        else:
+            ids.append(arg)
+
+    if not ids:
+        print(__doc__)
+        return 1
+
+    exit_code = 0
+    with DefinitionLoader() as loader:
+        for definition_id in ids:
+            start = time.perf_counter()
+            location = loader.locate(definition_id, definition_type, name)
+            located = time.perf_counter()
+            element = loader.get(definition_id, definition_type, name)
+            parsed = time.perf_counter()
+            if element is None:
+                print(f"⚠ {definition_id} not found")
+                exit_code = 1
+                continue
+
+            for _ in range(repeat):
+                loader.get(definition_id, definition_type, name)
+            cached = (time.perf_counter() - parsed) / max(repeat, 1)
+
+            file_name, tag, begin, end = location
+            print(f"{definition_id} ({tag}) in {file_name} [{begin}:{end}], {len(element)} children")
+            print(f"  locate {1e6 * (located - start):.0f} µs (includes mapping and scanning files), "
+                  f"first parse {1e6 * (parsed - located):.0f} µs, cached lookup {1e6 * cached:.1f} µs")
+
+        print("-" * 80)
+        print(f"{len(loader.files)} of {len(loader.names)} files mapped, "
+              f"{len(loader.cache)} subtrees cached, {loader.hits} hits / {loader.misses} misses")
+    return exit_code
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
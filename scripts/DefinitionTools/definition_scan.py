@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fast byte-offset scan of definition files.
+Runs the expat parser over the raw bytes of a file and records, for every
+element whose tag ends in "Definition" and that carries an Id attribute, its
+byte range in the file. Commented-out definitions are ignored because expat
+never reports them as elements.
+"""
+
+import hashlib
+import os
+import re
+import xml.etree.ElementTree as ET
+import xml.parsers.expat
+
+MODDED_DIR = '../../modded_files'
+BASE_DIR = '../../base_files'
+
+BOM = b'\xef\xbb\xbf'
+
+# Start tag of an element; group 1 is '/' for self-closing elements
+_START_TAG = re.compile(rb'<[^\s/>]+(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*\s*(/?)>')
+
+
+def is_definition_tag(tag):
+    return tag.endswith('Definition')
+
+
+def bom_length(data):
+    """Length of the UTF-8 byte order marks at the start of data
+
+    Some base files start with the mark twice, which expat rejects.
+    """
+    length = 0
+    while data[length:length + len(BOM)] == BOM:
+        length += len(BOM)
+    return length
+
+
+def element_span(data, start, end_index):
+    """(start, start tag end, end, self-closing) byte offsets of the element whose start tag is at start
+
+    end_index is expat's CurrentByteIndex in the element's end handler (the
+    start of its end tag).
+    """
+    match = _START_TAG.match(data, start)
+    if match and match.group(1):
+        return start, match.end(), match.end(), True
+    return start, match.end() if match else None, data.find(b'>', end_index) + 1, False
+
+
+def scan_definitions(data, match=is_definition_tag):
+    """Return one record per matching element with an Id, in document order
+
+    data may be bytes or an mmap of the file.
+
+    Each record is a dict with type, id, start, end (byte offsets, end
+    exclusive), depth (root is 1) and parent_id (nearest enclosing indexed
+    definition, or None).
+    """
+    parser = xml.parsers.expat.ParserCreate()
+    skip = bom_length(data)
+    records = []
+    stack = []          # record or None per open element
+    parents = []        # open indexed records
+
+    def start(tag, attrs):
+        record = None
+        if 'Id' in attrs and match(tag):
+            record = {
+                'type': tag,
+                'id': attrs['Id'],
+                'start': parser.CurrentByteIndex + skip,
+                'end': None,
+                'depth': len(stack) + 1,
+                'parent_id': parents[-1]['id'] if parents else None,
+            }
+            records.append(record)
+            parents.append(record)
+        stack.append(record)
+
+    def end(tag):
+        record = stack.pop()
+        if record is None:
+            return
+        parents.pop()
+        record['end'] = element_span(data, record['start'], parser.CurrentByteIndex + skip)[2]
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    with memoryview(data) as view:
+        parser.Parse(view[skip:], True)
+    return records
+
+
+def load_root(path):
+    """Parse a definition file and return its root element (leading BOMs skipped)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return ET.fromstring(data[bom_length(data):])
+
+
+def definition_hash(data, record):
+    """Content hash of one definition's source bytes"""
+    return hashlib.sha1(data[record['start']:record['end']]).hexdigest()
+
+
+def list_definition_files(modded_dir=MODDED_DIR):
+    """Return the names of every definition file in modded_dir, sorted"""
+    return [
+        name for name in sorted(os.listdir(modded_dir))
+        if not name.startswith('.') and os.path.isfile(os.path.join(modded_dir, name))
+    ]
+
+
+def resolve_definition_files(modded_dir=MODDED_DIR, base_dir=BASE_DIR):
+    """Return {name: path} for the files the game sees: base files overlaid by modded ones
+
+    Pass base_dir=None to only look at modded_dir.
+    """
+    files = {}
+    if base_dir and os.path.isdir(base_dir):
+        for name in list_definition_files(base_dir):
+            files[name] = os.path.join(base_dir, name)
+    for name in list_definition_files(modded_dir):
+        files[name] = os.path.join(modded_dir, name)
+    return dict(sorted(files.items()))
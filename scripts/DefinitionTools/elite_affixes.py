@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Elite affix roll simulator driven by EnemyAffixDefinitions.
+The elite pool is every affix with an IsEliteAffix Weight that the active
+apocalypse flags allow (LockedByApocalypseFlag removes it, while
+UnlockedByApocalypseFlag requires it). Flags come from the AddAffixFlag
+effects of the ApocalypseModifierStepDefinitions up to --apocalypse, or
+from --flags.
+
+Each affix's TokenVariables are compiled with formula.py and evaluated as
+vectors over days 1..N, giving a per-day value for every StatModifier
+(Reinforced: on the elite itself, Aura: on its neighbours). Elites draw
+their affixes from a Walker alias table (O(1) per draw; an elite with
+several affixes redraws duplicates), and the per-day mean bonus of every
+stat is averaged over the sampled elites.
+
+Usage (from the script directory):
+  python elite_affixes.py [--apocalypse 3 | --flags SuperEliteAffixes]
+                          [--days 30] [--elites 100000] [--affixes 1] [--seed 0]
+                          [--show 1,5,10,20,30] [--output elite_affixes.json]
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+
+from definition_scan import BASE_DIR, MODDED_DIR, load_root, resolve_definition_files
+from formula import FormulaError, compile_formula
+
+RESULTS_FILE = 'elite_affixes.json'
+AFFIX_FILE = 'EnemyAffixDefinitions'
+APOCALYPSE_STEP_FILE = 'ApocalypseModifierStepDefinitions'
+
+# AffixEffect children whose StatModifiers apply to the elite / to its neighbours
+EFFECT_TARGETS = {'Reinforced': 'self', 'Aura': 'aura'}
+
+
+def load_affixes(files):
+    """Return [{id, weight, locked_by, unlocked_by, tokens, modifiers}] for the elite affixes
+
+    tokens: [(key, formula source)], modifiers: [(stat, target, value source)]
+    """
+    affixes = []
+    for definition in load_root(files[AFFIX_FILE]).findall('EnemyAffixDefinition'):
+        elite = definition.find('IsEliteAffix')
+        if elite is None or elite.get('Weight') is None:
+            continue
+        modifiers = []
+        for effect in definition.findall('AffixEffect/*'):
+            target = EFFECT_TARGETS.get(effect.tag)
+            if target:
+                modifiers += [(modifier.get('Id'), target, modifier.get('Value'))
+                              for modifier in effect.iter('StatModifier')]
+        affixes.append({
+            'id': definition.get('Id'),
+            'weight': float(elite.get('Weight')),
+            'locked_by': elite.get('LockedByApocalypseFlag'),
+            'unlocked_by': elite.get('UnlockedByApocalypseFlag'),
+            'tokens': [(token.get('Key'), token.get('Value')) for token in definition.iter('TokenVariable')],
+            'modifiers': modifiers,
+        })
+    return affixes
+
+
+def apocalypse_flags(files, level):
+    """Affix flags added by the apocalypse modifier steps of level <= level"""
+    flags = set()
+    if APOCALYPSE_STEP_FILE not in files:
+        return flags
+    for step in load_root(files[APOCALYPSE_STEP_FILE]).findall('ApocalypseModifierStepDefinition'):
+        if int(step.findtext('ApocalypseLevel') or 0) <= level:
+            flags.update(flag.get('Flag') for flag in step.iter('AddAffixFlag'))
+    return flags
+
+
+def affix_pool(affixes, flags):
+    """The affixes an elite can roll under a set of apocalypse flags"""
+    return [affix for affix in affixes
+            if affix['weight'] > 0
+            and affix['locked_by'] not in flags
+            and (affix['unlocked_by'] is None or affix['unlocked_by'] in flags)]
+
+
+def build_alias_table(weights):
+    """Walker/Vose alias table: (acceptance probability, alias index) per outcome"""
+    weights = np.asarray(weights, dtype=float)
+    n = len(weights)
+    scaled = weights * n / weights.sum()
+    prob = np.ones(n)
+    alias = np.arange(n)
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    return prob, alias
+
+
+def draw_alias(prob, alias, size, rng):
+    """Draw outcome indexes of the given shape: one uniform column and one coin per draw"""
+    column = rng.integers(len(prob), size=size)
+    return np.where(rng.random(size) < prob[column], column, alias[column])
+
+
+def draw_affixes(prob, alias, elites, count, rng):
+    """(elites, count) affix indexes, distinct within a row"""
+    count = min(count, len(prob))
+    picks = draw_alias(prob, alias, (elites, count), rng)
+    for k in range(1, count):
+        duplicate = (picks[:, k:k + 1] == picks[:, :k]).any(axis=1)
+        while duplicate.any():
+            picks[duplicate, k] = draw_alias(prob, alias, int(duplicate.sum()), rng)
+            duplicate = (picks[:, k:k + 1] == picks[:, :k]).any(axis=1)
+    return picks
+
+
+def evaluate_tokens(tokens, days):
+    """{key: array over days} for the numeric token variables (they may use each other, in any order)"""
+    values = {'Day': days}
+    pending = list(tokens)
+    while pending:
+        unresolved = []
+        for key, source in pending:
+            try:
+                values[key] = compile_formula(source).evaluate(values).astype(float)
+            except FormulaError:
+                unresolved.append((key, source))  # Needs a later token, or is not a number at all
+        if len(unresolved) == len(pending):
+            break  # e.g. RemoveStatusType="AllNegative", or Owner.HealthTotal at runtime
+        pending = unresolved
+    return values
+
+
+def bonus_table(pool, days, unresolved=None):
+    """Return (columns, values): columns [(stat, target)], values[affix, column, day]
+
+    Modifiers whose value needs a runtime token (Owner.*) are left out and
+    appended to unresolved as (affix, stat, target, value text).
+    """
+    evaluated = []
+    for a, affix in enumerate(pool):
+        tokens = evaluate_tokens(affix['tokens'], days)
+        for stat, target, source in affix['modifiers']:
+            try:
+                value = compile_formula(source).evaluate(tokens)
+            except FormulaError:
+                if unresolved is not None:
+                    unresolved.append((affix['id'], stat, target, source))
+                continue
+            evaluated.append((a, (stat, target), value))
+    columns = sorted({column for _, column, _ in evaluated})
+    index = {column: i for i, column in enumerate(columns)}
+    values = np.zeros((len(pool), len(columns), len(days)))
+    for a, column, value in evaluated:
+        values[a, index[column]] += value
+    return columns, values
+
+
+def simulate(pool, days, elites, count, rng, unresolved=None):
+    """Per-day mean bonus and share of elites with a bonus, per (stat, target) column"""
+    columns, values = bonus_table(pool, days, unresolved)
+    prob, alias = build_alias_table([affix['weight'] for affix in pool])
+    mean = np.zeros((len(columns), len(days)))
+    share = np.zeros((len(columns), len(days)))
+    for d in range(len(days)):
+        picks = draw_affixes(prob, alias, elites, count, rng)
+        bonus = values[picks, :, d].sum(axis=1)  # (elites, columns)
+        mean[:, d] = bonus.mean(axis=0)
+        share[:, d] = (bonus != 0).mean(axis=0)
+    return columns, values, mean, share
+
+
+def main(argv):
+    level = 0
+    flags = None
+    day_count = 30
+    elites = 100000
+    count = 1
+    seed = 0
+    shown = [1, 5, 10, 20, 30]
+    output = RESULTS_FILE
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--apocalypse':
+            level = int(next(args))
+        elif arg == '--flags':
+            flags = set(next(args).split(','))
+        elif arg == '--days':
+            day_count = int(next(args))
+        elif arg == '--elites':
+            elites = int(next(args))
+        elif arg == '--affixes':
+            count = int(next(args))
+        elif arg == '--seed':
+            seed = int(next(args))
+        elif arg == '--show':
+            shown = [int(day) for day in next(args).split(',')]
+        elif arg == '--output':
+            output = next(args)
+
+    files = resolve_definition_files(MODDED_DIR, BASE_DIR)
+    if flags is None:
+        flags = apocalypse_flags(files, level)
+    affixes = load_affixes(files)
+    pool = affix_pool(affixes, flags)
+    if not pool:
+        print("⚠ No elite affix can be rolled with these flags")
+        return 1
+    days = np.arange(1, day_count + 1, dtype=float)
+    shown = [day for day in shown if 1 <= day <= day_count] or [day_count]
+
+    start = time.perf_counter()
+    unresolved = []
+    columns, values, mean, share = simulate(pool, days, elites, count, np.random.default_rng(seed), unresolved)
+    elapsed = time.perf_counter() - start
+
+    weights = np.array([affix['weight'] for affix in pool])
+    chances = weights / weights.sum()
+    print("=" * 80)
+    print(f"ELITE AFFIXES: {len(pool)} of {len(affixes)} elite affixes, flags: {', '.join(sorted(flags)) or 'none'}")
+    print(f"{elites} elites x {day_count} days, {count} affix(es) each, seed {seed} ({elapsed:.2f}s)")
+    print("=" * 80)
+    for affix, chance in sorted(zip(pool, chances), key=lambda entry: -entry[1]):
+        print(f"  {affix['id']:28} {100 * chance:6.2f}%")
+
+    print("\nMean bonus per elite (share of elites with the bonus) on day "
+          + ", ".join(str(day) for day in shown))
+    print("-" * 80)
+    for c, (stat, target) in enumerate(columns):
+        cells = "  ".join(f"{mean[c, day - 1]:8.2f} ({100 * share[c, day - 1]:4.1f}%)" for day in shown)
+        print(f"  {stat + (' (aura)' if target == 'aura' else ''):24} {cells}")
+
+    if unresolved:
+        print(f"\n⚠ {len(unresolved)} modifiers depend on runtime values and are left out:")
+        for affix_id, stat, target, source in unresolved:
+            print(f"  {affix_id:28} {stat + (' (aura)' if target == 'aura' else ''):24} {source}")
+
+    results = {
+        'flags': sorted(flags), 'days': day_count, 'elites': elites, 'affixes_per_elite': count, 'seed': seed,
+        'pool': {affix['id']: round(float(chance), 6) for affix, chance in zip(pool, chances)},
+        'columns': [f"{stat}:{target}" for stat, target in columns],
+        'mean': {f"{stat}:{target}": [round(float(v), 3) for v in mean[c]] for c, (stat, target) in enumerate(columns)},
+        'share': {f"{stat}:{target}": [round(float(v), 4) for v in share[c]] for c, (stat, target) in enumerate(columns)},
+        'unresolved': [list(entry) for entry in unresolved],
+    }
+    if count == 1:
+        # One affix per elite: the exact expectation is the weighted sum
+        exact = np.einsum('a,acd->cd', chances, values)
+        results['exact_mean'] = {f"{stat}:{target}": [round(float(v), 3) for v in exact[c]]
+                                 for c, (stat, target) in enumerate(columns)}
+    with open(output, 'w') as f:
+        json.dump(results, f)
+    print(f"\nPer-day bonuses saved to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Effective-HP and hits-to-kill tables for the enemy templates.
+Enemy stats from EnemyUnitTemplateDefinitions_Tier1-4 are loaded into a NumPy
+structured array and crossed in one broadcast pass against the BaseDamage
+ranges of every weapon, variant and level from weapon_matrix.py.
+
+Model, per hit: damage is reduced by Block (flat) and then by Resistance
+(percent); the chance to hit is 100 - (Dodge - hero Accuracy) percent,
+clamped to 0-100. ArmorTotal is a pool in front of HealthTotal: mitigated
+damage empties the armor first and the rest of the hit carries over to
+health (skill-level ArmorPiercing/ArmorShredding effects are not modelled).
+Effective HP is the raw damage needed to kill, so it depends on the weapon
+(Block is flat):
+  EHP = (HealthTotal + ArmorTotal) * raw damage / (mitigated damage * hit chance)
+Hits to kill are given for max, average and min damage rolls; expected
+attacks divide the average-roll hits by the hit chance.
+
+Usage (from the script directory):
+  python enemy_ttk.py [--variant 0] [--level 0] [--accuracy 0]
+                      [--weapons Sword,Rifle] [--output enemy_ttk.npz]
+"""
+
+import os
+import sys
+
+import numpy as np
+
+from definition_scan import MODDED_DIR, list_definition_files, load_root
+from weapon_matrix import load_weapon_matrix
+
+ENEMY_FILE_PREFIX = 'EnemyUnitTemplateDefinitions_Tier'
+ENEMY_STATS = ['HealthTotal', 'ArmorTotal', 'Block', 'Dodge', 'Resistance', 'MovePointsTotal', 'Accuracy']
+ENEMY_DTYPE = [('id', 'U40'), ('tier', 'i4')] + [(stat, 'f8') for stat in ENEMY_STATS]
+DEFAULT_WEAPONS = ['Sword', 'Hammer', '2HSword', 'Spear', 'Shortbow', 'Rifle', 'MagicWand', 'MagicStaff']
+RESULTS_FILE = 'enemy_ttk.npz'
+
+
+def load_enemies(modded_dir=MODDED_DIR):
+    """Return a structured array with one record per enemy template of tiers 1-4"""
+    records = []
+    for name in list_definition_files(modded_dir):
+        # Tier-1 holds special units (cocoons, allies), not the tiered enemies
+        if not name.startswith(ENEMY_FILE_PREFIX) or name.startswith(ENEMY_FILE_PREFIX + '-'):
+            continue
+        for template in load_root(os.path.join(modded_dir, name)).findall('EnemyUnitTemplateDefinition'):
+            stats = [float(template.findtext(stat) or 0) for stat in ENEMY_STATS]
+            records.append((template.get('Id'), int(template.findtext('Tier') or 0), *stats))
+    enemies = np.array(records, dtype=ENEMY_DTYPE)
+    return enemies[np.argsort(enemies['tier'], kind='stable')]
+
+
+def kill_tables(enemies, damage_min, damage_max, accuracy=0.0):
+    """Broadcast enemies against weapon damage ranges
+
+    damage_min/damage_max may have any shape S (e.g. weapons x variants x
+    levels); every returned array has shape (enemies,) + S.
+    """
+    extra = (slice(None),) + (None,) * np.ndim(damage_min)
+    # Armor soaks mitigated damage before health, and a hit's excess carries over
+    health = (enemies['HealthTotal'] + enemies['ArmorTotal'])[extra]
+    block = enemies['Block'][extra]
+    resistance = np.clip(enemies['Resistance'][extra], 0, 100) / 100
+    hit_chance = np.clip(1 - (enemies['Dodge'][extra] - accuracy) / 100, 0, 1)
+
+    def mitigated(damage):
+        return np.maximum(damage - block, 0) * (1 - resistance)
+
+    low = mitigated(np.asarray(damage_min)[None])
+    high = mitigated(np.asarray(damage_max)[None])
+    average = (low + high) / 2
+    raw_average = (np.asarray(damage_min) + np.asarray(damage_max))[None] / 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hits_best = np.ceil(health / high)
+        hits_average = np.ceil(health / average)
+        hits_worst = np.ceil(health / low)
+        expected_attacks = hits_average / hit_chance
+        effective_hp = health * raw_average / (average * hit_chance)
+    return {
+        'hit_chance': np.broadcast_to(hit_chance, average.shape),
+        'mitigated_damage': average,
+        'effective_hp': effective_hp,
+        'hits_best': hits_best,
+        'hits_average': hits_average,
+        'hits_worst': hits_worst,
+        'expected_attacks': expected_attacks,
+    }
+
+
+def main(argv):
+    variant = 0
+    level = 0
+    accuracy = 0.0
+    weapons = DEFAULT_WEAPONS
+    output = RESULTS_FILE
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--variant':
+            variant = int(next(args))
+        elif arg == '--level':
+            level = int(next(args))
+        elif arg == '--accuracy':
+            accuracy = float(next(args))
+        elif arg == '--weapons':
+            weapons = next(args).split(',')
+        elif arg == '--output':
+            output = next(args)
+
+    enemies = load_enemies()
+    matrix = load_weapon_matrix()
+    tables = kill_tables(enemies, matrix.column('DamageMin'), matrix.column('DamageMax'), accuracy)
+
+    print("=" * 80)
+    print(f"ENEMY KILL TABLES: {len(enemies)} enemies x {len(matrix.weapons)} weapons, "
+          f"variant {variant}, level {level}, hero accuracy {accuracy:g}")
+    print("=" * 80)
+    print("Expected attacks to kill (average rolls, misses included):\n")
+
+    for weapon in weapons:
+        if weapon not in matrix.weapons:
+            print(f"⚠ Unknown weapon {weapon}")
+    columns = [matrix.weapons.index(w) for w in weapons if w in matrix.weapons]
+    print(f"{'Enemy':16} {'T':>1} {'HP':>5} {'Arm':>4} {'Blk':>4} {'Ddg':>4} {'Res':>4} "
+          + " ".join(f"{matrix.weapons[c][:8]:>8}" for c in columns))
+    print("-" * 80)
+    attacks = tables['expected_attacks'][:, :, variant, level]
+    for i, enemy in enumerate(enemies):
+        cells = " ".join(f"{attacks[i, c]:>8.2f}" for c in columns)
+        print(f"{enemy['id']:16} {enemy['tier']:>1} {enemy['HealthTotal']:>5g} {enemy['ArmorTotal']:>4g} {enemy['Block']:>4g} "
+              f"{enemy['Dodge']:>4g} {enemy['Resistance']:>4g} {cells}")
+
+    np.savez_compressed(output, enemies=enemies, weapons=np.array(matrix.weapons), **tables)
+    print(f"\nTables (enemy x weapon x variant x level) saved to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compiled evaluator for the formula strings used in the definition files,
+e.g. "60 + Night * Multiplier" or "Clamp(MovePoints-2,2,6)".
+Each source text is parsed once into an AST (cached by text), checked
+against the supported grammar and compiled into a NumPy function, so one
+call evaluates the formula over whole arrays of inputs.
+
+Usage (from the script directory):
+  python formula.py "60 + Night * Multiplier" Night=1:30 Multiplier=1,1.5,2
+
+A variable is given as a constant (2.5), a list (1,2,3) or an inclusive
+range start:stop[:step]; several arrays are combined as a grid.
+"""
+
+import ast
+import functools
+import itertools
+import sys
+
+import numpy as np
+
+
+class FormulaError(ValueError):
+    """Raised for formulas outside the supported grammar or missing variables"""
+
+
+# Game functions; Round rounds half to even like C#'s Math.Round
+FUNCTIONS = {
+    'Max': lambda *args: functools.reduce(np.maximum, args),
+    'Min': lambda *args: functools.reduce(np.minimum, args),
+    'Clamp': lambda value, low, high: np.minimum(np.maximum(value, low), high),
+    'Floor': np.floor,
+    'Ceil': np.ceil,
+    'Round': np.round,
+    'Abs': np.abs,
+    'BooleanChoice': np.where,
+}
+
+BINARY_OPERATORS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+UNARY_OPERATORS = {ast.USub: '-', ast.UAdd: '+'}
+COMPARE_OPERATORS = {ast.Gt: '>', ast.GtE: '>=', ast.Lt: '<', ast.LtE: '<=', ast.Eq: '==', ast.NotEq: '!='}
+
+
+def dotted_name(node):
+    """Return 'Owner.ArmorTotal' for a Name/Attribute chain, else None"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+
+class _Compiler:
+    """Turns a checked formula AST into Python source over NumPy"""
+
+    def __init__(self, source):
+        self.source = source
+        self.variables = set()
+
+    def fail(self, node, message):
+        raise FormulaError(f"{message} in formula '{self.source}' (column {getattr(node, 'col_offset', 0) + 1})")
+
+    def emit(self, node):
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float, str)):
+                self.fail(node, f"Unsupported constant {node.value!r}")
+            return repr(node.value)
+
+        name = dotted_name(node)
+        if name is not None:
+            self.variables.add(name)
+            return f"v[{name!r}]"
+
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            return f"({self.emit(node.left)} {BINARY_OPERATORS[type(node.op)]} {self.emit(node.right)})"
+
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+            return f"({UNARY_OPERATORS[type(node.op)]}{self.emit(node.operand)})"
+
+        if isinstance(node, ast.Compare):
+            terms = []
+            left = self.emit(node.left)
+            for op, comparator in zip(node.ops, node.comparators):
+                if type(op) not in COMPARE_OPERATORS:
+                    self.fail(node, "Unsupported comparison")
+                right = self.emit(comparator)
+                terms.append(f"({left} {COMPARE_OPERATORS[type(op)]} {right})")
+                left = right
+            return terms[0] if len(terms) == 1 else f"np.logical_and.reduce([{', '.join(terms)}])"
+
+        if isinstance(node, ast.Call) and not node.keywords:
+            args = [self.emit(arg) for arg in node.args]
+            name = dotted_name(node.func)
+            if name == 'Random':
+                if len(args) != 2:
+                    self.fail(node, "Random takes 2 arguments")
+                return f"rng.uniform({args[0]}, {args[1]}, shape)"
+            if name in FUNCTIONS:
+                return f"f[{name!r}]({', '.join(args)})"
+            if name is not None:
+                # Game-side method such as Skill.IsFromItemWithTag('Claws'): a callable variable
+                self.variables.add(name)
+                return f"v[{name!r}]({', '.join(args)})"
+
+        self.fail(node, f"Unsupported {type(node).__name__} expression")
+
+
+@functools.lru_cache(maxsize=None)
+def parse_formula(source):
+    """Parse a formula once; the AST is cached by source text"""
+    try:
+        return ast.parse(source.strip(), mode='eval')
+    except SyntaxError as e:
+        raise FormulaError(f"Cannot parse formula '{source}': {e.msg}") from None
+
+
+class Formula:
+    """A parsed and compiled formula; call it with arrays or scalars per variable"""
+
+    def __init__(self, source):
+        self.source = source
+        self.tree = parse_formula(source)
+        compiler = _Compiler(source)
+        code = compiler.emit(self.tree.body)
+        self.variables = tuple(sorted(compiler.variables))
+        self.python_source = f"lambda v, rng, shape: {code}"
+        self._func = eval(compile(self.python_source, f'<formula {source!r}>', 'eval'),
+                          {'np': np, 'f': FUNCTIONS, '__builtins__': {}})
+
+    def __repr__(self):
+        return f"Formula({self.source!r})"
+
+    def __call__(self, rng=None, **variables):
+        return self.evaluate(variables, rng)
+
+    def evaluate(self, variables, rng=None):
+        """Evaluate over broadcast inputs and return an array of the broadcast shape"""
+        missing = [name for name in self.variables if name not in variables]
+        if missing:
+            raise FormulaError(f"Formula '{self.source}' needs values for {', '.join(missing)}")
+        values = {}
+        shapes = []
+        for name in self.variables:
+            value = variables[name]
+            if not callable(value):
+                value = np.asarray(value, dtype=float)
+                shapes.append(value.shape)
+            values[name] = value
+        shape = np.broadcast_shapes(*shapes) if shapes else ()
+        if rng is None:
+            rng = np.random.default_rng()
+        return np.broadcast_to(self._func(values, rng, shape), shape)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_formula(source):
+    """Return the compiled Formula for a source text (cached by text)"""
+    return Formula(source)
+
+
+def evaluate(source, rng=None, **variables):
+    """One-shot helper: compile (cached) and evaluate"""
+    return compile_formula(source).evaluate(variables, rng)
+
+
+def parse_values(text):
+    """'2.5' -> scalar, '1,2,3' -> list, '1:30[:step]' -> inclusive range"""
+    if ':' in text:
+        parts = [float(p) for p in text.split(':')]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1.0
+        return np.arange(start, stop + step / 2, step)
+    if ',' in text:
+        return np.array([float(p) for p in text.split(',')])
+    return float(text)
+
+
+def main(argv):
+    if not argv:
+        print(__doc__)
+        return 1
+
+    given = {}
+    for arg in argv[1:]:
+        name, _, text = arg.partition('=')
+        given[name] = parse_values(text)
+
+    try:
+        formula = compile_formula(argv[0])
+        # Arrays are swept as a grid, one axis per variable
+        swept = [name for name in formula.variables if np.ndim(given.get(name, 0)) == 1]
+        grids = np.meshgrid(*(given[name] for name in swept), indexing='ij') if swept else []
+        values = dict(given)
+        values.update(zip(swept, grids))
+        result = formula.evaluate(values)
+    except FormulaError as e:
+        print(f"⚠ {e}")
+        return 1
+
+    print(f"{formula.source}")
+    print("-" * 80)
+    print("  ".join(f"{name:>12}" for name in swept + ['result']))
+    for index in itertools.product(*(range(n) for n in result.shape)):
+        row = [grids[i][index] for i in range(len(swept))] + [result[index]]
+        print("  ".join(f"{value:>12g}" for value in row))
+    return 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
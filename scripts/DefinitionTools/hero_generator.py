@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming recruit generator for PlayableUnitGenerationDefinitions.
+Each archetype's StatGenerationDefinition ranges are compiled into Min/Max
+arrays; stats with Min == Max are constants and only the others are drawn,
+uniform between Min and Max (integers when both are whole numbers, as in
+levelup_simulator.py). Recruits are generated in chunks, and the summary
+keeps one histogram per stat, so memory does not grow with the number of
+recruits and percentiles are exact for integer stats (FLOAT_BINS bins
+otherwise).
+
+Every stat is checked against its Boundaries in UnitStatDefinitions
+(UnitType Playable): the range itself and the share of sampled recruits
+outside them. --set tries a range change without editing the file.
+
+Usage (from the script directory):
+  python hero_generator.py [--heroes 10000000] [--chunk 1000000] [--seed 0]
+                           [--archetypes Melee,Magic] [--set [Melee.]HealthTotal=90:110 ...]
+                           [--output hero_generation.json]
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from definition_scan import MODDED_DIR, load_root
+from levelup_simulator import PERCENTILES, histogram_percentiles, load_archetypes
+
+RESULTS_FILE = 'hero_generation.json'
+STAT_FILE = 'UnitStatDefinitions'
+UNIT_TYPE = 'Playable'
+CHUNK_SIZE = 1000000
+FLOAT_BINS = 4096
+
+
+def load_boundaries(modded_dir=MODDED_DIR, unit_type=UNIT_TYPE):
+    """Return {stat: (min, max)} of one unit type"""
+    boundaries = {}
+    for definition in load_root(os.path.join(modded_dir, STAT_FILE)).findall('UnitStatDefinition'):
+        for bounds in definition.findall('Boundaries'):
+            if bounds.get('UnitType') == unit_type:
+                boundaries[definition.get('Id')] = (float(bounds.findtext('Min')), float(bounds.findtext('Max')))
+    return boundaries
+
+
+class CompiledArchetype:
+    """Min/Max arrays of one archetype, plus the layout of the drawn stats' histograms
+
+    A drawn stat k takes bins base[k] .. base[k] + span[k] - 1; bin b stands
+    for low + b * step (integer stats: step 1; others: FLOAT_BINS bins).
+    """
+
+    def __init__(self, name, ranges):
+        self.name = name
+        self.stats = list(ranges)
+        self.low = np.array([ranges[stat][0] for stat in self.stats])
+        self.high = np.array([ranges[stat][1] for stat in self.stats])
+        self.drawn = np.flatnonzero(self.low != self.high)
+        low, high = self.low[self.drawn], self.high[self.drawn]
+        self.integral = (low == np.round(low)) & (high == np.round(high))
+        self.span = np.where(self.integral, high - low + 1, FLOAT_BINS).astype(np.int64)
+        self.step = np.where(self.integral, 1.0, (high - low) / FLOAT_BINS)
+        self.base = np.concatenate([[0], np.cumsum(self.span)[:-1]]).astype(np.int64)
+
+    def draw_bins(self, size, rng):
+        """(size, drawn stats) histogram bins of size recruits"""
+        u = rng.random((size, len(self.drawn)), dtype=np.float32)
+        bins = (u * self.span.astype(np.float32)).astype(np.int64)
+        return np.minimum(bins, self.span - 1)  # float32 rounding can reach span
+
+
+def summarize_archetype(compiled, heroes, rng, boundaries, chunk=CHUNK_SIZE, percentiles=PERCENTILES):
+    """Stream heroes recruits into per-stat histograms; return {stat: summary}"""
+    counts = np.zeros(int(compiled.span.sum()), dtype=np.int64)
+    for done in range(0, heroes, chunk):
+        size = min(chunk, heroes - done)
+        bins = compiled.draw_bins(size, rng) + compiled.base
+        counts += np.bincount(bins.ravel(), minlength=len(counts))
+
+    summary = {}
+    drawn = {stat_index: k for k, stat_index in enumerate(compiled.drawn)}
+    for i, stat in enumerate(compiled.stats):
+        low, high = float(compiled.low[i]), float(compiled.high[i])
+        bounds = boundaries.get(stat)
+        entry = {'min': low, 'max': high}
+        if i not in drawn:
+            entry.update({f'p{p}': low for p in percentiles})
+            outside = 1.0 if bounds and not bounds[0] <= low <= bounds[1] else 0.0
+        else:
+            k = drawn[i]
+            histogram = counts[compiled.base[k]:compiled.base[k] + compiled.span[k]]
+            # Values of the bins (float stats: bin centres)
+            values = low + compiled.step[k] * (np.arange(len(histogram)) + (0 if compiled.integral[k] else 0.5))
+            positions = histogram_percentiles(np.cumsum(histogram), percentiles)
+            for p, position in zip(percentiles, positions):
+                entry[f'p{p}'] = round(float(low + compiled.step[k] * position), 3)
+            outside = 0.0
+            if bounds:
+                outside = float(histogram[(values < bounds[0]) | (values > bounds[1])].sum()) / heroes
+        if bounds:
+            entry['boundaries'] = list(bounds)
+            entry['range_outside'] = low < bounds[0] or high > bounds[1]
+            entry['share_outside'] = outside
+        summary[stat] = entry
+    return summary
+
+
+def apply_overrides(archetypes, overrides):
+    """Apply --set overrides ('[Archetype.]Stat=min:max') in place; return unknown names"""
+    unknown = []
+    for override in overrides:
+        target, _, bounds = override.partition('=')
+        archetype, _, stat = target.rpartition('.')
+        low, high = (float(v) for v in bounds.split(':'))
+        names = [archetype] if archetype else list(archetypes)
+        for name in names:
+            if name not in archetypes:
+                unknown.append(name)
+            else:
+                archetypes[name][stat] = (low, high)
+    return unknown
+
+
+def main(argv):
+    heroes = 10000000
+    chunk = CHUNK_SIZE
+    seed = 0
+    selected = None
+    overrides = []
+    output = RESULTS_FILE
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--heroes':
+            heroes = int(next(args))
+        elif arg == '--chunk':
+            chunk = int(next(args))
+        elif arg == '--seed':
+            seed = int(next(args))
+        elif arg == '--archetypes':
+            selected = next(args).split(',')
+        elif arg == '--set':
+            overrides.append(next(args))
+        elif arg == '--output':
+            output = next(args)
+
+    archetypes = load_archetypes()
+    boundaries = load_boundaries()
+    unknown = apply_overrides(archetypes, overrides)
+    unknown += [name for name in selected or [] if name not in archetypes]
+    for name in unknown:
+        print(f"⚠ Unknown archetype {name}")
+
+    print("=" * 80)
+    print(f"HERO GENERATION: {heroes} recruits per archetype in chunks of {chunk}, seed {seed}")
+    print("=" * 80)
+
+    rng = np.random.default_rng(seed)
+    results = {'heroes': heroes, 'seed': seed, 'overrides': overrides, 'archetypes': {}}
+    exit_code = 1 if unknown else 0
+    for name, ranges in archetypes.items():
+        if selected and name not in selected:
+            continue
+        compiled = CompiledArchetype(name, ranges)
+        start = time.perf_counter()
+        summary = summarize_archetype(compiled, heroes, rng, boundaries, chunk)
+        elapsed = time.perf_counter() - start
+        results['archetypes'][name] = summary
+
+        print(f"\n{name}: {len(compiled.stats)} stats, {len(compiled.drawn)} drawn, "
+              f"{heroes / elapsed / 1e6:.1f}M recruits/s")
+        print(f"  {'Stat':24} {'Min':>7} {'Max':>7}  " + " ".join(f"{f'p{p}':>7}" for p in PERCENTILES))
+        for k in compiled.drawn:
+            stat = compiled.stats[k]
+            entry = summary[stat]
+            print(f"  {stat:24} {entry['min']:>7g} {entry['max']:>7g}  "
+                  + " ".join(f"{entry[f'p{p}']:>7g}" for p in PERCENTILES))
+        missing = [stat for stat in compiled.stats if stat not in boundaries]
+        if missing:
+            print(f"  ⚠ No {UNIT_TYPE} Boundaries for {', '.join(missing)}")
+        outside = [stat for stat, entry in summary.items() if entry.get('range_outside')]
+        for stat in outside:
+            entry = summary[stat]
+            print(f"  ⚠ {stat} range {entry['min']:g}-{entry['max']:g} exceeds Boundaries "
+                      f"{entry['boundaries'][0]:g}-{entry['boundaries'][1]:g}: "
+                      f"{100 * entry['share_outside']:.2f}% of recruits outside")
+        if outside:
+            exit_code = 1
+        else:
+            print("  ✓ Every range is within its Boundaries")
+
+    with open(output, 'w') as f:
+        json.dump(results, f)
+    print(f"\nPercentile summaries saved to {output}")
+    return exit_code
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batched hero level-up simulator.
+Starting stats are drawn per archetype from PlayableUnitGenerationDefinitions
+(uniform between Min and Max), then every level-up adds one main and one
+secondary stat bonus picked from UnitLevelUpStatDefinitions: the stat by its
+Weight and the bonus size (Small/Medium/Big) by BONUS_SIZE_WEIGHTS among the
+sizes the stat defines. Each pool is flattened once into a cumulative-weight
+table of (stat, size) outcomes, so N heroes x L levels are drawn with one
+searchsorted call per pool over an L x N uniform block. Levels are then
+applied in order to a stats x N array of totals, and the percentiles are read
+from per-stat histograms that each level updates with its picks only.
+
+Usage (from the script directory):
+  python levelup_simulator.py [--heroes 100000] [--levels 20] [--seed 0]
+                              [--sizes 1,1,1] [--stats HealthTotal,Dodge]
+                              [--output levelup_simulation.json]
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from definition_scan import MODDED_DIR, load_root
+
+LEVELUP_FILE = 'UnitLevelUpStatDefinitions'
+GENERATION_FILE = 'PlayableUnitGenerationDefinitions'
+BONUS_SIZES = ('SmallBonus', 'MediumBonus', 'BigBonus')
+BONUS_SIZE_WEIGHTS = (1.0, 1.0, 1.0)
+PERCENTILES = (5, 25, 50, 75, 95)
+RESULTS_FILE = 'levelup_simulation.json'
+
+
+def load_levelup_pools(modded_dir=MODDED_DIR):
+    """Return {'MainStats': [(stat, weight, {size: bonus})], 'SecondaryStats': [...]}"""
+    root = load_root(os.path.join(modded_dir, LEVELUP_FILE))
+    pools = {}
+    for pool in ('MainStats', 'SecondaryStats'):
+        entries = []
+        for definition in root.find(pool).findall('UnitLevelUpStatDefinition'):
+            bonuses = {}
+            for size in BONUS_SIZES:
+                value = definition.findtext(f'Bonuses/{size}')
+                if value is not None:
+                    bonuses[size] = float(value)
+            entries.append((definition.get('Stat'), float(definition.get('Weight', 1)), bonuses))
+        pools[pool] = entries
+    return pools
+
+
+def load_archetypes(modded_dir=MODDED_DIR):
+    """Return {archetype: {stat: (min, max)}}"""
+    archetypes = {}
+    root = load_root(os.path.join(modded_dir, GENERATION_FILE))
+    for definition in root.findall('PlayableUnitGenerationDefinition'):
+        ranges = {}
+        for stat in definition.iter('StatGenerationDefinition'):
+            ranges[stat.get('Stat')] = (float(stat.findtext('Min')), float(stat.findtext('Max')))
+        archetypes[definition.get('ArchetypeId')] = ranges
+    return archetypes
+
+
+def build_outcome_table(entries, stat_index, size_weights=BONUS_SIZE_WEIGHTS):
+    """Flatten one pool into (cumulative probability, stat column, bonus) arrays"""
+    probabilities = []
+    columns = []
+    bonuses = []
+    total_weight = sum(weight for _, weight, _ in entries)
+    for stat, weight, sizes in entries:
+        size_total = sum(size_weights[BONUS_SIZES.index(size)] for size in sizes)
+        for size, bonus in sizes.items():
+            probabilities.append(weight / total_weight * size_weights[BONUS_SIZES.index(size)] / size_total)
+            columns.append(stat_index[stat])
+            bonuses.append(bonus)
+    cumulative = np.cumsum(probabilities)
+    cumulative[-1] = 1.0
+    return cumulative, np.array(columns), np.array(bonuses)
+
+
+def draw_levelups(tables, heroes, levels, rng):
+    """Draw every level-up: one (stat columns, bonuses) pair of levels x heroes arrays per pool"""
+    draws = []
+    for cumulative, columns, bonuses in tables:
+        outcomes = np.searchsorted(cumulative, rng.random((levels, heroes)), side='right')
+        draws.append((columns[outcomes], bonuses[outcomes]))
+    return draws
+
+
+def histogram_percentiles(cumulative, percentiles=PERCENTILES):
+    """Percentiles, as fractional bin indexes, of the data behind a cumulative histogram
+
+    Linear interpolation between order statistics, like np.percentile.
+    """
+    count = int(cumulative[-1])
+    positions = np.asarray(percentiles, dtype=float) / 100 * (count - 1)
+    below = np.floor(positions).astype(int)
+    fraction = positions - below
+    above = np.minimum(below + 1, count - 1)
+    # The value of order statistic k is the first bin whose cumulative count exceeds k
+    lower = np.searchsorted(cumulative, below, side='right')
+    upper = np.searchsorted(cumulative, above, side='right')
+    return lower + fraction * (upper - lower)
+
+
+def simulate_archetype(ranges, tables, stats, heroes, levels, rng, percentiles=PERCENTILES):
+    """Return percentile curves, an array len(percentiles) x (levels + 1) x stats
+
+    Level 0 is the generated hero. The totals are one stats x heroes array
+    and a level only updates the two cells each hero picked. With integer
+    data a histogram per stat is updated from those picks alone (one bin
+    out, one bin in), so a level costs O(heroes) instead of O(stats x heroes).
+    """
+    draws = draw_levelups(tables, heroes, levels, rng)
+    leveled = {column for cumulative, columns, bonuses in tables for column in columns}
+    integral = all(float(b).is_integer() for cumulative, columns, bonuses in tables for b in bonuses)
+    totals = np.empty((len(stats), heroes))
+    for i, stat in enumerate(stats):
+        low, high = ranges.get(stat, (0.0, 0.0))
+        if low == high and i not in leveled:
+            totals[i] = low
+        elif integral and low.is_integer() and high.is_integer():
+            totals[i] = rng.integers(int(low), int(high) + 1, heroes, dtype=np.int32)
+        else:
+            totals[i] = rng.uniform(low, high, heroes)
+
+    exact = integral and np.array_equal(totals, np.round(totals))
+    if exact:
+        totals = totals.astype(np.int64)
+        # Bins wide enough for every total any hero can reach, one row per stat
+        low = int(totals.min()) + levels * sum(min(int(bonuses.min()), 0) for _, _, bonuses in tables)
+        width = int(totals.max()) + levels * sum(max(int(bonuses.max()), 0) for _, _, bonuses in tables) - low + 1
+        base = np.arange(len(stats), dtype=np.int64) * width - low
+        counts = np.bincount((totals + base[:, None]).ravel(), minlength=len(stats) * width)
+
+    curves = np.empty((len(percentiles), levels + 1, len(stats)))
+    heroes_index = np.arange(heroes)
+    for level in range(levels + 1):
+        if level:
+            for columns, bonuses in draws:
+                picked = columns[level - 1]
+                before = totals[picked, heroes_index]
+                after = before + bonuses[level - 1].astype(totals.dtype)
+                totals[picked, heroes_index] = after
+                if exact:
+                    counts -= np.bincount(base[picked] + before, minlength=len(counts))
+                    counts += np.bincount(base[picked] + after, minlength=len(counts))
+        if exact:
+            cumulative = counts.reshape(len(stats), width).cumsum(axis=1)
+            for i in range(len(stats)):
+                curves[:, level, i] = low + histogram_percentiles(cumulative[i], percentiles)
+        else:
+            curves[:, level] = np.percentile(totals, percentiles, axis=1)
+    return curves
+
+
+def main(argv):
+    heroes = 100000
+    levels = 20
+    seed = 0
+    size_weights = BONUS_SIZE_WEIGHTS
+    shown = ['HealthTotal', 'ManaTotal', 'Dodge', 'Accuracy', 'ArmorTotal']
+    output = RESULTS_FILE
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--heroes':
+            heroes = int(next(args))
+        elif arg == '--levels':
+            levels = int(next(args))
+        elif arg == '--seed':
+            seed = int(next(args))
+        elif arg == '--sizes':
+            size_weights = tuple(float(v) for v in next(args).split(','))
+        elif arg == '--stats':
+            shown = next(args).split(',')
+        elif arg == '--output':
+            output = next(args)
+
+    pools = load_levelup_pools()
+    archetypes = load_archetypes()
+    stats = sorted({stat for ranges in archetypes.values() for stat in ranges}
+                   | {stat for entries in pools.values() for stat, _, _ in entries})
+    stat_index = {stat: i for i, stat in enumerate(stats)}
+    tables = [build_outcome_table(pools[pool], stat_index, size_weights) for pool in ('MainStats', 'SecondaryStats')]
+
+    print("=" * 80)
+    print(f"LEVEL-UP SIMULATION: {heroes} heroes x {levels} levels per archetype, seed {seed}")
+    print("=" * 80)
+
+    results = {'heroes': heroes, 'levels': levels, 'seed': seed, 'size_weights': list(size_weights),
+               'percentiles': list(PERCENTILES), 'stats': stats, 'archetypes': {}}
+    rng = np.random.default_rng(seed)
+    for archetype, ranges in archetypes.items():
+        start = time.perf_counter()
+        curves = simulate_archetype(ranges, tables, stats, heroes, levels, rng)
+        elapsed = time.perf_counter() - start
+        results['archetypes'][archetype] = {
+            stat: {f'p{p}': [round(float(v), 2) for v in curves[k, :, i]] for k, p in enumerate(PERCENTILES)}
+            for i, stat in enumerate(stats)
+        }
+
+        print(f"\n{archetype} ({elapsed:.2f}s) - level {levels}: "
+              + ", ".join(f"p{p}" for p in PERCENTILES))
+        for stat in shown:
+            if stat not in stat_index:
+                print(f"  ⚠ Unknown stat {stat}")
+                continue
+            values = " / ".join(f"{curves[k, -1, stat_index[stat]]:g}" for k in range(len(PERCENTILES)))
+            print(f"  {stat:24} {values}")
+
+    with open(output, 'w') as f:
+        json.dump(results, f)
+    print(f"\nPercentile curves saved to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exact loot-drop probabilities for the nested ItemsListDefinition tables.
+An ItemsListDefinition picks one of its Items by Odd; an Item whose Id is
+another list rolls that list in turn. Every list is flattened once into exact
+per-item probabilities (fractions), memoized, and reused by the lists that
+nest it, e.g. ItemList_Trinket -> ItemList_Trinket_Special ->
+ItemList_TrinketPerkDlc1 -> MedalPerkForgeMastery.
+
+Flattened lists are cached in loot_tables.cache.json per file: a file's entry
+is reused while its SHA-256 and those of the files its lists pull from are
+unchanged, so an Odd edit only recomputes the lists of the edited file.
+
+Lists with a DLCId are rolled like any other unless --dlc names the DLCs
+owned; lists of other DLCs then drop out and their siblings share the odds.
+
+Usage (from the script directory):
+  python loot_tables.py [LIST ...] [--any 'DodgeBoots*' ...] [--rolls 1,5,10]
+                        [--dlc Dwarves,Elves | --no-dlc] [--top 10] [--no-cache]
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import sys
+import time
+from fractions import Fraction
+
+from definition_scan import BASE_DIR, MODDED_DIR, load_root, resolve_definition_files
+
+CACHE_FILE = 'loot_tables.cache.json'
+CACHE_VERSION = 1
+LIST_FILE_PREFIXES = ('ItemListDefinitions_', 'ItemsListDefinitions_')
+
+
+def list_files(modded_dir=MODDED_DIR, base_dir=BASE_DIR):
+    """{name: path} of the item list files (modded overlaid on base)"""
+    return {name: path for name, path in resolve_definition_files(modded_dir, base_dir).items()
+            if name.startswith(LIST_FILE_PREFIXES)}
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_lists(path):
+    """{list_id: (dlc or None, [(item_id, odd)])} of one file"""
+    lists = {}
+    for definition in load_root(path).iter('ItemsListDefinition'):
+        entries = [(item.get('Id'), Fraction(item.get('Odd', '1'))) for item in definition.findall('Item')]
+        lists[definition.get('Id')] = (definition.get('DLCId'), entries)
+    return lists
+
+
+class LootTables:
+    """Flattened {item_id: Fraction} distribution of every item list
+
+    owned_dlcs=None rolls every list; otherwise lists with a DLCId outside
+    owned_dlcs are never picked.
+    """
+
+    def __init__(self, files, owned_dlcs=None, cache_path=CACHE_FILE):
+        self.files = files
+        self.owned_dlcs = None if owned_dlcs is None else frozenset(owned_dlcs)
+        self.cache_path = cache_path
+        self.hashes = {name: file_sha256(path) for name, path in files.items()}
+        self.lists = {}  # list_id -> (file name, dlc, [(item_id, odd)])
+        self.memo = {}  # list_id -> {item_id: Fraction}
+        self.uses = {}  # list_id -> names of the files its flattening read
+        self.parsed = []
+        self.cached = []
+
+        cache = self._read_cache() if cache_path else {}
+        for name in files:
+            entry = cache.get(self._cache_key(name))
+            if entry and all(self.hashes.get(dep) == digest for dep, digest in entry['hashes'].items()):
+                for list_id, cached in entry['lists'].items():
+                    entries = [(item_id, Fraction(odd)) for item_id, odd in cached['entries']]
+                    self.lists[list_id] = (name, cached['dlc'], entries)
+                    self.memo[list_id] = {item_id: Fraction(p) for item_id, p in cached['flat'].items()}
+                    self.uses[list_id] = set(entry['hashes'])
+                self.cached.append(name)
+            else:
+                for list_id, (dlc, entries) in load_lists(files[name]).items():
+                    self.lists[list_id] = (name, dlc, entries)
+                self.parsed.append(name)
+
+    def _cache_key(self, name):
+        if self.owned_dlcs is None:
+            return name
+        return f"{name}|{','.join(sorted(self.owned_dlcs))}"
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return cache.get('entries', {}) if cache.get('version') == CACHE_VERSION else {}
+
+    def save_cache(self):
+        """Store the flattened lists of every parsed file (cached entries are kept)"""
+        if not self.cache_path:
+            return
+        entries = {}
+        if os.path.exists(self.cache_path):
+            entries = self._read_cache()
+        for name in self.parsed:
+            ids = [list_id for list_id, (owner, _, _) in self.lists.items() if owner == name]
+            uses = {name}.union(*(self.distribution_uses(list_id) for list_id in ids))
+            entries[self._cache_key(name)] = {
+                'hashes': {dep: self.hashes[dep] for dep in sorted(uses)},
+                'lists': {list_id: {
+                    'dlc': self.lists[list_id][1],
+                    'entries': [[item_id, str(odd)] for item_id, odd in self.lists[list_id][2]],
+                    'flat': {item_id: str(p) for item_id, p in self.distribution(list_id).items()},
+                } for list_id in ids},
+            }
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'entries': entries}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def is_list(self, item_id):
+        return item_id in self.lists
+
+    def available(self, list_id):
+        dlc = self.lists[list_id][1]
+        return self.owned_dlcs is None or dlc is None or dlc in self.owned_dlcs
+
+    def distribution(self, list_id, _path=()):
+        """{item_id: Fraction} of one roll of a list (empty when nothing can drop)"""
+        flat = self.memo.get(list_id)
+        if flat is not None:
+            return flat
+        if list_id in _path:
+            raise ValueError(f"Item list cycle: {' -> '.join(_path + (list_id,))}")
+
+        name, _, entries = self.lists[list_id]
+        uses = {name}
+        weighted = []
+        for item_id, odd in entries:
+            if odd <= 0:
+                continue
+            if self.is_list(item_id):
+                if not self.available(item_id):
+                    continue
+                sub = self.distribution(item_id, _path + (list_id,))
+                if not sub:
+                    continue  # Nothing can drop from it, so it is never picked
+                uses |= self.distribution_uses(item_id)
+                weighted.append((odd, sub))
+            else:
+                weighted.append((odd, {item_id: Fraction(1)}))
+
+        total = sum(odd for odd, _ in weighted)
+        flat = {}
+        for odd, sub in weighted:
+            share = odd / total
+            for item_id, p in sub.items():
+                flat[item_id] = flat.get(item_id, 0) + share * p
+        self.memo[list_id] = flat
+        self.uses[list_id] = uses
+        return flat
+
+    def distribution_uses(self, list_id):
+        self.distribution(list_id)
+        return self.uses[list_id]
+
+    def roots(self):
+        """Lists that no other list nests"""
+        nested = {item_id for _, _, entries in self.lists.values() for item_id, _ in entries}
+        return sorted(list_id for list_id in self.lists if list_id not in nested)
+
+    def unknown_lists(self):
+        """ItemList_* Ids used as items but not defined (they are counted as items)"""
+        return sorted({item_id for _, _, entries in self.lists.values() for item_id, _ in entries
+                       if item_id.startswith('ItemList_') and not self.is_list(item_id)})
+
+    def probability(self, list_id, pattern):
+        """Chance that one roll of list_id drops an item matching the fnmatch pattern"""
+        return sum((p for item_id, p in self.distribution(list_id).items()
+                    if fnmatch.fnmatchcase(item_id, pattern)), Fraction(0))
+
+    def chance_any(self, list_id, patterns, rolls=(1,)):
+        """{pattern: [chance of at least one match in n independent rolls, for n in rolls]}"""
+        results = {}
+        for pattern in patterns:
+            miss = 1 - self.probability(list_id, pattern)
+            results[pattern] = [1 - miss ** n for n in rolls]
+        return results
+
+
+def format_percent(p):
+    return f"{100 * float(p):8.4f}%"
+
+
+def main(argv):
+    selected = []
+    patterns = []
+    rolls = [1]
+    owned_dlcs = None
+    top = 10
+    use_cache = True
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--any':
+            patterns.append(next(args))
+        elif arg == '--rolls':
+            rolls = [int(n) for n in next(args).split(',')]
+        elif arg == '--dlc':
+            owned_dlcs = next(args).split(',')
+        elif arg == '--no-dlc':
+            owned_dlcs = []
+        elif arg == '--top':
+            top = int(next(args))
+        elif arg == '--no-cache':
+            use_cache = False
+        else:
+            selected.append(arg)
+
+    start = time.perf_counter()
+    tables = LootTables(list_files(), owned_dlcs, CACHE_FILE if use_cache else None)
+    selected = selected or tables.roots()
+    missing = [list_id for list_id in selected if not tables.is_list(list_id)]
+    for list_id in selected:
+        if list_id not in missing:
+            tables.distribution(list_id)
+    tables.save_cache()
+    elapsed = time.perf_counter() - start
+
+    print("=" * 80)
+    print(f"LOOT TABLES: {len(tables.lists)} lists in {len(tables.files)} files "
+          f"({len(tables.parsed)} parsed, {len(tables.cached)} cached) in {1000 * elapsed:.1f} ms")
+    if owned_dlcs is not None:
+        print(f"DLCs owned: {', '.join(owned_dlcs) or 'none'}")
+    print("=" * 80)
+
+    for list_id in missing:
+        print(f"⚠ Unknown list {list_id}")
+    for list_id in selected:
+        if list_id in missing:
+            continue
+        flat = tables.distribution(list_id)
+        print(f"\n{list_id} ({tables.lists[list_id][0]}): {len(flat)} items")
+        if not patterns:
+            for item_id, p in sorted(flat.items(), key=lambda entry: (-entry[1], entry[0]))[:top]:
+                print(f"  {item_id:36} {format_percent(p)}  {p}")
+            if len(flat) > top:
+                print(f"  ... {len(flat) - top} more (--top N)")
+            continue
+        headers = [f"{n} roll{'s' if n > 1 else ''}" for n in rolls]
+        print(f"  {'Pattern':28} " + " ".join(f"{header:>10}" for header in headers))
+        for pattern, chances in tables.chance_any(list_id, patterns, rolls).items():
+            print(f"  {pattern:28} " + " ".join(f"{format_percent(c):>10}" for c in chances)
+                  + f"  (1 roll: {tables.probability(list_id, pattern)})")
+
+    for item_id in tables.unknown_lists():
+        print(f"⚠ {item_id} is not a defined list; counted as an item")
+    return 1 if missing else 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
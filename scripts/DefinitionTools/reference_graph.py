@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cross-reference validator for the definition files.
+Every file is parsed once: top-level elements with an Id are registered as
+definitions, and every reference covered by REFERENCE_RULES is collected
+with its file, line and owning definition. References are then checked with
+dict lookups, so the whole check is linear in the size of the data.
+
+Usage (from the script directory):
+  python reference_graph.py [--modded-only] [--unused] [--limit N]
+
+By default modded_files is overlaid on base_files (the modded copy of a file
+replaces the base one), since some targets such as SpawnWaveDefinitions only
+exist in base_files.
+"""
+
+import sys
+import xml.parsers.expat
+
+from definition_scan import BASE_DIR, MODDED_DIR, bom_length, resolve_definition_files
+
+# (name, source file prefix, element tag, attribute or None for element text,
+#  target definition tag, target file prefix)
+REFERENCE_RULES = [
+    ('item skill', 'ItemDefinitions_', 'Skill', None, 'SkillDefinition', 'SkillDefinitions_'),
+    ('enemy damage skill', 'EnemyUnitTemplateDefinitions_', 'DamageSkillId', None,
+     'SkillDefinition', 'SkillDefinitions_'),
+    ('enemy displayed skill', 'EnemyUnitTemplateDefinitions_', 'SkillToDisplay', None,
+     'SkillDefinition', 'SkillDefinitions_'),
+    ('enemy behaviour skill', 'EnemyUnitTemplateDefinitions_', 'SkillId', 'Value',
+     'SkillDefinition', 'SkillDefinitions_'),
+    ('spawn wave', 'SpawnDefinitions', 'SpawnWaveDefinition', 'Id',
+     'SpawnWaveDefinition', 'SpawnWaveDefinitions'),
+    ('wave enemy', 'SpawnWaveDefinitions', 'EnemyUnitTemplateDefinition', 'Id',
+     'EnemyUnitTemplateDefinition', 'EnemyUnitTemplateDefinitions_'),
+]
+
+
+def scan_file(name, data, rules):
+    """Return (definitions, references, duplicates) found in one file
+
+    definitions: [(tag, id, line)] for children of the root element with an Id
+    references: [(rule, value, line, owner_id)]
+    duplicates: [(tag, id, line)] for Ids defined twice in this file
+    """
+    text_rules = {rule[2]: rule for rule in rules if rule[1] and name.startswith(rule[1]) and rule[3] is None}
+    attr_rules = {rule[2]: rule for rule in rules if rule[1] and name.startswith(rule[1]) and rule[3]}
+
+    parser = xml.parsers.expat.ParserCreate()
+    definitions = []
+    references = []
+    duplicates = []
+    seen = set()
+    state = {'depth': 0, 'owner': None, 'text': None}
+
+    def start(tag, attrs):
+        state['depth'] += 1
+        line = parser.CurrentLineNumber
+        if state['depth'] == 2:
+            state['owner'] = attrs.get('Id')
+            if 'Id' in attrs:
+                key = (tag, attrs['Id'])
+                (duplicates if key in seen else definitions).append((tag, attrs['Id'], line))
+                seen.add(key)
+                return
+        rule = attr_rules.get(tag)
+        if rule and rule[3] in attrs:
+            references.append((rule, attrs[rule[3]], line, state['owner']))
+        if tag in text_rules:
+            state['text'] = (text_rules[tag], [], line)
+
+    def end(tag):
+        state['depth'] -= 1
+        if state['text'] and tag == state['text'][0][2]:
+            rule, chunks, line = state['text']
+            value = ''.join(chunks).strip()
+            if value:
+                references.append((rule, value, line, state['owner']))
+            state['text'] = None
+
+    def characters(text):
+        if state['text']:
+            state['text'][1].append(text)
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+    parser.Parse(data[bom_length(data):], True)
+    return definitions, references, duplicates
+
+
+def build_graph(files, rules=REFERENCE_RULES):
+    """Index all definitions and collect all references in one pass over files"""
+    graph = {
+        'definitions': {},   # (tag, id) -> [(file, line)]
+        'references': [],    # (rule, value, file, line, owner_id)
+        'duplicates': [],    # (file, tag, id, line)
+        'errors': [],        # (file, message)
+        'files': len(files),
+    }
+    for name, path in files.items():
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            definitions, references, duplicates = scan_file(name, data, rules)
+        except xml.parsers.expat.ExpatError as e:
+            graph['errors'].append((name, str(e)))
+            continue
+        for tag, definition_id, line in definitions:
+            graph['definitions'].setdefault((tag, definition_id), []).append((name, line))
+        for rule, value, line, owner in references:
+            graph['references'].append((rule, value, name, line, owner))
+        for tag, definition_id, line in duplicates:
+            graph['duplicates'].append((name, tag, definition_id, line))
+    return graph
+
+
+def check_references(graph, rules=REFERENCE_RULES):
+    """Return (dangling, unused)
+
+    dangling: [(rule, value, file, line, owner_id)] for references with no target
+    unused: {file: [id]} for definitions in a rule's target files that no
+    checked reference points at
+    """
+    definitions = graph['definitions']
+    dangling = []
+    used = set()
+    for reference in graph['references']:
+        rule, value = reference[0], reference[1]
+        target_tag, target_prefix = rule[4], rule[5]
+        hits = [name for name, _ in definitions.get((target_tag, value), ()) if name.startswith(target_prefix)]
+        if hits:
+            used.update((target_tag, value, name) for name in hits)
+        else:
+            dangling.append(reference)
+
+    targets = {(rule[4], rule[5]) for rule in rules}
+    unused = {}
+    for (tag, definition_id), locations in definitions.items():
+        for name, _ in locations:
+            if (tag, definition_id, name) in used:
+                continue
+            if any(tag == t and name.startswith(prefix) for t, prefix in targets):
+                unused.setdefault(name, []).append(definition_id)
+    return dangling, dict(sorted(unused.items()))
+
+
+def main(argv):
+    base_dir = BASE_DIR
+    show_unused = False
+    limit = 20
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--modded-only':
+            base_dir = None
+        elif arg == '--unused':
+            show_unused = True
+        elif arg == '--limit':
+            limit = int(next(args))
+
+    files = resolve_definition_files(MODDED_DIR, base_dir)
+    graph = build_graph(files)
+    dangling, unused = check_references(graph)
+
+    print("=" * 80)
+    print(f"REFERENCE CHECK: {graph['files']} files, {len(graph['definitions'])} definitions, "
+          f"{len(graph['references'])} references")
+    print("=" * 80)
+
+    for name, message in graph['errors']:
+        print(f"  ⚠ {name}: not parsed ({message})")
+
+    print(f"\nDangling references: {len(dangling)}")
+    by_rule = {}
+    for reference in dangling:
+        by_rule.setdefault(reference[0][0], []).append(reference)
+    for rule_name, references in by_rule.items():
+        print(f"  {rule_name} ({len(references)}):")
+        for _, value, name, line, owner in references[:limit]:
+            print(f"    ⚠ {value} ({name}:{line}, in {owner})")
+        if len(references) > limit:
+            print(f"    ... and {len(references) - limit} more")
+
+    if graph['duplicates']:
+        print(f"\nIds defined twice in the same file: {len(graph['duplicates'])}")
+        for name, tag, definition_id, line in graph['duplicates'][:limit]:
+            print(f"    ⚠ {tag} {definition_id} ({name}:{line})")
+
+    print(f"\nUnused definitions (not referenced by any checked link): {sum(len(v) for v in unused.values())}")
+    for name, ids in unused.items():
+        print(f"  {name}: {len(ids)}")
+        if show_unused:
+            for definition_id in ids[:limit]:
+                print(f"    - {definition_id}")
+            if len(ids) > limit:
+                print(f"    ... and {len(ids) - limit} more")
+
+    return 1 if dangling else 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
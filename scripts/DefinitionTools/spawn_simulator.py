@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo spawn simulator driven by SpawnDefinitions.
+Each map's per-night data is compiled into arrays once: the spawn count
+multiplier, the SpawnsCountPerWave formula evaluated for every night, and
+padded wave and enemy probability tables. Thousands of seeded runs are then
+sampled at once with NumPy.
+
+Model, per night: the wave is drawn by weight from the
+SpawnWavesPerDayDefinition in effect (largest StartingNight <= night); the
+enemy count is SpawnsCountPerWave (Night, Multiplier) times the wave's
+SpawnsCountMultiplier, truncated; enemy templates are split by the wave's
+EnemyUnitTemplateDefinition weights plus, for each EnemyTier entry, every
+template of that tier at its own Weight times WeightMultiplier.
+
+Usage (from the script directory):
+  python spawn_simulator.py [MAP ...] [--runs 10000] [--seed 0]
+                            [--output spawn_simulation.json]
+"""
+
+import json
+import sys
+import zlib
+
+import numpy as np
+
+from definition_scan import BASE_DIR, MODDED_DIR, load_root, resolve_definition_files
+from formula import compile_formula
+
+RESULTS_FILE = 'spawn_simulation.json'
+
+# Sections a map inherits from its TemplateId unless it defines them itself
+INHERITED_SECTIONS = ('SpawnsCountMultipliers', 'SpawnsCountPerWave', 'SpawnWavesPerDayDefinitions')
+
+
+def load_spawn_data(modded_dir=MODDED_DIR, base_dir=BASE_DIR):
+    """Return (maps, waves, templates) from the definition files
+
+    maps: {map_id: <SpawnDefinition>} with inherited sections merged in
+    waves: {wave_id: <SpawnWaveDefinition>}
+    templates: {template_id: (tier, weight)}
+    """
+    files = resolve_definition_files(modded_dir, base_dir)
+
+    definitions = {d.get('Id'): d for d in load_root(files['SpawnDefinitions']).findall('SpawnDefinition')}
+    maps = {}
+    for map_id, definition in definitions.items():
+        sections = {}
+        chain = [definition]
+        while chain[-1].get('TemplateId') in definitions and len(chain) < len(definitions):
+            chain.append(definitions[chain[-1].get('TemplateId')])
+        for ancestor in reversed(chain):
+            for tag in INHERITED_SECTIONS:
+                section = ancestor.find(tag)
+                if section is not None:
+                    sections[tag] = section
+        maps[map_id] = sections
+
+    waves = {}
+    if 'SpawnWaveDefinitions' in files:
+        for wave in load_root(files['SpawnWaveDefinitions']).findall('SpawnWaveDefinition'):
+            waves[wave.get('Id')] = wave
+
+    templates = {}
+    for name, path in files.items():
+        if not name.startswith('EnemyUnitTemplateDefinitions_'):
+            continue
+        for template in load_root(path).findall('EnemyUnitTemplateDefinition'):
+            tier = template.findtext('Tier')
+            weight = template.findtext('Weight')
+            if tier is not None:
+                templates[template.get('Id')] = (int(tier), float(weight or 1))
+    return maps, waves, templates
+
+
+def per_night(section, child_tag, nights):
+    """For each night, the child of section in effect (largest StartingNight <= night)"""
+    entries = sorted(((int(child.get('StartingNight')), child) for child in section.findall(child_tag)),
+                     key=lambda entry: entry[0])
+    result = []
+    for night in nights:
+        current = None
+        for starting, child in entries:
+            if starting <= night:
+                current = child
+        result.append(current)
+    return result
+
+
+def wave_enemy_weights(wave, templates):
+    """Return {template_id: weight} for one SpawnWaveDefinition"""
+    weights = {}
+    section = wave.find('EnemyUnitTemplateDefinitions')
+    if section is None:
+        return weights
+    for entry in section:
+        if entry.tag == 'EnemyUnitTemplateDefinition':
+            weights[entry.get('Id')] = weights.get(entry.get('Id'), 0.0) + float(entry.get('Weight', 1))
+        elif entry.tag == 'EnemyTier':
+            tier = int(entry.get('Value'))
+            multiplier = float(entry.get('WeightMultiplier', 1))
+            for template_id, (template_tier, weight) in templates.items():
+                if template_tier == tier:
+                    weights[template_id] = weights.get(template_id, 0.0) + weight * multiplier
+    return weights
+
+
+def compile_map(map_id, sections, waves, templates):
+    """Compile one map into the arrays the sampler works on"""
+    night_sources = [sections[tag] for tag in ('SpawnsCountMultipliers', 'SpawnWavesPerDayDefinitions') if tag in sections]
+    last_night = max((int(child.get('StartingNight')) for section in night_sources for child in section), default=0)
+    nights = np.arange(1, last_night + 1)
+
+    multipliers = np.zeros(len(nights))
+    if 'SpawnsCountMultipliers' in sections:
+        for i, child in enumerate(per_night(sections['SpawnsCountMultipliers'], 'SpawnsCountMultiplier', nights)):
+            multipliers[i] = float(child.text) if child is not None else 0.0
+    source = sections['SpawnsCountPerWave'].text if 'SpawnsCountPerWave' in sections else '0'
+    base_counts = compile_formula(source.strip()).evaluate({'Night': nights, 'Multiplier': multipliers})
+
+    # Wave choices per night, padded to the widest night
+    choices = [[] for _ in nights]
+    missing = set()
+    if 'SpawnWavesPerDayDefinitions' in sections:
+        days = per_night(sections['SpawnWavesPerDayDefinitions'], 'SpawnWavesPerDayDefinition', nights)
+        for i, day in enumerate(days):
+            for entry in (day.findall('SpawnWaveDefinition') if day is not None else []):
+                if entry.get('Id') in waves:
+                    choices[i].append((entry.get('Id'), float(entry.get('Weight', 1))))
+                else:
+                    missing.add(entry.get('Id'))
+
+    wave_ids = sorted({wave_id for night in choices for wave_id, _ in night})
+    enemy_ids = sorted({enemy for wave_id in wave_ids for enemy in wave_enemy_weights(waves[wave_id], templates)})
+    enemy_index = {enemy: k for k, enemy in enumerate(enemy_ids)}
+    width = max((len(night) for night in choices), default=0) or 1
+
+    wave_probabilities = np.zeros((len(nights), width))
+    wave_slots = np.full((len(nights), width), -1)
+    wave_multipliers = np.zeros((len(nights), width))
+    enemy_probabilities = np.zeros((len(nights), width, max(len(enemy_ids), 1)))
+    for i, night in enumerate(choices):
+        total = sum(weight for _, weight in night)
+        for j, (wave_id, weight) in enumerate(night):
+            wave = waves[wave_id]
+            wave_probabilities[i, j] = weight / total
+            wave_slots[i, j] = wave_ids.index(wave_id)
+            wave_multipliers[i, j] = float(wave.findtext('SpawnsCountMultiplier') or 1)
+            enemy_weights = wave_enemy_weights(wave, templates)
+            enemy_total = sum(enemy_weights.values())
+            for enemy, weight in enemy_weights.items():
+                enemy_probabilities[i, j, enemy_index[enemy]] = weight / enemy_total
+
+    return {
+        'map': map_id,
+        'nights': nights,
+        'formula': source.strip(),
+        'multipliers': multipliers,
+        'base_counts': base_counts,
+        'wave_ids': wave_ids,
+        'enemy_ids': enemy_ids,
+        'wave_probabilities': wave_probabilities,
+        'wave_slots': wave_slots,
+        'wave_multipliers': wave_multipliers,
+        'enemy_probabilities': enemy_probabilities,
+        'missing_waves': sorted(missing),
+    }
+
+
+def simulate(compiled, runs, rng):
+    """Sample runs x nights at once; return (wave picks, enemy counts, expected count per enemy)
+
+    The per-enemy breakdown is the expectation given the drawn wave and
+    count (count times the wave's enemy probabilities), which has the same
+    mean as drawing every spawn without the sampling noise or cost.
+    """
+    nights = len(compiled['nights'])
+    night_index = np.arange(nights)[None, :]
+
+    # Inverse-CDF draw of the wave slot for every run and night
+    cumulative = np.cumsum(compiled['wave_probabilities'], axis=1)
+    u = rng.random((runs, nights))
+    slots = (u[:, :, None] >= cumulative[None, :, :]).sum(axis=2)
+    slots = np.minimum(slots, cumulative.shape[1] - 1)
+
+    picks = compiled['wave_slots'][night_index, slots]
+    counts = np.floor(compiled['base_counts'][None, :] * compiled['wave_multipliers'][night_index, slots]).astype(int)
+    counts[picks < 0] = 0
+
+    per_enemy = counts[:, :, None] * compiled['enemy_probabilities'][night_index, slots]
+    return picks, counts, per_enemy
+
+
+def summarize(compiled, picks, counts, per_enemy):
+    """Per-night distributions of enemy counts, wave picks and enemy types"""
+    nights = []
+    for i, night in enumerate(compiled['nights']):
+        column = counts[:, i]
+        p5, p50, p95 = np.percentile(column, [5, 50, 95])
+        wave_frequencies = {}
+        for slot in np.unique(picks[:, i]):
+            if slot >= 0:
+                wave_frequencies[compiled['wave_ids'][slot]] = round(float(np.mean(picks[:, i] == slot)), 4)
+        enemy_means = per_enemy[:, i, :].mean(axis=0)
+        nights.append({
+            'night': int(night),
+            'multiplier': float(compiled['multipliers'][i]),
+            'base_count': float(compiled['base_counts'][i]),
+            'enemies': {
+                'mean': round(float(column.mean()), 2),
+                'std': round(float(column.std()), 2),
+                'min': int(column.min()),
+                'p5': float(p5),
+                'p50': float(p50),
+                'p95': float(p95),
+                'max': int(column.max()),
+            },
+            'waves': dict(sorted(wave_frequencies.items(), key=lambda item: -item[1])),
+            'enemy_types': {enemy: round(float(mean), 2)
+                            for enemy, mean in zip(compiled['enemy_ids'], enemy_means) if mean > 0},
+        })
+    return nights
+
+
+def main(argv):
+    runs = 10000
+    seed = 0
+    output = RESULTS_FILE
+    selected = []
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--runs':
+            runs = int(next(args))
+        elif arg == '--seed':
+            seed = int(next(args))
+        elif arg == '--output':
+            output = next(args)
+        else:
+            selected.append(arg)
+
+    maps, waves, templates = load_spawn_data()
+    map_ids = selected or list(maps)
+
+    print("=" * 80)
+    print(f"SPAWN SIMULATION: {len(map_ids)} maps, {runs} runs each, seed {seed}")
+    print("=" * 80)
+
+    results = {'runs': runs, 'seed': seed, 'maps': {}}
+    for map_id in map_ids:
+        if map_id not in maps:
+            print(f"\n⚠ Unknown map {map_id}")
+            continue
+        compiled = compile_map(map_id, maps[map_id], waves, templates)
+        # Seed per map so a map's results do not depend on which other maps run
+        rng = np.random.default_rng([seed, zlib.crc32(map_id.encode())])
+        picks, counts, per_enemy = simulate(compiled, runs, rng)
+        nights = summarize(compiled, picks, counts, per_enemy)
+        results['maps'][map_id] = {'formula': compiled['formula'], 'missing_waves': compiled['missing_waves'],
+                                   'nights': nights}
+
+        print(f"\n{map_id}: {compiled['formula']}")
+        for wave_id in compiled['missing_waves']:
+            print(f"  ⚠ Wave {wave_id} not found in SpawnWaveDefinitions (ignored)")
+        print(f"  {'Night':>5} {'Mult':>5} {'Mean':>8} {'p5':>6} {'p50':>6} {'p95':>6}  Most picked wave")
+        print("  " + "-" * 78)
+        for night in nights:
+            top = next(iter(night['waves'].items()), ('-', 0))
+            e = night['enemies']
+            print(f"  {night['night']:>5} {night['multiplier']:>5g} {e['mean']:>8.1f} {e['p5']:>6g} {e['p50']:>6g} "
+                  f"{e['p95']:>6g}  {top[0]} ({top[1]:.0%})")
+
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Worst-case stat check against the Boundaries of UnitStatDefinitions.
+Every stat contribution of the definition files is gathered into one table
+of parallel columns (unit type, stat, group, source, low, high):
+
+  Playable  generation archetypes, level-ups, items per equipment slot,
+            item affixes per slot, perks
+  Enemy     unit templates (+ StatProgression up to --days), elite affixes
+  Boss      unit templates
+
+The table is sorted once and reduced with reduceat: the rows of a source
+(one item level, one template...) add up, a group takes its worst source,
+and the groups of a (unit type, stat) add up to its worst-case min and max.
+A child stat (Health) is filled from its parent (HealthTotal), so it also
+covers the parent's worst case. Perk StatBoundaryModifiers raise the
+Playable Max. Stats whose worst case crosses a boundary are flagged with
+the groups that push them there.
+
+Token values are evaluated with formula.py over days 1..--days; the ones
+that depend on runtime values (Owner.HealthTotal...) are listed as
+unresolved and left out.
+
+Usage (from the script directory):
+  python stat_boundaries.py [--days 30] [--levels 20] [--types Playable,Enemy]
+                            [--all] [--output stat_boundaries.json]
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+
+from definition_scan import BASE_DIR, MODDED_DIR, load_root, resolve_definition_files
+from elite_affixes import evaluate_tokens, load_affixes
+from formula import FormulaError, compile_formula
+from hero_generator import STAT_FILE, load_boundaries
+from levelup_simulator import load_archetypes, load_levelup_pools
+
+RESULTS_FILE = 'stat_boundaries.json'
+UNIT_TYPES = ('Playable', 'Enemy', 'Boss')
+TEMPLATE_FILES = {'EnemyUnitTemplateDefinitions_': 'Enemy', 'BossUnitTemplateDefinitions': 'Boss'}
+ITEM_BONUSES = ('BaseStatBonus', 'MainStatBonus')
+PERK_MODIFIERS = ('StatModifier', 'PermanentBaseStatModifier')
+
+# Equipment slots: the item categories ending with one of the suffixes, and how many items the slot holds
+SLOTS = {
+    'Hands': (('MeleeWeapon', 'RangeWeapon', 'MagicWeapon', 'Shield'), 2),
+    'Head': (('Helm',), 1),
+    'Body': (('BodyArmor',), 1),
+    'Feet': (('Boots',), 1),
+    'Trinket': (('Trinket',), 2),
+}
+
+
+def item_slot(category):
+    for slot, (suffixes, _) in SLOTS.items():
+        if category and category.endswith(suffixes):
+            return slot
+    return None
+
+
+def segment_starts(keys):
+    """Start rows of the runs of equal key rows in a sorted (rows, k) array"""
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(np.concatenate([[True], (keys[1:] != keys[:-1]).any(axis=1)]))
+
+
+class StatTable:
+    """Stat contributions as parallel columns, reduced to a worst case per (unit type, stat)
+
+    A group is one place a unit takes values from: its template, an
+    equipment slot, a perk, its level-ups. Required groups always apply
+    (every enemy has a template); optional ones only when they make the
+    worst case worse, count times (two trinkets, one pick per level).
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self.groups = {}
+        self.sources = {}
+        self.group_optional = []
+        self.group_count = []
+        self.rows = []
+        self.unresolved = []  # (unit type, stat, source, value text)
+
+    def group(self, name, optional=True, count=1):
+        if name not in self.groups:
+            self.groups[name] = len(self.groups)
+            self.group_optional.append(optional)
+            self.group_count.append(count)
+        return name
+
+    def add(self, unit_type, stat, group, source, low, high=None):
+        stat_id = self.stats.setdefault(stat, len(self.stats))
+        source_id = self.sources.setdefault(source, len(self.sources))
+        self.rows.append((UNIT_TYPES.index(unit_type), stat_id, self.groups[group], source_id,
+                          low, low if high is None else high))
+
+    def add_formula(self, unit_type, stat, group, source, text, tokens):
+        """Add a contribution given as a token or formula; record it as unresolved if it cannot be evaluated"""
+        try:
+            value = compile_formula(text).evaluate(tokens)
+        except FormulaError:
+            self.unresolved.append((unit_type, stat, source, text))
+            return
+        self.add(unit_type, stat, group, source, float(value.min()), float(value.max()))
+
+    def reduce(self):
+        """Return (by_source, by_group, by_stat): (keys, low, high) arrays, keys are index columns
+
+        by_source keys: type, stat, group, source; by_group: type, stat, group
+        (optional groups already clipped and counted); by_stat: type, stat.
+        """
+        data = np.array(self.rows, dtype=float).reshape(-1, 6)
+        keys = data[:, :4].astype(np.int64)
+        order = np.lexsort(keys.T[::-1])
+        keys, low, high = keys[order], data[order, 4], data[order, 5]
+
+        starts = segment_starts(keys)
+        by_source = (keys[starts], np.add.reduceat(low, starts), np.add.reduceat(high, starts))
+
+        keys, low, high = by_source
+        starts = segment_starts(keys[:, :3])
+        keys, low, high = keys[starts, :3], np.minimum.reduceat(low, starts), np.maximum.reduceat(high, starts)
+        optional = np.array(self.group_optional, dtype=bool)[keys[:, 2]]
+        count = np.array(self.group_count, dtype=float)[keys[:, 2]]
+        low = np.where(optional, np.minimum(low, 0) * count, low)
+        high = np.where(optional, np.maximum(high, 0) * count, high)
+        by_group = (keys, low, high)
+
+        starts = segment_starts(keys[:, :2])
+        by_stat = (keys[starts, :2], np.add.reduceat(low, starts), np.add.reduceat(high, starts))
+        return by_source, by_group, by_stat
+
+
+def add_generation(table):
+    table.group('Generation', optional=False)
+    for archetype, ranges in load_archetypes().items():
+        for stat, (low, high) in ranges.items():
+            table.add('Playable', stat, 'Generation', archetype, low, high)
+
+
+def add_levelups(table, levels):
+    """Every level-up can pick the same stat: levels x its biggest bonus"""
+    for pool, entries in load_levelup_pools().items():
+        group = table.group(f'Level-ups ({pool})', count=levels)
+        for stat, _, bonuses in entries:
+            table.add('Playable', stat, group, f'{pool} {stat}', min(bonuses.values()), max(bonuses.values()))
+
+
+def add_items(table, files):
+    for name in sorted(files):
+        if not name.startswith('ItemDefinitions_'):
+            continue
+        for definition in load_root(files[name]).iter('ItemDefinition'):
+            slot = item_slot(definition.findtext('Category'))
+            if slot is None:
+                continue  # Potions, scrolls
+            group = table.group(f'Items ({slot})', count=SLOTS[slot][1])
+            for level in definition.iterfind('LevelVariations/Level'):
+                for bonus in level.iter():
+                    if bonus.tag in ITEM_BONUSES:
+                        table.add('Playable', bonus.get('Stat'), group,
+                                  f"{definition.get('Id')} L{level.get('Id')}", float(bonus.text))
+
+
+def add_item_affixes(table, files):
+    """One affix per item: its best level, with and without the EpicBonus"""
+    if 'AffixDefinitions' not in files:
+        return
+    for definition in load_root(files['AffixDefinitions']).findall('AffixDefinition'):
+        slots = {item_slot(category.text) for category in definition.iterfind('ItemCategories/ItemCategory')
+                 if float(category.get('Weight', 1)) > 0} - {None}
+        epic = [(modifier.get('Stat'), float(modifier.text)) for modifier in definition.iterfind('EpicBonus/Modifier')]
+        for level in definition.iterfind('Levels/Level'):
+            modifiers = [(modifier.get('Stat'), float(modifier.text)) for modifier in level.iter('Modifier')]
+            source = f"{definition.get('Id')} L{level.get('Id')}"
+            for slot in sorted(slots):
+                group = table.group(f'Item affixes ({slot})', count=SLOTS[slot][1])
+                for stat, value in modifiers:
+                    table.add('Playable', stat, group, source, value)
+                for stat, value in modifiers + epic:
+                    table.add('Playable', stat, group, f'{source} epic', value)
+
+
+def add_perks(table, files, days):
+    """Add the perks' stat modifiers; return {stat: Max raise} of their StatBoundaryModifiers"""
+    raised = {}
+    for name in sorted(files):
+        if not name.startswith('PerkDefinitions'):
+            continue
+        for perk in load_root(files[name]).iter('PerkDefinition'):
+            perk_id = perk.get('Id')
+            tokens = evaluate_tokens([(token.get('Key'), token.get('Value'))
+                                      for token in perk.iter('TokenVariable')], days)
+            for modifier in perk.iter():
+                if modifier.tag in PERK_MODIFIERS:
+                    table.add_formula('Playable', modifier.get('Stat'), table.group(f'Perk {perk_id}'),
+                                      perk_id, modifier.get('Value'), tokens)
+                elif modifier.tag == 'StatBoundaryModifier' and modifier.get('MaxModifier'):
+                    try:
+                        value = compile_formula(modifier.get('MaxModifier')).evaluate(tokens)
+                    except FormulaError:
+                        continue
+                    raised[modifier.get('Stat')] = raised.get(modifier.get('Stat'), 0.0) + float(value.max())
+    return raised
+
+
+def progression_increases(progression, days):
+    """Increases a StatProgression has reached on each day: one every IncreaseEveryXDay days after Delay"""
+    every = max(1, int(progression.get('IncreaseEveryXDay', 1)))
+    increases = np.maximum(0, (days - int(progression.get('Delay', 0))) // every)
+    if progression.get('MaxIncreases') is not None:
+        increases = np.minimum(increases, int(progression.get('MaxIncreases')))
+    return increases
+
+
+def load_templates(files, stats):
+    """{unit type: {template Id: (file name, {stat: base value}, [StatProgression])}}
+
+    A template with a TemplateId inherits the stats it does not set, and the
+    StatsProgressions when it has none of its own.
+    """
+    raw = {}
+    for name in sorted(files):
+        unit_type = next((kind for prefix, kind in TEMPLATE_FILES.items() if name.startswith(prefix)), None)
+        if unit_type is None:
+            continue
+        for definition in load_root(files[name]).iter():
+            if not isinstance(definition.tag, str) or not definition.tag.endswith('UnitTemplateDefinition') \
+                    or definition.get('Id') is None:
+                continue
+            values = {}
+            for child in definition:
+                if child.tag in stats:
+                    try:
+                        values[child.tag] = float((child.text or '').strip() or child.get('Value'))
+                    except (TypeError, ValueError):
+                        continue
+            progressions = list(definition.iter('StatProgression'))
+            raw.setdefault(unit_type, {})[definition.get('Id')] = (
+                name, definition.get('TemplateId'), values, progressions)
+
+    def resolve(definitions, template_id, seen=()):
+        name, parent, values, progressions = definitions[template_id]
+        if parent in definitions and parent not in seen:
+            _, parent_values, parent_progressions = resolve(definitions, parent, seen + (template_id,))
+            values = {**parent_values, **values}
+            progressions = progressions or parent_progressions
+        return name, values, progressions
+
+    return {unit_type: {template_id: resolve(definitions, template_id) for template_id in definitions}
+            for unit_type, definitions in raw.items()}
+
+
+def add_templates(table, files, stats, days, boundaries):
+    """Template stats plus their StatProgressions; a stat a template only progresses starts at its Boundaries Min"""
+    table.group('Template', optional=False)
+    for unit_type, templates in load_templates(files, stats).items():
+        for template_id, (name, values, progressions) in templates.items():
+            source = f"{template_id} ({name})"
+            for stat, value in values.items():
+                table.add(unit_type, stat, 'Template', source, value)
+            for progression in progressions:
+                stat = progression.get('Id')
+                if stat not in values and stat in boundaries[unit_type]:
+                    values[stat] = boundaries[unit_type][stat][0]
+                    table.add(unit_type, stat, 'Template', source, values[stat])
+                increases = progression_increases(progression, days) * float(progression.text)
+                table.add(unit_type, stat, 'Template', source, float(increases.min()), float(increases.max()))
+
+
+def add_elite_affixes(table, files, days):
+    """Every elite affix, whatever the apocalypse flags: one on the elite, one aura from a neighbour"""
+    if 'EnemyAffixDefinitions' not in files:
+        return
+    for affix in load_affixes(files):
+        tokens = evaluate_tokens(affix['tokens'], days)
+        for stat, target, text in affix['modifiers']:
+            group = table.group('Elite affix' if target == 'self' else 'Elite aura')
+            table.add_formula('Enemy', stat, group, affix['id'], text, tokens)
+
+
+def load_parents(files):
+    """{child stat: parent stat} of the ParentStat links"""
+    return {definition.get('Id'): definition.get('ParentStat')
+            for definition in load_root(files[STAT_FILE]).findall('UnitStatDefinition')
+            if definition.get('ParentStat')}
+
+
+def build_table(files, days, levels, boundaries):
+    """Gather every stat contribution; return (table, {stat: Playable Max raise})"""
+    table = StatTable()
+    stats = {definition.get('Id') for definition in load_root(files[STAT_FILE]).findall('UnitStatDefinition')}
+    add_generation(table)
+    add_levelups(table, levels)
+    add_items(table, files)
+    add_item_affixes(table, files)
+    raised = add_perks(table, files, days)
+    add_templates(table, files, stats, days, boundaries)
+    add_elite_affixes(table, files, days)
+    return table, raised
+
+
+def main(argv):
+    day_count = 30
+    levels = 20
+    selected = list(UNIT_TYPES)
+    show_all = False
+    output = RESULTS_FILE
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--days':
+            day_count = int(next(args))
+        elif arg == '--levels':
+            levels = int(next(args))
+        elif arg == '--types':
+            selected = next(args).split(',')
+        elif arg == '--all':
+            show_all = True
+        elif arg == '--output':
+            output = next(args)
+
+    files = resolve_definition_files(MODDED_DIR, BASE_DIR)
+    days = np.arange(1, day_count + 1, dtype=float)
+    boundaries = {unit_type: load_boundaries(unit_type=unit_type) for unit_type in UNIT_TYPES}
+    start = time.perf_counter()
+    table, raised = build_table(files, days, levels, boundaries)
+    gathered = time.perf_counter() - start
+    by_source, by_group, by_stat = table.reduce()
+    reduced = time.perf_counter() - start - gathered
+
+    stat_names = list(table.stats)
+    group_names = list(table.groups)
+    source_names = list(table.sources)
+    worst = {(UNIT_TYPES[t], stat_names[s]): [low, high] for (t, s), low, high in zip(*by_stat)}
+    parents = load_parents(files)
+    for (unit_type, stat), bounds in list(worst.items()):
+        # A child stat is filled from its parent (Health from HealthTotal)
+        for child in [child for child, parent in parents.items() if parent == stat]:
+            entry = worst.setdefault((unit_type, child), [0.0, 0.0])
+            entry[0], entry[1] = min(entry[0], bounds[0]), max(entry[1], bounds[1])
+    for stat, value in raised.items():
+        if stat in boundaries['Playable']:
+            low, high = boundaries['Playable'][stat]
+            boundaries['Playable'][stat] = (low, high + value)
+
+    def pushes(unit_type, stat, side):
+        """[(group, contribution, worst source)] pushing the stat towards side ('min' or 'max')"""
+        if stat not in table.stats:
+            return []
+        t, s = UNIT_TYPES.index(unit_type), table.stats[stat]
+        keys, low, high = by_group
+        found = []
+        for g in np.flatnonzero((keys[:, 0] == t) & (keys[:, 1] == s)):
+            value = high[g] if side == 'max' else low[g]
+            if value == 0:
+                continue
+            source_keys, source_low, source_high = by_source
+            rows = np.flatnonzero((source_keys[:, :3] == keys[g]).all(axis=1))
+            best = rows[np.argmax(source_high[rows])] if side == 'max' else rows[np.argmin(source_low[rows])]
+            found.append((group_names[keys[g, 2]], float(value), source_names[source_keys[best, 3]]))
+        return sorted(found, key=lambda entry: -abs(entry[1]))
+
+    print("=" * 80)
+    print(f"STAT BOUNDARIES: {len(table.rows)} contributions, {len(table.groups)} groups, "
+          f"{day_count} days, {levels} levels")
+    print(f"Gathered in {1000 * gathered:.0f} ms, reduced in {1000 * reduced:.1f} ms")
+    print("=" * 80)
+
+    results = {'days': day_count, 'levels': levels, 'raised': raised, 'types': {},
+               'unresolved': [list(entry) for entry in table.unresolved]}
+    exit_code = 0
+    for unit_type in selected:
+        if unit_type not in UNIT_TYPES:
+            print(f"⚠ Unknown unit type {unit_type}")
+            exit_code = 1
+            continue
+        stats = sorted(stat for kind, stat in worst if kind == unit_type)
+        entries = {}
+        flagged = []
+        missing = []
+        for stat in stats:
+            low, high = worst[(unit_type, stat)]
+            entry = {'min': low, 'max': high}
+            bounds = boundaries[unit_type].get(stat)
+            if bounds is None:
+                missing.append(stat)
+            else:
+                entry['boundaries'] = list(bounds)
+                entry['crosses'] = [side for side, crossed in (('min', low < bounds[0]), ('max', high > bounds[1]))
+                                    if crossed]
+                if entry['crosses']:
+                    flagged.append(stat)
+            entries[stat] = entry
+        results['types'][unit_type] = entries
+
+        print(f"\n{unit_type}: {len(stats)} stats, {len(flagged)} can cross a boundary")
+        print(f"  {'Stat':28} {'Worst min':>10} {'Worst max':>10}  {'Boundaries':>18}")
+        for stat in stats:
+            entry = entries[stat]
+            if not show_all and stat not in flagged:
+                continue
+            bounds = entry.get('boundaries')
+            bounds_text = f"{bounds[0]:g} .. {bounds[1]:g}" if bounds else '-'
+            print(f"  {stat:28} {entry['min']:>10g} {entry['max']:>10g}  {bounds_text:>18}"
+                  + ("  ⚠ " + ", ".join(entry['crosses']) if entry.get('crosses') else ''))
+            if entry.get('crosses') and stat in parents:
+                print(f"      filled from {parents[stat]}")
+            for side in entry.get('crosses', []):
+                for group, value, source in pushes(unit_type, stat, side)[:3]:
+                    print(f"      {side}: {group:32} {value:+10g}  ({source})")
+        if missing:
+            print(f"  ⚠ No {unit_type} Boundaries for {', '.join(missing)}")
+        if flagged:
+            exit_code = 1
+        else:
+            print("  ✓ Every worst case is within its Boundaries")
+
+    if table.unresolved:
+        print(f"\n⚠ {len(table.unresolved)} contributions depend on runtime values and are left out, e.g.")
+        for unit_type, stat, source, text in table.unresolved[:5]:
+            print(f"  {unit_type:8} {stat:24} {source:28} {text}")
+
+    with open(output, 'w') as f:
+        json.dump(results, f)
+    print(f"\nWorst cases saved to {output}")
+    return exit_code
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
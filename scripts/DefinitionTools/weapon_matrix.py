@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar weapon balance matrix.
+Loads every weapon item (Category MeleeWeapon, RangeWeapon or MagicWeapon)
+from the weapon item files into one float array indexed
+weapon x variant x level x column, where a weapon is the item Id without its
+trailing variant digits (Sword3 -> Sword, variant 3) and the columns are
+DamageMin, DamageMax, BasePrice and one per BaseStatBonus stat. Missing
+entries are NaN. Derived metrics are plain array operations on top of it.
+
+Usage (from the script directory):
+  python weapon_matrix.py [--output weapon_matrix.npz] [--weapons Sword,Axe]
+"""
+
+import os
+import re
+import sys
+import warnings
+
+import numpy as np
+
+from definition_scan import MODDED_DIR, load_root
+
+WEAPON_FILES = ['ItemDefinitions_Weapons', 'ItemDefinitions_DLC1', 'ItemDefinitions_DLC2']
+WEAPON_CATEGORIES = ('MeleeWeapon', 'RangeWeapon', 'MagicWeapon')
+BASE_COLUMNS = ['DamageMin', 'DamageMax', 'BasePrice']
+RESULTS_FILE = 'weapon_matrix.npz'
+
+_VARIANT_ID = re.compile(r'^(.*?)(\d+)$')
+
+
+class WeaponMatrix:
+    """weapon x variant x level x column array with its axis labels"""
+
+    def __init__(self, weapons, categories, columns, values):
+        self.weapons = weapons
+        self.categories = categories
+        self.columns = columns
+        self.values = values
+        self._weapon_index = {name: i for i, name in enumerate(weapons)}
+        self._column_index = {name: i for i, name in enumerate(columns)}
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def column(self, name):
+        """weapon x variant x level view of one column"""
+        return self.values[..., self._column_index[name]]
+
+    def weapon(self, name):
+        """variant x level x column view of one weapon"""
+        return self.values[self._weapon_index[name]]
+
+    def select(self, weapons):
+        """New matrix restricted to some weapons, in the given order"""
+        rows = [self._weapon_index[name] for name in weapons]
+        return WeaponMatrix([self.weapons[i] for i in rows], [self.categories[i] for i in rows],
+                            self.columns, self.values[rows])
+
+    def save(self, path=RESULTS_FILE):
+        np.savez_compressed(path, weapons=np.array(self.weapons), categories=np.array(self.categories),
+                            columns=np.array(self.columns), values=self.values)
+        return path
+
+    @classmethod
+    def load(cls, path=RESULTS_FILE):
+        with np.load(path) as data:
+            return cls(data['weapons'].tolist(), data['categories'].tolist(), data['columns'].tolist(), data['values'])
+
+
+def load_weapon_matrix(modded_dir=MODDED_DIR, files=WEAPON_FILES):
+    """Read the weapon item files into a WeaponMatrix"""
+    entries = []  # (weapon, variant, level, {column: value})
+    categories = {}
+    stats = []
+    for name in files:
+        for item in load_root(os.path.join(modded_dir, name)).findall('ItemDefinition'):
+            category = item.findtext('Category')
+            match = _VARIANT_ID.match(item.get('Id', ''))
+            if category not in WEAPON_CATEGORIES or not match:
+                continue
+            weapon, variant = match.group(1), int(match.group(2))
+            categories.setdefault(weapon, category)
+            for level in item.iter('Level'):
+                row = {}
+                damage = level.find('BaseDamage')
+                if damage is not None:
+                    row['DamageMin'] = float(damage.get('Min'))
+                    row['DamageMax'] = float(damage.get('Max'))
+                price = level.findtext('BasePrice')
+                if price is not None:
+                    row['BasePrice'] = float(price)
+                for bonus in level.iter('BaseStatBonus'):
+                    stat = bonus.get('Stat')
+                    if stat not in stats:
+                        stats.append(stat)
+                    row[stat] = row.get(stat, 0.0) + float(bonus.text)
+                entries.append((weapon, variant, int(level.get('Id')), row))
+
+    weapons = list(categories)
+    columns = BASE_COLUMNS + sorted(stats)
+    weapon_index = {name: i for i, name in enumerate(weapons)}
+    column_index = {name: i for i, name in enumerate(columns)}
+    variants = max((variant for _, variant, _, _ in entries), default=-1) + 1
+    levels = max((level for _, _, level, _ in entries), default=-1) + 1
+
+    values = np.full((len(weapons), variants, levels, len(columns)), np.nan)
+    for weapon, variant, level, row in entries:
+        cell = values[weapon_index[weapon], variant, level]
+        # A level that exists has no bonus for stats it does not list
+        cell[len(BASE_COLUMNS):] = 0.0
+        for column, value in row.items():
+            cell[column_index[column]] = value
+    return WeaponMatrix(weapons, [categories[w] for w in weapons], columns, values)
+
+
+def average_damage(matrix):
+    return (matrix.column('DamageMin') + matrix.column('DamageMax')) / 2
+
+
+def damage_per_price(matrix):
+    price = matrix.column('BasePrice')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(price > 0, average_damage(matrix) / price, np.nan)
+
+
+def level_growth(values):
+    """Ratio of each level to the previous one (last axis is the level)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return values[..., 1:] / values[..., :-1]
+
+
+def variant_growth(values):
+    """Ratio of each variant to the previous one at the same level (weapon x variant x level input)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return values[:, 1:, :] / values[:, :-1, :]
+
+
+def summarize(matrix):
+    """One row of headline numbers per weapon"""
+    damage = average_damage(matrix)
+    per_price = damage_per_price(matrix)
+    level_ratio = level_growth(damage)
+    variant_ratio = variant_growth(damage)
+    rows = []
+    with warnings.catch_warnings():
+        # nanmean of weapons with a single variant
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for i, weapon in enumerate(matrix.weapons):
+            present = ~np.isnan(damage[i])
+            if not present.any():
+                continue
+            top_variant, top_level = np.argwhere(present)[-1]
+            rows.append({
+                'weapon': weapon,
+                'category': matrix.categories[i],
+                'variants': int(present.any(axis=1).sum()),
+                'damage_base': float(damage[i, 0, 0]),
+                'damage_top': float(damage[i, top_variant, top_level]),
+                'damage_per_price_base': float(per_price[i, 0, 0]),
+                'damage_per_price_top': float(per_price[i, top_variant, top_level]),
+                'level_growth': float(np.nanmean(level_ratio[i])),
+                'variant_growth': float(np.nanmean(variant_ratio[i])) if variant_ratio.shape[1] else float('nan'),
+            })
+    return rows
+
+
+def main(argv):
+    output = RESULTS_FILE
+    selected = None
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--output':
+            output = next(args)
+        elif arg == '--weapons':
+            selected = next(args).split(',')
+
+    matrix = load_weapon_matrix()
+    if selected:
+        matrix = matrix.select(selected)
+    weapons, variants, levels, columns = matrix.shape
+
+    print("=" * 80)
+    print(f"WEAPON MATRIX: {weapons} weapons x {variants} variants x {levels} levels x {columns} columns")
+    print("=" * 80)
+    print(f"{'Weapon':22} {'Var':>3} {'Dmg 0/0':>8} {'Dmg top':>8} {'Dmg/$ 0':>8} {'Dmg/$ top':>9} "
+          f"{'Lvl gr.':>8} {'Var gr.':>8}")
+    print("-" * 80)
+    for row in summarize(matrix):
+        print(f"{row['weapon']:22} {row['variants']:>3} {row['damage_base']:>8.1f} {row['damage_top']:>8.1f} "
+              f"{row['damage_per_price_base']:>8.2f} {row['damage_per_price_top']:>9.2f} "
+              f"{row['level_growth']:>8.3f} {row['variant_growth']:>8.3f}")
+
+    matrix.save(output)
+    print(f"\nMatrix saved to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
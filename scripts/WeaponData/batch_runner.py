@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Process-pool batch runner over the definition files in modded_files.
+Each worker parses one file, applies a per-file transform, serializes the
+result if the transform changed it, and returns a structured result. Files
+are submitted largest first so the pool stays balanced.
+
+Usage (from the script directory):
+  python batch_runner.py [summary|reformat|module:function] [--workers N]
+                         [--files NAME[,NAME...] ...] [--write]
+
+A transform is a top-level function transform(root, file_path) returning a
+dict; set 'changed': True in it when the tree was modified. Without --write
+changed files are only serialized, never written. --files takes names up to
+the next -- option; a name that is not in modded_files is reported as that
+file's error.
+"""
+
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from document_session import DocumentSession, indent_xml
+
+MODDED_DIR = '../../modded_files'
+RESULTS_FILE = 'batch_results.json'
+
+
+def list_definition_files(modded_dir=MODDED_DIR):
+    """Return every definition file in modded_dir, sorted by name"""
+    return [
+        os.path.join(modded_dir, name)
+        for name in sorted(os.listdir(modded_dir))
+        if not name.startswith('.') and os.path.isfile(os.path.join(modded_dir, name))
+    ]
+
+
+def summarize_definitions(root, file_path):
+    """Read-only transform: count the top-level definitions by tag"""
+    counts = {}
+    for child in root:
+        if isinstance(child.tag, str):
+            counts[child.tag] = counts.get(child.tag, 0) + 1
+    return {'changed': False, 'root': root.tag, 'definitions': counts}
+
+
+def reformat_definitions(root, file_path):
+    """Re-indent the whole tree (comments are kept)"""
+    indent_xml(root)
+    return {'changed': True}
+
+
+TRANSFORMS = {
+    'summary': summarize_definitions,
+    'reformat': reformat_definitions,
+}
+
+
+def resolve_transform(name):
+    """Look up a built-in transform or import one given as module:function"""
+    if name in TRANSFORMS:
+        return TRANSFORMS[name]
+    module_name, _, func_name = name.partition(':')
+    if not func_name:
+        raise ValueError(f"Unknown transform '{name}' (use one of {sorted(TRANSFORMS)} or module:function)")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def process_file(file_path, transform, write=False):
+    """Worker: parse, transform and serialize one definition file"""
+    start = time.perf_counter()
+    result = {'file': file_path, 'changed': False, 'bytes_written': 0, 'error': None}
+    try:
+        session = DocumentSession()
+        tree = session.get(file_path)
+        summary = transform(tree.getroot(), file_path) or {}
+        result['changed'] = bool(summary.pop('changed', False))
+        result['result'] = summary
+        if result['changed']:
+            session.mark_dirty(file_path)
+            if write:
+                result['bytes_written'] = sum(size for _, _, size in session.save())
+            else:
+                result['bytes_serialized'] = len(session.serialize(file_path))
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['elapsed'] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def missing_file_result(file_path):
+    """Structured result for a file that does not exist (it is never submitted)"""
+    return {'file': file_path, 'changed': False, 'bytes_written': 0,
+            'error': f"FileNotFoundError: no such file: '{file_path}'", 'elapsed': 0.0}
+
+
+def run_batch(transform, file_paths=None, workers=None, write=False):
+    """Fan a transform out over files with a process pool
+
+    Results come back in the order of file_paths. workers=1 runs inline,
+    which is handy for debugging a transform.
+    """
+    if file_paths is None:
+        file_paths = list_definition_files()
+    existing = [path for path in file_paths if os.path.isfile(path)]
+    results = {path: missing_file_result(path) for path in file_paths if not os.path.isfile(path)}
+    if workers == 1:
+        results.update((path, process_file(path, transform, write)) for path in existing)
+        return [results[path] for path in file_paths]
+
+    # Largest files first so no worker is left with a big file at the end
+    ordered = sorted(existing, key=os.path.getsize, reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {path: pool.submit(process_file, path, transform, write) for path in ordered}
+        results.update((path, future.result()) for path, future in futures.items())
+    return [results[path] for path in file_paths]
+
+
+def main(argv):
+    transform_name = 'summary'
+    workers = None
+    names = []
+    write = False
+    in_files = False
+
+    args = iter(argv)
+    for arg in args:
+        if arg.startswith('--'):
+            in_files = arg == '--files'
+        if arg == '--workers':
+            workers = int(next(args))
+        elif arg == '--write':
+            write = True
+        elif arg == '--files':
+            pass
+        elif in_files:
+            names.extend(name for name in arg.split(',') if name)
+        else:
+            transform_name = arg
+
+    transform = resolve_transform(transform_name)
+    file_paths = [os.path.join(MODDED_DIR, n) for n in names] if names else list_definition_files()
+
+    print("=" * 80)
+    print(f"BATCH RUN: {transform_name} over {len(file_paths)} files")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    results = run_batch(transform, file_paths, workers, write)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        name = os.path.basename(result['file'])
+        if result['error']:
+            print(f"  ⚠ {name}: {result['error']}")
+        elif result['changed']:
+            action = f"wrote {result['bytes_written']} bytes" if write else f"{result['bytes_serialized']} bytes (dry run)"
+            print(f"  ✓ {name}: changed, {action} [{result['elapsed']}s]")
+        else:
+            print(f"  ✓ {name}: unchanged [{result['elapsed']}s]")
+
+    errors = sum(1 for r in results if r['error'])
+    changed = sum(1 for r in results if r['changed'])
+    print(f"\n{len(results)} files, {changed} changed, {errors} errors in {elapsed:.2f}s")
+
+    with open(RESULTS_FILE, 'w') as f:
+        json.dump({'transform': transform_name, 'write': write, 'elapsed': round(elapsed, 4),
+                   'results': results}, f, indent=2)
+    print(f"Results saved to {RESULTS_FILE}")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the weapon data pipeline.
+Times each phase of extract_from_excel.py (Excel load, damage update, stat
+bonus update, scroll update, reformat/save) on a copy of the real modded
+files and on synthetic corpora scaled 10x and 100x, and writes the timings
+to a machine-readable JSON file so runs can be compared.
+
+Usage (from the script directory):
+  python benchmark.py [--scales 1,10,100] [--repeat 3]
+                      [--output benchmark_results.json] [--baseline old.json]
+                      [--regenerate]
+
+Scaled corpora are generated once into benchmark_corpora/scale_N. Every
+weapon sheet is copied N-1 times and every weapon item is cloned once per
+copy, with Ids that resolve to the copied sheet; scroll items are
+duplicated N times. Each repeat runs on a fresh copy of the corpus, so the
+real modded files are never touched.
+"""
+
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+import extract_from_excel as pipeline
+from document_session import DocumentSession
+from name_index import lower_alnum
+
+CORPUS_DIR = 'benchmark_corpora'
+RESULTS_FILE = 'benchmark_results.json'
+PHASES = ['excel_load', 'excel_load_cached', 'build_indexes', 'parse', 'damage_update',
+          'stat_bonus_update', 'scroll_update', 'reformat']
+
+# A phase whose best time is more than this much slower than the baseline's is flagged
+REGRESSION_THRESHOLD = 1.25
+
+
+def letter_tag(k):
+    """Encode k as lower-case letters (no digits, so item variant ids survive)"""
+    tag = ''
+    while True:
+        k, rem = divmod(k, 26)
+        tag = chr(ord('a') + rem) + tag
+        if k == 0:
+            return tag
+
+
+def corpus_files():
+    return pipeline.WEAPON_FILES + [pipeline.USABLES_FILE]
+
+
+def generate_corpus(scale, regenerate=False):
+    """Build (or reuse) the scale-N corpus and return its manifest"""
+    corpus_path = os.path.join(CORPUS_DIR, f'scale_{scale}')
+    manifest_path = os.path.join(corpus_path, 'manifest.json')
+    if scale == 1:
+        return {
+            'scale': 1,
+            'workbook': pipeline.WORKBOOK_PATH,
+            'modded_dir': pipeline.MODDED_DIR,
+            'sheet_names': list(pipeline.weapon_sheets),
+        }
+    if os.path.exists(manifest_path) and not regenerate:
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    import openpyxl
+
+    print(f"Generating scale {scale} corpus in {corpus_path}...")
+    shutil.rmtree(corpus_path, ignore_errors=True)
+    os.makedirs(os.path.join(corpus_path, 'modded_files'))
+
+    # Resolve every weapon base against the real workbook sheets
+    with contextlib.redirect_stdout(io.StringIO()):
+        extraction = pipeline.run_excel_phases(pipeline.WORKBOOK_PATH, use_cache=False)
+    ctx = pipeline.build_context(extraction)
+
+    # Cached values, not formulas: a saved copy loses the formula results
+    # (e.g. new min damage =ROUND(F7*H7,0)) that the extraction reads
+    wb = openpyxl.load_workbook(pipeline.WORKBOOK_PATH, data_only=True)
+    sheet_names = list(pipeline.weapon_sheets)
+    for sheet in pipeline.weapon_sheets:
+        if sheet not in wb.sheetnames:
+            continue
+        for k in range(1, scale):
+            ws = wb.copy_worksheet(wb[sheet])
+            ws.title = f'{sheet} {letter_tag(k)}'
+            sheet_names.append(ws.title)
+    workbook_path = os.path.join(corpus_path, 'tls_weapon_docs.xlsx')
+    wb.save(workbook_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        scaled = pipeline.run_excel_phases(workbook_path, use_cache=False, sheet_names=sheet_names)
+    assert scaled['weapon_data'], f"No weapon damage data extracted from {workbook_path}"
+
+    for name in pipeline.WEAPON_FILES:
+        tree = ET.parse(os.path.join(pipeline.MODDED_DIR, name))
+        root = tree.getroot()
+        for item in list(root.findall('ItemDefinition')):
+            item_id = item.get('Id', '')
+            base = item_id.rstrip('0123456789')
+            sheet = pipeline.find_excel_weapon_name(ctx, base)
+            if not base or not sheet or sheet not in pipeline.weapon_sheets:
+                continue
+            # Clone ids normalize to the copied sheet name, e.g. "1h Axe b" <- "1hAxeB2"
+            for k in range(1, scale):
+                clone = copy.deepcopy(item)
+                clone.set('Id', f'{lower_alnum(sheet)}{letter_tag(k).capitalize()}{item_id[len(base):]}')
+                root.append(clone)
+        tree.write(os.path.join(corpus_path, 'modded_files', name), encoding='utf-8', xml_declaration=True)
+
+    tree = ET.parse(os.path.join(pipeline.MODDED_DIR, pipeline.USABLES_FILE))
+    root = tree.getroot()
+    for item in list(root.findall('ItemDefinition')):
+        for _ in range(1, scale):
+            root.append(copy.deepcopy(item))
+    tree.write(os.path.join(corpus_path, 'modded_files', pipeline.USABLES_FILE),
+               encoding='utf-8', xml_declaration=True)
+
+    manifest = {
+        'scale': scale,
+        'workbook': workbook_path,
+        'modded_dir': os.path.join(corpus_path, 'modded_files'),
+        'sheet_names': sheet_names,
+    }
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def describe_corpus(manifest):
+    """Size statistics recorded next to the timings"""
+    total_bytes = 0
+    items = 0
+    for name in corpus_files():
+        path = os.path.join(manifest['modded_dir'], name)
+        total_bytes += os.path.getsize(path)
+        items += len(ET.parse(path).getroot().findall('ItemDefinition'))
+    return {
+        'files': len(corpus_files()),
+        'xml_bytes': total_bytes,
+        'items': items,
+        'weapon_sheets': len(manifest['sheet_names']),
+        'workbook_bytes': os.path.getsize(manifest['workbook']),
+    }
+
+
+def run_once(manifest, work_dir):
+    """Run every phase once on a fresh copy of the corpus; return phase timings"""
+    modded_dir = os.path.join(work_dir, 'modded_files')
+    shutil.copytree(manifest['modded_dir'], modded_dir)
+    cache_path = os.path.join(work_dir, 'extraction_cache.json')
+    weapon_files = [os.path.join(modded_dir, name) for name in pipeline.WEAPON_FILES]
+    usables_path = os.path.join(modded_dir, pipeline.USABLES_FILE)
+
+    timings = {}
+    counts = {}
+
+    def timed(phase, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[phase] = time.perf_counter() - start
+        return result
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        extraction = timed('excel_load', pipeline.run_excel_phases, manifest['workbook'],
+                           cache_path=cache_path, sheet_names=manifest['sheet_names'])
+        timed('excel_load_cached', pipeline.run_excel_phases, manifest['workbook'],
+              cache_path=cache_path, sheet_names=manifest['sheet_names'])
+        ctx = timed('build_indexes', pipeline.build_context, extraction)
+
+        session = DocumentSession()
+        timed('parse', lambda: [session.get(path) for path in weapon_files + [usables_path]])
+        counts['damage_updates'], _ = timed('damage_update', pipeline.run_damage_phase, ctx, session, weapon_files)
+        counts['stat_bonus_updates'], _ = timed('stat_bonus_update', pipeline.run_stat_bonus_phase, ctx, session, weapon_files)
+        counts['scroll_updates'], _, _ = timed('scroll_update', pipeline.run_scroll_phase, ctx, session, usables_path)
+        timed('reformat', pipeline.run_reformat_phase, session, weapon_files + [usables_path])
+
+    return timings, counts
+
+
+def benchmark_corpus(manifest, repeat):
+    runs = []
+    counts = {}
+    for _ in range(repeat):
+        work_dir = tempfile.mkdtemp(prefix='weapon_bench_')
+        try:
+            timings, counts = run_once(manifest, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        runs.append(timings)
+
+    phases = {}
+    for phase in PHASES:
+        samples = [run[phase] for run in runs]
+        phases[phase] = {
+            'min': round(min(samples), 6),
+            'median': round(statistics.median(samples), 6),
+            'mean': round(statistics.mean(samples), 6),
+            'runs': [round(s, 6) for s in samples],
+        }
+    total = [sum(run[phase] for phase in PHASES if phase != 'excel_load_cached') for run in runs]
+    return {
+        'corpus': describe_corpus(manifest),
+        'phases': phases,
+        'total_median': round(statistics.median(total), 6),
+        'counts': counts,
+    }
+
+
+def compare_with_baseline(results, baseline):
+    """Print best-time ratios against a previous results file; return regression count"""
+    regressions = 0
+    print(f"\nComparison with baseline ({baseline.get('timestamp', '?')}):")
+    for corpus_name, corpus in results['corpora'].items():
+        old_corpus = baseline.get('corpora', {}).get(corpus_name)
+        if not old_corpus:
+            print(f"  {corpus_name}: not in baseline")
+            continue
+        for phase, stats in corpus['phases'].items():
+            old = old_corpus['phases'].get(phase)
+            if not old or not old['min']:
+                continue
+            ratio = stats['min'] / old['min']
+            flag = ''
+            if ratio > REGRESSION_THRESHOLD:
+                flag = '  ⚠ REGRESSION'
+                regressions += 1
+            print(f"  {corpus_name:10} {phase:18} {old['min']:.4f}s -> {stats['min']:.4f}s ({ratio:.2f}x){flag}")
+    return regressions
+
+
+def main(argv):
+    scales = [1, 10, 100]
+    repeat = 3
+    output = RESULTS_FILE
+    baseline_path = None
+    regenerate = False
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--scales':
+            scales = [int(v) for v in next(args).split(',')]
+        elif arg == '--repeat':
+            repeat = int(next(args))
+        elif arg == '--output':
+            output = next(args)
+        elif arg == '--baseline':
+            baseline_path = next(args)
+        elif arg == '--regenerate':
+            regenerate = True
+
+    print("=" * 80)
+    print(f"WEAPON PIPELINE BENCHMARK: scales {scales}, {repeat} repeats")
+    print("=" * 80)
+
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'corpora': {},
+    }
+    for scale in scales:
+        manifest = generate_corpus(scale, regenerate)
+        corpus_name = 'real' if scale == 1 else f'scale_{scale}'
+        corpus = benchmark_corpus(manifest, repeat)
+        results['corpora'][corpus_name] = corpus
+
+        info = corpus['corpus']
+        print(f"\n{corpus_name}: {info['items']} items, {info['xml_bytes']} XML bytes, {info['weapon_sheets']} weapon sheets")
+        for phase, stats in corpus['phases'].items():
+            print(f"  {phase:18} median {stats['median']:.4f}s  min {stats['min']:.4f}s")
+        print(f"  {'total':18} median {corpus['total_median']:.4f}s")
+
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if compare_with_baseline(results, baseline):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
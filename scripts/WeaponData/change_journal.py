@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Change journal for the weapon data scripts.
+Every save of a DocumentSession that has a journal appends one entry: the
+Change records (file, definition Id, level, field, old, new) of the files it
+is about to write. The entry is written before the files are renamed into
+place, so an interrupted save can still be undone. Undo applies an entry's
+changes backwards and replay applies them forwards again; both only touch the
+recorded fields and are themselves journaled, so an undo can be undone.
+
+A change whose field already holds the target value is counted as already
+applied; one that holds neither value is a conflict, and a file with a
+conflict is left untouched.
+
+Usage (from the script directory):
+  python change_journal.py list
+  python change_journal.py show N
+  python change_journal.py undo [N] [--patch]     (default: latest entry not undone)
+  python change_journal.py replay N [--patch]
+"""
+
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+from document_session import Change, DocumentSession, compact_element
+
+JOURNAL_FILE = 'change_journal.jsonl'
+
+
+class ChangeJournal:
+    """Append-only JSON lines file, one entry per committed change-set"""
+
+    def __init__(self, path=JOURNAL_FILE, script=None):
+        self.path = path
+        self.script = script or os.path.basename(sys.argv[0])
+
+    def entries(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def entry(self, entry_id):
+        for entry in self.entries():
+            if entry['id'] == entry_id:
+                return entry
+        raise KeyError(f"No journal entry {entry_id}")
+
+    def append(self, changes, **details):
+        """Append an entry for changes and return its id"""
+        entries = self.entries()
+        entry = {
+            'id': entries[-1]['id'] + 1 if entries else 1,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'script': self.script,
+            **details,
+            'files': sorted({change.file for change in changes}),
+            'changes': [list(change) for change in changes],
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        return entry['id']
+
+    def undone(self):
+        """Ids of the entries an undo entry has reverted"""
+        return {entry['undoes'] for entry in self.entries() if 'undoes' in entry}
+
+    def latest(self):
+        """Id of the most recent entry that has not been undone, or None"""
+        undone = self.undone()
+        for entry in reversed(self.entries()):
+            if entry['id'] not in undone:
+                return entry['id']
+        return None
+
+
+def entry_changes(entry):
+    return [Change(*change) for change in entry['changes']]
+
+
+def level_index(root):
+    """{(definition Id, level Id): Level element} of a definition file"""
+    index = {}
+    for definition in root:
+        if not isinstance(definition.tag, str) or definition.get('Id') is None:
+            continue
+        for level in definition.iterfind('LevelVariations/Level'):
+            index.setdefault((definition.get('Id'), level.get('Id')), level)
+    return index
+
+
+def current_value(level, field):
+    tag, _, attribute = field.partition('@')
+    element = level.find(tag)
+    if attribute:
+        return element.get(attribute) if element is not None else None
+    return compact_element(element)
+
+
+def set_value(session, file_path, level, field, value):
+    """Set one field of a Level through the session's edit methods"""
+    tag, _, attribute = field.partition('@')
+    element = level.find(tag)
+    if not attribute:
+        session.replace_child(file_path, level, element, ET.fromstring(value) if value is not None else None)
+    elif value is not None:
+        if element is None:
+            element = ET.Element(tag)
+            session.append_child(file_path, level, element)
+        session.set_attributes(file_path, element, {attribute: value})
+    elif element is not None:
+        session.remove_attribute(file_path, element, attribute)
+        if not element.attrib and not len(element) and not (element.text or '').strip():
+            session.remove_child(file_path, level, element)  # Created by the change
+
+
+def apply_changes(session, changes, reverse=False):
+    """Apply changes (old -> new, or new -> old with reverse) to the session
+
+    Returns {file: (applied, already applied, conflicts)}. Files with a
+    conflict are discarded from the session; the others are marked dirty and
+    their applied changes recorded, ready for session.save().
+    """
+    by_file = {}
+    for change in (reversed(changes) if reverse else changes):
+        by_file.setdefault(change.file, []).append(change)
+
+    outcome = {}
+    for file_path, file_changes in by_file.items():
+        index = level_index(session.get(file_path).getroot())
+        applied, already, conflicts = [], [], []
+        for change in file_changes:
+            source, target = (change.new, change.old) if reverse else (change.old, change.new)
+            level = index.get((change.definition_id, change.level))
+            value = current_value(level, change.field) if level is not None else None
+            if level is None or value not in (source, target):
+                conflicts.append(change)
+            elif value == target:
+                already.append(change)
+            else:
+                set_value(session, file_path, level, change.field, target)
+                applied.append(change._replace(old=source, new=target))
+
+        if conflicts:
+            session.discard(file_path)
+        elif applied:
+            for change in applied:
+                session.record_change(*change)
+            session.mark_dirty(file_path)
+        outcome[file_path] = (applied, already, conflicts)
+    return outcome
+
+
+def describe_change(change):
+    def short(value):
+        if value is None:
+            return '-'
+        return value if len(value) <= 60 else value[:57] + '...'
+    return (f"{os.path.basename(change.file)} {change.definition_id} L{change.level} "
+            f"{change.field}: {short(change.old)} -> {short(change.new)}")
+
+
+def run_entry(journal, entry_id, reverse, patch):
+    """Undo (reverse) or replay one entry and save the result; return an exit code"""
+    entry = journal.entry(entry_id)
+    session = DocumentSession(patch=patch, journal=journal)
+    outcome = apply_changes(session, entry_changes(entry), reverse=reverse)
+
+    exit_code = 0
+    for file_path, (applied, already, conflicts) in outcome.items():
+        print(f"{file_path}: {len(applied)} applied, {len(already)} already applied, {len(conflicts)} conflicts")
+        for change in conflicts[:10]:
+            print(f"  ⚠ {describe_change(change)}")
+        if conflicts:
+            print("  ⚠ File left unchanged")
+            exit_code = 1
+
+    if not patch:
+        # Same layout as a full pipeline run (phase 7); imported here because
+        # extract_from_excel imports this module
+        from extract_from_excel import reformat_xml_file
+        for file_path in list(session.dirty):
+            reformat_xml_file(session, file_path)
+
+    details = {'undoes': entry_id} if reverse else {'replays': entry_id}
+    written = session.save(**details)
+    for file_path, item_count, size in written:
+        print(f"  ✓ File saved: {file_path} ({item_count} items, {size} bytes)")
+    if not written:
+        print("Nothing to write")
+    return exit_code
+
+
+def main(argv):
+    journal = ChangeJournal(script='change_journal.py')
+    patch = '--patch' in argv
+    args = [arg for arg in argv if arg != '--patch']
+    command = args[0] if args else 'list'
+
+    if command == 'list':
+        undone = journal.undone()
+        print("=" * 80)
+        print(f"CHANGE JOURNAL {journal.path}")
+        print("=" * 80)
+        for entry in journal.entries():
+            note = ''.join(f" ({key} {entry[key]})" for key in ('undoes', 'replays') if key in entry)
+            status = ' [undone]' if entry['id'] in undone else ''
+            print(f"{entry['id']:>4}  {entry['time']}  {entry['script']:22} "
+                  f"{len(entry['changes']):>5} changes in {len(entry['files'])} files{note}{status}")
+        return 0
+
+    if command == 'show':
+        for change in entry_changes(journal.entry(int(args[1]))):
+            print(describe_change(change))
+        return 0
+
+    if command == 'undo':
+        entry_id = int(args[1]) if len(args) > 1 else journal.latest()
+        if entry_id is None:
+            print("Nothing to undo")
+            return 1
+        print(f"Undoing entry {entry_id}")
+        return run_entry(journal, entry_id, reverse=True, patch=patch)
+
+    if command == 'replay' and len(args) > 1:
+        print(f"Replaying entry {args[1]}")
+        return run_entry(journal, int(args[1]), reverse=False, patch=patch)
+
+    print(__doc__)
+    return 1
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
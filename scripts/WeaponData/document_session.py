@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared XML document session for the weapon data scripts.
+Each modded definition file is parsed once, every phase works on the same
+in-memory tree, and each modified file is serialized and written exactly once
+when the session is saved. Comments inside the root element are kept.
+
+In patch mode the session also keeps the original bytes and the byte span of
+every element. Edits made through set_attributes / append_child /
+remove_child / replace_child are recorded, and saving splices only those
+spans into the original bytes: comments, prolog and formatting elsewhere are
+untouched, and files without a real change are not written.
+
+Phases describe what they change as Change records (file, definition Id,
+level, field, old, new). Saving commits each file atomically (temp file and
+rename) and, when the session has a journal, first appends the records of
+the files being written to it, so a run can be undone or replayed from its
+changes alone (see change_journal.py).
+"""
+
+import copy
+import os
+import re
+import threading
+from collections import namedtuple
+import xml.etree.ElementTree as ET
+import xml.parsers.expat as expat
+
+# Start tag of an element; group 1 is '/' when it is self-closing (same pattern
+# as DefinitionTools/definition_scan.py, kept local so the writer stands alone)
+_START_TAG = re.compile(rb'<[^\s/>]+(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*\s*(/?)>')
+_WHITESPACE = b' \t\r\n'
+
+# field is 'Tag@Attribute' for an attribute value and 'Tag' for a whole child
+# element of the Level (old/new then hold compact_element() source); None
+# means absent
+Change = namedtuple('Change', 'file definition_id level field old new')
+
+
+def scan_spans(data, root):
+    """Map every element of root (parsed from data) to its raw expat (start, end) byte indexes"""
+    elements = [element for element in root.iter() if isinstance(element.tag, str)]
+    starts = []
+    ends = [None] * len(elements)
+    stack = []
+    parser = expat.ParserCreate()
+
+    def start(tag, attrs):
+        stack.append(len(starts))
+        starts.append(parser.CurrentByteIndex)
+
+    def end(tag):
+        ends[stack.pop()] = parser.CurrentByteIndex
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.Parse(data, True)
+    return dict(zip(elements, zip(starts, ends)))
+
+
+def line_indent(data, position):
+    """Whitespace between the start of the line and position"""
+    line_start = data.rfind(b'\n', 0, position) + 1
+    indent = data[line_start:position]
+    return indent if not indent.strip() else b''
+
+
+def same_element(a, b):
+    """True when two elements have the same tag, attributes, text and children (whitespace ignored)"""
+    return (a.tag == b.tag and a.attrib == b.attrib and (a.text or '').strip() == (b.text or '').strip()
+            and len(a) == len(b) and all(same_element(x, y) for x, y in zip(a, b)))
+
+
+def format_element(element, indent, unit, newline):
+    """Serialize an element indented to sit at indent, without its tail"""
+    clone = copy.deepcopy(element)
+
+    def walk(elem, prefix):
+        if len(elem):
+            if not elem.text or not elem.text.strip():
+                elem.text = prefix + unit
+            for child in elem:
+                walk(child, prefix + unit)
+                child.tail = prefix + unit
+            child.tail = prefix
+
+    walk(clone, newline + indent)
+    clone.tail = None
+    return ET.tostring(clone, encoding='unicode').encode('utf-8')
+
+
+def compact_element(element):
+    """Source of an element without its tail and whitespace-only text, or None"""
+    if element is None:
+        return None
+    clone = copy.deepcopy(element)
+    clone.tail = None
+    for elem in clone.iter():
+        if elem is not clone and elem.tail and not elem.tail.strip():
+            elem.tail = None
+        if elem.text and not elem.text.strip() and len(elem):
+            elem.text = None
+    return ET.tostring(clone, encoding='unicode')
+
+
+def escape_attribute(value, quote):
+    value = value.replace('&', '&amp;').replace('<', '&lt;')
+    return value.replace('"', '&quot;') if quote == '"' else value.replace("'", '&apos;')
+
+
+class DocumentSession:
+    """Parse-once cache of XML definition files keyed by normalized path"""
+
+    def __init__(self, keep_comments=True, patch=False, journal=None):
+        self.keep_comments = keep_comments
+        self.patch = patch
+        self.journal = journal
+        self.changes = []  # Change records not saved yet
+        self.trees = {}
+        self.sources = {}
+        self.spans = {}
+        self.edits = {}
+        self.original_sizes = {}
+        self.dirty = []
+        self.files_read = 0
+        self.bytes_read = 0
+        self.files_written = 0
+        self.bytes_written = 0
+        # Phases on disjoint files may run on different threads (see phase_graph.py)
+        self._lock = threading.RLock()
+
+    def _key(self, file_path):
+        return os.path.normpath(file_path)
+
+    def get(self, file_path):
+        """Return the ElementTree for a file, parsing it on first access only"""
+        key = self._key(file_path)
+        with self._lock:
+            return self.trees.get(key) or self._load(key)
+
+    def _load(self, key):
+        parser = None
+        if self.keep_comments:
+            parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+        if self.patch:
+            with open(key, 'rb') as f:
+                self.sources[key] = f.read()
+            tree = ET.ElementTree(ET.fromstring(self.sources[key], parser))
+            # Scanned before any edit, while the tree is in document order
+            self.spans[key] = scan_spans(self.sources[key], tree.getroot())
+        else:
+            tree = ET.parse(key, parser)
+        self.trees[key] = tree
+        self.original_sizes[key] = os.path.getsize(key)
+        self.files_read += 1
+        self.bytes_read += self.original_sizes[key]
+        return tree
+
+    def mark_dirty(self, file_path):
+        """Flag a loaded file as modified so it is written on save"""
+        key = self._key(file_path)
+        if key not in self.trees:
+            raise KeyError(f"{file_path} was never loaded in this session")
+        with self._lock:
+            if key not in self.dirty:
+                self.dirty.append(key)
+
+    def is_dirty(self, file_path):
+        return self._key(file_path) in self.dirty
+
+    def is_loaded(self, file_path):
+        return self._key(file_path) in self.trees
+
+    def discard(self, file_path):
+        """Forget a loaded file (e.g. changed on disk) so the next get() parses it again"""
+        key = self._key(file_path)
+        for table in (self.trees, self.original_sizes, self.sources, self.spans, self.edits):
+            table.pop(key, None)
+        if key in self.dirty:
+            self.dirty.remove(key)
+        self.changes = [change for change in self.changes if change.file != key]
+
+    def record_change(self, file_path, definition_id, level, field, old, new):
+        """Describe an edit of a loaded file for the journal; returns the Change"""
+        change = Change(self._key(file_path), definition_id, level, field, old, new)
+        with self._lock:
+            self.changes.append(change)
+        return change
+
+    # Edits. Without patch mode these only change the tree; in patch mode they
+    # are also recorded so save() can splice them into the original bytes.
+
+    def _edits(self, key):
+        return self.edits.setdefault(key, {'attributes': {}, 'replaced': {}, 'inserted': []})
+
+    def _is_original(self, key, element):
+        return element in self.spans[key]
+
+    def set_attributes(self, file_path, element, values):
+        """Set attributes ({name: str}); in patch mode only their values are rewritten"""
+        for name, value in values.items():
+            element.set(name, value)
+        key = self._key(file_path)
+        if self.patch and self._is_original(key, element):
+            self._edits(key)['attributes'].setdefault(element, set()).update(values)
+
+    def remove_attribute(self, file_path, element, name):
+        """Delete an attribute; in patch mode it is cut from the start tag"""
+        if name not in element.attrib:
+            return
+        del element.attrib[name]
+        key = self._key(file_path)
+        if self.patch and self._is_original(key, element):
+            self._edits(key)['attributes'].setdefault(element, set()).add(name)
+
+    def append_child(self, file_path, parent, element):
+        """Append a new element; in patch mode it is inserted before the parent's end tag"""
+        parent.append(element)
+        key = self._key(file_path)
+        if self.patch:
+            self._edits(key)['inserted'].append((parent, element))
+
+    def remove_child(self, file_path, parent, element):
+        """Remove an element; in patch mode its line is cut from the file"""
+        self.replace_child(file_path, parent, element, None)
+
+    def replace_child(self, file_path, parent, old, new):
+        """Remove old and add new (either may be None)
+
+        Without patch mode new is appended at the end of parent, which is what
+        the full rewrite has always produced. In patch mode new takes old's
+        place, in the tree and in the file.
+        """
+        key = self._key(file_path)
+        if not self.patch:
+            if old is not None:
+                parent.remove(old)
+            if new is not None:
+                parent.append(new)
+            return
+
+        edits = self._edits(key)
+        if old is None:
+            if new is not None:
+                self.append_child(file_path, parent, new)
+            return
+        if new is not None:
+            parent.insert(list(parent).index(old), new)
+        parent.remove(old)
+        if self._is_original(key, old):
+            edits['replaced'][old] = new
+            edits['attributes'].pop(old, None)
+            return
+        for original, replacement in edits['replaced'].items():
+            if replacement is old:
+                edits['replaced'][original] = new
+                return
+        edits['inserted'] = [(p, e) for p, e in edits['inserted'] if e is not old]
+        if new is not None:
+            edits['inserted'].append((parent, new))
+
+    def _span(self, key, element):
+        """(start, start tag end, end, self-closing) byte offsets of an original element"""
+        data = self.sources[key]
+        start, end_index = self.spans[key][element]
+        match = _START_TAG.match(data, start)
+        if match.group(1):
+            return start, match.end(), match.end(), True
+        return start, match.end(), data.index(b'>', end_index) + 1, False
+
+    def patched(self, file_path):
+        """Original bytes of a file with the recorded edits spliced in (patch mode)"""
+        key = self._key(file_path)
+        data = self.sources[key]
+        edits = self.edits.get(key)
+        if not edits:
+            return data
+        newline = b'\r\n' if b'\r\n' in data else b'\n'
+        # Indentation step of the file, taken from the first element under the root
+        unit = '  '
+        first = next((e for e in self.trees[key].getroot() if isinstance(e.tag, str)), None)
+        if first is not None and self._is_original(key, first):
+            unit = line_indent(data, self._span(key, first)[0]).decode() or unit
+
+        splices = []  # (start, end, bytes)
+        for element, names in edits['attributes'].items():
+            start, start_end, _, closing = self._span(key, element)
+            for name in names:
+                value = element.get(name)
+                pattern = rb'(\s' + re.escape(name.encode()) + rb'\s*=\s*)(["\'])(.*?)\2'
+                match = re.compile(pattern, re.S).search(data, start, start_end)
+                if value is None:
+                    if match:
+                        splices.append((match.start(), match.end(), b''))
+                elif match:
+                    quote = match.group(2).decode()
+                    splices.append((match.start(3), match.end(3), escape_attribute(value, quote).encode('utf-8')))
+                else:
+                    position = start_end - (2 if closing else 1)
+                    while data[position - 1] in _WHITESPACE:
+                        position -= 1
+                    splices.append((position, position, f' {name}="{escape_attribute(value, chr(34))}"'.encode('utf-8')))
+
+        for old, new in edits['replaced'].items():
+            start, _, end, _ = self._span(key, old)
+            if new is None:
+                # Cut the element together with the whitespace that leads to it
+                cut = start
+                while cut and data[cut - 1] in _WHITESPACE:
+                    cut -= 1
+                splices.append((cut, end, b''))
+            elif not same_element(old, new):
+                indent = line_indent(data, start).decode()
+                splices.append((start, end, format_element(new, indent, unit, newline.decode())))
+
+        for parent, element in edits['inserted']:
+            if not self._is_original(key, parent):
+                continue  # Written as part of its new parent
+            start, _, end, closing = self._span(key, parent)
+            if closing:
+                raise ValueError(f"Cannot insert into self-closing <{parent.tag}> in {key}")
+            position = data.rindex(b'</', start, end)
+            while data[position - 1] in _WHITESPACE:
+                position -= 1
+            indent = line_indent(data, start).decode() + unit
+            text = newline.decode() + indent + format_element(element, indent, unit, newline.decode()).decode('utf-8')
+            splices.append((position, position, text.encode('utf-8')))
+
+        pieces = []
+        last = 0
+        for start, end, replacement in sorted(splices, key=lambda splice: (splice[0], splice[1])):
+            if start < last:
+                continue  # Inside a span that is already replaced or cut
+            pieces.append(data[last:start])
+            pieces.append(replacement)
+            last = end
+        pieces.append(data[last:])
+        return b''.join(pieces)
+
+    def serialize(self, file_path):
+        """Serialize a loaded tree to the bytes tree.write would produce"""
+        tree = self.trees[self._key(file_path)]
+        return ET.tostring(tree.getroot(), encoding='utf-8', xml_declaration=True)
+
+    def save(self, **details):
+        """Write every dirty file once, refusing writes that look truncated
+
+        Each file is written to a temporary file and renamed over the
+        original. With a journal, the changes of the files about to be
+        written are appended to it first (with details) as one entry.
+        Returns a list of (path, item_count, bytes) for the files written.
+        """
+        pending = []
+        for key in self.dirty:
+            root = self.trees[key].getroot()
+            item_count = len(root)
+            if item_count == 0:
+                print(f"  ⚠ ERROR: Tree is empty, aborting write for {key}")
+                continue
+
+            data = self.patched(key) if self.patch else self.serialize(key)
+            if self.patch and data == self.sources[key]:
+                continue  # No real change
+            original_size = self.original_sizes[key]
+            if len(data) < original_size * 0.5:  # File would shrink by more than 50%
+                print(f"  ⚠ ERROR: File size would drop from {original_size} to {len(data)} bytes - aborting write for {key}")
+                continue
+
+            pending.append((key, item_count, data))
+
+        keys = [key for key, _, _ in pending]
+        changes = [change for change in self.changes if change.file in keys]
+        if self.journal is not None and changes:
+            self.journal.append(changes, **details)
+
+        written = []
+        for key, item_count, data in pending:
+            tmp_path = key + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, key)
+            if self.patch:
+                # Later edits are spliced into what is now on disk
+                self.sources[key] = data
+                self.spans[key] = scan_spans(data, self.trees[key].getroot())
+                self.edits.pop(key, None)
+            self.files_written += 1
+            self.bytes_written += len(data)
+            written.append((key, item_count, len(data)))
+
+        self.dirty = []
+        self.changes = []
+        return written
+
+
+def indent_xml(elem, level=0):
+    """Add proper indentation to XML elements"""
+    indent = "\n" + level * "  "
+    if len(elem):
+        if not elem.text or not elem.text.strip():
+            elem.text = indent + "  "
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = indent
+        for child in elem:
+            indent_xml(child, level + 1)
+        if not child.tail or not child.tail.strip():
+            child.tail = indent
+    else:
+        if level and (not elem.tail or not elem.tail.strip()):
+            elem.tail = indent
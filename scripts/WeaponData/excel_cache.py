@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent cache of the Excel extraction results (phases 1-3).
+The cache is keyed on the SHA-256 of tls_weapon_docs.xlsx plus EXTRACTOR_VERSION
+and stores the compiled mapping in the same shape as weapon_stat_bonuses.json
+and weapon_data.json, so a cache hit never needs to open the workbook.
+"""
+
+import hashlib
+import json
+import os
+
+# Bump whenever the extraction logic changes so old caches are ignored
+EXTRACTOR_VERSION = 1
+
+CACHE_FILE = 'tls_weapon_docs.cache.json'
+
+
+def workbook_hash(workbook_path):
+    """Return the SHA-256 hex digest of the workbook contents"""
+    digest = hashlib.sha256()
+    with open(workbook_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _restore_int_keys(extraction):
+    """JSON turns int keys into strings; convert the numeric ones back"""
+    extraction['weapon_variants_mapping'] = {
+        weapon: {int(k): v for k, v in variants.items()}
+        for weapon, variants in extraction['weapon_variants_mapping'].items()
+    }
+    extraction['tier1_bonuses'] = {int(k): v for k, v in extraction['tier1_bonuses'].items()}
+    extraction['tier2_bonuses'] = {int(k): v for k, v in extraction['tier2_bonuses'].items()}
+    extraction['weapon_data'] = {
+        weapon: {'levels': {int(k): v for k, v in data['levels'].items()}}
+        for weapon, data in extraction['weapon_data'].items()
+    }
+    return extraction
+
+
+def load_cache(digest, cache_path=CACHE_FILE):
+    """Return the cached extraction for a workbook digest, or None on a miss"""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            extraction = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if extraction.get('extractor_version') != EXTRACTOR_VERSION:
+        return None
+    if extraction.get('workbook_sha256') != digest:
+        return None
+    return _restore_int_keys(extraction)
+
+
+def save_cache(digest, extraction, cache_path=CACHE_FILE):
+    """Write the extraction results for a workbook digest (atomic replace)"""
+    data = {'extractor_version': EXTRACTOR_VERSION, 'workbook_sha256': digest}
+    data.update(extraction)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, cache_path)
@@ -6,11 +6,24 @@ Workflow:
   1. Extract weapon variant stats from Excel
   2. Extract weapon damage data from Excel
   3. Build stat bonus mapping (Excel names -> XML names)
-  4. Update weapon stat bonuses in XML files
-  5. Update scroll item damage values in XML files
+  4. Update weapon damage values in XML files
+  5. Update weapon stat bonuses in XML files
+  6. Update scroll item damage values in XML files
+  7. Reformat and save the modified XML files
+Each phase is a function (run_*_phase) so tools such as benchmark.py can
+drive them individually; main() runs them all in order.
+Phases 1-3 are cached by workbook content hash (see excel_cache.py).
+Every modded XML file is parsed once into a shared document session, phases
+4-7 edit the in-memory trees, and each modified file is written once at the end.
+With --patch only the changed spans are spliced into the original files
+(see document_session.py).
+main() runs the phases through a dependency graph (see phase_graph.py): the
+weapon and scroll phases run concurrently, and phases whose inputs are
+unchanged since the last run are skipped (--force reruns everything).
+Every edit is recorded in change_journal.jsonl before the files are replaced,
+so a run can be undone or replayed (see change_journal.py).
 """
 
-import openpyxl
 import json
 import os
 import shutil
@@ -18,24 +31,25 @@ import xml.etree.ElementTree as ET
 from pathlib import Path
 import sys
 
-# Fix encoding for Windows
-if sys.stdout.encoding != 'utf-8':
-    sys.stdout.reconfigure(encoding='utf-8')
+import excel_cache
+from change_journal import ChangeJournal
+from document_session import DocumentSession, compact_element, indent_xml
+from instrumentation import RunReport, RUN_REPORT_FILE
+from phase_graph import PhaseGraph, Task
+from name_index import (NameIndex, BonusIndex, WEAPON_NORMALIZERS, STAT_NORMALIZERS,
+                        build_bonus_indexes, parse_composite_value, report_unresolved_bonuses)
 
-print("=" * 80)
-print("WEAPON DATA CONSOLIDATION SCRIPT")
-print("=" * 80)
+WORKBOOK_PATH = 'tls_weapon_docs.xlsx'
+MODDED_DIR = '../../modded_files'
 
-# ============================================================================
-# PHASE 1: EXTRACT WEAPON VARIANT STATS FROM EXCEL
-# ============================================================================
-print("\n[PHASE 1] Extracting weapon variant stats from Excel...")
-print("-" * 80)
+# Files touched by the weapon phases (4-5) and the scroll phase (6)
+WEAPON_FILES = ['ItemDefinitions_Weapons', 'ItemDefinitions_DLC1', 'ItemDefinitions_DLC2']
+USABLES_FILE = 'ItemDefinitions_Usables'
 
-wb = openpyxl.load_workbook('tls_weapon_docs.xlsx', data_only=True)
+# A change to any of these reruns every phase (see phase_graph.py)
+PIPELINE_SOURCES = ['extract_from_excel.py', 'document_session.py', 'name_index.py',
+                    'excel_cache.py', 'workbook_reader.py']
 
-# Extract variant names from each weapon sheet (row 22)
-variant_stats = {}
 weapon_sheets = [
     'sword', 'Hammer', '1h Axe', 'Dagger', '2h sword', '2H Hammer', '2H AXE', 'Spear',
     'Hand crossbow', 'Crossbow', 'Pistol', 'Shortbow', 'Longbow', 'Rifle',
@@ -43,137 +57,21 @@ weapon_sheets = [
     'War Shield', 'Claws', 'Cannon', 'Boomerang', 'Gauntlet', 'Sacred Flower'
 ]
 
-for sheet_name in weapon_sheets:
-    if sheet_name not in wb.sheetnames:
-        print(f"⚠️  {sheet_name}: NOT FOUND")
-        continue
-    
-    ws = wb[sheet_name]
-    row_22 = {}
-    
-    # Row 22 has variant names for IDs ending 2-5 in columns A-D
-    for col_idx, col_letter in enumerate(['A', 'B', 'C', 'D'], start=2):
-        cell = ws[f'{col_letter}22']
-        value = cell.value
-        if value:
-            row_22[col_idx] = str(value)
-    
-    if row_22:
-        variant_stats[sheet_name] = row_22
-        print(f"✓ {sheet_name}: {len(row_22)} variants found")
-
-# Extract Tier 1 Variant Values
-tier1_sheet = wb['Tier 1 Variant Values']
-tier1_headers = []
-for col_idx in range(1, 20):
-    cell = tier1_sheet.cell(8, col_idx)
-    if cell.value:
-        tier1_headers.append(cell.value)
-    else:
-        break
-
-tier1_data = {}
-for row_idx in range(9, 25):
-    row_data = []
-    has_data = False
-    for col_idx in range(1, len(tier1_headers) + 1):
-        cell = tier1_sheet.cell(row_idx, col_idx)
-        if cell.value is not None:
-            has_data = True
-        row_data.append(cell.value)
-    
-    if has_data:
-        tier1_data[row_idx - 8] = row_data
-
-print(f"✓ Tier 1: {len(tier1_headers)} stat headers, {len(tier1_data)} data rows")
-
-# Extract Tier 2 Variant Values
-tier2_sheet = wb['Tier 2 Variant Values']
-tier2_headers = []
-for col_idx in range(1, 30):  # Increased to 30 to capture all headers
-    cell = tier2_sheet.cell(8, col_idx)
-    if cell.value:
-        tier2_headers.append(cell.value)
-    else:
-        break
-
-tier2_data = {}
-for row_idx in range(9, 25):
-    row_data = []
-    has_data = False
-    for col_idx in range(1, len(tier2_headers) + 1):  # Use full tier2_headers length
-        cell = tier2_sheet.cell(row_idx, col_idx)
-        if cell.value is not None:
-            has_data = True
-        row_data.append(cell.value)
-    
-    if has_data:
-        tier2_data[row_idx - 8] = row_data
-
-print(f"✓ Tier 2: {len(tier2_headers)} stat headers, {len(tier2_data)} data rows")
-
-# ============================================================================
-# PHASE 2: EXTRACT WEAPON DAMAGE DATA FROM EXCEL
-# ============================================================================
-print("\n[PHASE 2] Extracting weapon damage data from Excel...")
-print("-" * 80)
-
-wb_data = openpyxl.load_workbook('tls_weapon_docs.xlsx', data_only=True)
-sheets = wb_data.sheetnames
-weapon_data = {}
-
-for sheet_name in sheets:
-    ws = wb_data[sheet_name]
-    
-    # Row 5 has headers
-    header_row = 5
-    
-    # Find column indices
-    level_col = None
-    min_dmg_col = None
-    max_dmg_col = None
-    
-    for col_idx in range(1, 20):
-        header_cell = ws.cell(header_row, col_idx).value
-        if header_cell:
-            val = str(header_cell).lower()
-            if 'level' in val:
-                level_col = col_idx
-            elif 'new min damage' in val:
-                min_dmg_col = col_idx
-            elif 'new max damage' in val:
-                max_dmg_col = col_idx
-    
-    if not (level_col and min_dmg_col and max_dmg_col):
-        continue
-    
-    # Extract damage values for levels (rows 6-12 for levels -1 to 5)
-    levels = {}
-    for row in range(6, 13):
-        level_cell = ws.cell(row, level_col).value
-        min_cell = ws.cell(row, min_dmg_col).value
-        max_cell = ws.cell(row, max_dmg_col).value
-        
-        if level_cell is not None:
-            try:
-                level = int(level_cell) if isinstance(level_cell, int) else int(float(level_cell))
-                min_dmg = int(min_cell) if isinstance(min_cell, int) else int(float(min_cell)) if min_cell else None
-                max_dmg = int(max_cell) if isinstance(max_cell, int) else int(float(max_cell)) if max_cell else None
-                if min_dmg is not None and max_dmg is not None:
-                    levels[level] = {'min': min_dmg, 'max': max_dmg}
-            except (ValueError, TypeError):
-                pass
-    
-    if levels:
-        weapon_data[sheet_name] = {'levels': levels}
-
-print(f"✓ Extracted damage data from {len(weapon_data)} weapon sheets")
+# Cell windows (min_row, max_row, min_col, max_col) streamed from the workbook.
+# Only these cells are ever read; widen a window before reading outside it.
+DAMAGE_WINDOW = (5, 12, 1, 19)          # Row 5 headers, rows 6-12 levels -1 to 5
+VARIANT_NAMES_WINDOW = (22, 22, 1, 4)   # Row 22 columns A-D
+TIER_SHEET_WINDOWS = {
+    'Tier 1 Variant Values': [(8, 24, 1, 19)],
+    'Tier 2 Variant Values': [(8, 24, 1, 29)],
+}
 
-# ============================================================================
-# PHASE 3: BUILD STAT BONUS MAPPING
-# ============================================================================
-print("\n[PHASE 3] Building stat bonus mapping...")
-print("-" * 80)
+def declare_sheet_windows(sheet_names=weapon_sheets):
+    """Map each sheet name to the windows it needs beyond DAMAGE_WINDOW"""
+    sheet_windows = {name: [VARIANT_NAMES_WINDOW] for name in sheet_names}
+    for name, windows in TIER_SHEET_WINDOWS.items():
+        sheet_windows.setdefault(name, []).extend(windows)
+    return sheet_windows
 
 # Mapping from Excel stat names to internal XML stat names
 stat_name_mapping = {
@@ -241,59 +139,8 @@ stat_name_mapping = {
     'propagation damage': 'PropagationDamage',
 }
 
-# Build Tier 1 bonuses dictionary
-tier1_bonuses = {}
-for level in range(6):
-    level_key = level + 1  # tier1_data has integer keys 1-6
-    tier1_bonuses[level] = {}
-    if level_key in tier1_data:
-        for header_idx, header in enumerate(tier1_headers):
-            if header_idx < len(tier1_data[level_key]):
-                try:
-                    value = tier1_data[level_key][header_idx]
-                    if isinstance(value, str):
-                        try:
-                            value = float(value)
-                        except:
-                            pass
-                    else:
-                        value = float(value)
-                    tier1_bonuses[level][header] = value
-                except (ValueError, TypeError):
-                    pass
-
-# Build Tier 2 bonuses dictionary
-tier2_bonuses = {}
-for level in range(6):
-    level_key = level + 1  # tier2_data has integer keys 1-6
-    tier2_bonuses[level] = {}
-    if level_key in tier2_data:
-        for header_idx, header in enumerate(tier2_headers):
-            if header_idx < len(tier2_data[level_key]):
-                try:
-                    value = tier2_data[level_key][header_idx]
-                    if isinstance(value, str):
-                        try:
-                            value = float(value)
-                        except:
-                            pass
-                    else:
-                        value = float(value)
-                    tier2_bonuses[level][header] = value
-                except (ValueError, TypeError):
-                    pass
-
-# Build weapon variants mapping
-weapon_variants_mapping = {}
-for weapon, variants in variant_stats.items():
-    weapon_variants_mapping[weapon] = variants
-
-print(f"✓ Stat name mapping: {len(stat_name_mapping)} entries")
-print(f"✓ Tier 1 bonuses: {len(tier1_headers)} stats × 6 levels")
-print(f"✓ Tier 2 bonuses: {len(tier2_headers)} stats × 6 levels")
-
 # ============================================================================
-# WEAPON CONSTANTS AND HELPER FUNCTIONS
+# WEAPON CONSTANTS
 # ============================================================================
 
 # OffHand weapons to exclude
@@ -331,47 +178,304 @@ WEAPON_NAME_MAPPING = {
     'BoomerangOffhand': 'Boomerang',
 }
 
-def find_excel_weapon_name(xml_base):
-    """Find the Excel weapon name for a given XML weapon base (case-insensitive)"""
-    # Check manual mapping first
-    if xml_base in WEAPON_NAME_MAPPING:
-        return WEAPON_NAME_MAPPING[xml_base]
+scroll_mapping = {
+    'AxeBoomerangScroll': ('1h Axe', 'Axe'),
+    'ThrowingDaggersScroll': ('Dagger', 'Dagger'),
+    'ChargeScroll': ('2h sword', '2HSword'),
+    'SwordBlastScroll': ('2h sword', '2HSword'),
+    'SuperSpinScroll': ('2H AXE', '2HAxe'),
+    'GroundSmashScroll': ('2H Hammer', '2HHammer'),
+    'TripleSwipeScroll': ('Spear', 'Spear'),
+    'GrapeshotScroll': ('Pistol', 'Pistol'),
+    'RainOfArrowsScroll': ('Shortbow', 'Shortbow'),
+    'ExplosiveBoltScroll': ('Crossbow', 'Crossbow'),
+    'AssassinateScroll': ('Rifle', 'Rifle'),
+    'MagicMissilesScroll': ('Wand', 'Wand'),
+    'HammerOfFaithScroll': ('Scepter', 'Scepter'),
+    'DeathRayScroll': ('Magic orb', 'Magic orb'),
+    'ScorchingWaveScroll': ('power staff', 'power staff'),
+    'FireThrowerScroll': ('power staff', 'power staff'),
+    'FireballScroll': ('Tome of Secrets', 'Tome of Secrets'),
+    'LightningStrikeScroll': ('Tome of Secrets', 'Tome of Secrets'),
+    'BeeStingScroll': ('druid staff', 'druid staff'),
+    'TeleportationScroll': None,
+}
+
+# ============================================================================
+# PHASES 1-3: EXTRACT WEAPON DATA FROM EXCEL
+# ============================================================================
+
+def extract_variant_stats(sheets, sheet_names=weapon_sheets):
+    """Extract variant names from each weapon sheet (row 22)"""
+    variant_stats = {}
+    for sheet_name in sheet_names:
+        if sheet_name not in sheets:
+            print(f"⚠️  {sheet_name}: NOT FOUND")
+            continue
+        
+        cells = sheets[sheet_name]
+        row_22 = {}
+        
+        # Row 22 has variant names for IDs ending 2-5 in columns A-D
+        for col_idx, sheet_col in enumerate(range(1, 5), start=2):
+            value = cells.get((22, sheet_col))
+            if value:
+                row_22[col_idx] = str(value)
+        
+        if row_22:
+            variant_stats[sheet_name] = row_22
+            print(f"✓ {sheet_name}: {len(row_22)} variants found")
     
-    # Normalize the XML base name for comparison
-    normalized = xml_base.lower()
+    return variant_stats
+
+def extract_tier_values(cells, max_col):
+    """Extract the headers (row 8) and data rows (9-24) of a tier variant sheet"""
+    headers = []
+    for col_idx in range(1, max_col):
+        value = cells.get((8, col_idx))
+        if value:
+            headers.append(value)
+        else:
+            break
+    
+    data = {}
+    for row_idx in range(9, 25):
+        row_data = []
+        has_data = False
+        for col_idx in range(1, len(headers) + 1):
+            value = cells.get((row_idx, col_idx))
+            if value is not None:
+                has_data = True
+            row_data.append(value)
+        
+        if has_data:
+            data[row_idx - 8] = row_data
     
-    # Build case-insensitive lookup
-    excel_weapons_lower = {k.lower(): k for k in weapon_variants_mapping.keys()}
+    return headers, data
+
+def extract_weapon_damage(sheets):
+    """Extract level damage values from every sheet with damage headers"""
+    weapon_data = {}
     
-    # Try direct lookup
-    if normalized in excel_weapons_lower:
-        return excel_weapons_lower[normalized]
+    for sheet_name, cells in sheets.items():
+        # Row 5 has headers
+        header_row = 5
+        
+        # Find column indices
+        level_col = None
+        min_dmg_col = None
+        max_dmg_col = None
+        
+        for col_idx in range(1, 20):
+            header_cell = cells.get((header_row, col_idx))
+            if header_cell:
+                val = str(header_cell).lower()
+                if 'level' in val:
+                    level_col = col_idx
+                elif 'new min damage' in val:
+                    min_dmg_col = col_idx
+                elif 'new max damage' in val:
+                    max_dmg_col = col_idx
+        
+        if not (level_col and min_dmg_col and max_dmg_col):
+            continue
+        
+        # Extract damage values for levels (rows 6-12 for levels -1 to 5)
+        levels = {}
+        for row in range(6, 13):
+            level_cell = cells.get((row, level_col))
+            min_cell = cells.get((row, min_dmg_col))
+            max_cell = cells.get((row, max_dmg_col))
+            
+            if level_cell is not None:
+                try:
+                    level = int(level_cell) if isinstance(level_cell, int) else int(float(level_cell))
+                    min_dmg = int(min_cell) if isinstance(min_cell, int) else int(float(min_cell)) if min_cell else None
+                    max_dmg = int(max_cell) if isinstance(max_cell, int) else int(float(max_cell)) if max_cell else None
+                    if min_dmg is not None and max_dmg is not None:
+                        levels[level] = {'min': min_dmg, 'max': max_dmg}
+                except (ValueError, TypeError):
+                    pass
+        
+        if levels:
+            weapon_data[sheet_name] = {'levels': levels}
+    
+    return weapon_data
+
+def build_tier_bonuses(headers, data):
+    """Build the level -> {stat header: value} bonuses dictionary for a tier"""
+    bonuses = {}
+    for level in range(6):
+        level_key = level + 1  # tier data has integer keys 1-6
+        bonuses[level] = {}
+        if level_key in data:
+            for header_idx, header in enumerate(headers):
+                if header_idx < len(data[level_key]):
+                    try:
+                        value = data[level_key][header_idx]
+                        if isinstance(value, str):
+                            try:
+                                value = float(value)
+                            except:
+                                pass
+                        else:
+                            value = float(value)
+                        bonuses[level][header] = value
+                    except (ValueError, TypeError):
+                        pass
+    return bonuses
+
+def run_excel_phases(workbook_path=WORKBOOK_PATH, use_cache=True,
+                     cache_path=excel_cache.CACHE_FILE, sheet_names=weapon_sheets, stats=None):
+    """Run phases 1-3 and return the extraction results
+
+    Phases 1-3 only depend on the workbook contents, so their results are
+    cached by content hash and reused while the workbook is unchanged.
+    File I/O is added to the optional stats dict (see instrumentation.py).
+    """
+    if stats is None:
+        stats = {}
+    workbook_digest = excel_cache.workbook_hash(workbook_path)
+    stats['files_read'] = stats.get('files_read', 0) + 1
+    stats['bytes_read'] = stats.get('bytes_read', 0) + os.path.getsize(workbook_path)
+    cached = excel_cache.load_cache(workbook_digest, cache_path) if use_cache else None
+    
+    # PHASE 1: EXTRACT WEAPON VARIANT STATS FROM EXCEL
+    print("\n[PHASE 1] Extracting weapon variant stats from Excel...")
+    print("-" * 80)
+    
+    if cached:
+        stats['files_read'] += 1
+        stats['bytes_read'] += os.path.getsize(cache_path)
+        print(f"✓ Workbook unchanged (sha256 {workbook_digest[:12]}), using {cache_path}")
+        variant_stats = cached['weapon_variants_mapping']
+        tier1_headers = cached['tier1_headers']
+        tier2_headers = cached['tier2_headers']
+        print(f"✓ {len(variant_stats)} weapon sheets with variants")
+        print(f"✓ Tier 1: {len(tier1_headers)} stat headers")
+        print(f"✓ Tier 2: {len(tier2_headers)} stat headers")
+    else:
+        # Only imported on a cache miss; loading openpyxl is part of the slow path.
+        # Each sheet is streamed once in read-only mode, bounded to its windows.
+        import workbook_reader
+        sheets = workbook_reader.read_workbook_windows(
+            workbook_path, declare_sheet_windows(sheet_names), all_sheet_windows=[DAMAGE_WINDOW])
+        
+        variant_stats = extract_variant_stats(sheets, sheet_names)
+        
+        tier1_headers, tier1_data = extract_tier_values(sheets['Tier 1 Variant Values'], 20)
+        print(f"✓ Tier 1: {len(tier1_headers)} stat headers, {len(tier1_data)} data rows")
+        
+        tier2_headers, tier2_data = extract_tier_values(sheets['Tier 2 Variant Values'], 30)  # Up to 30 to capture all headers
+        print(f"✓ Tier 2: {len(tier2_headers)} stat headers, {len(tier2_data)} data rows")
     
-    # Try removing hyphens and spaces from Excel names for comparison
-    for excel_name in weapon_variants_mapping.keys():
-        excel_name_lower = excel_name.lower()
-        if excel_name_lower.replace(' ', '').replace('-', '') == normalized.replace(' ', '').replace('-', ''):
-            return excel_name
+    # PHASE 2: EXTRACT WEAPON DAMAGE DATA FROM EXCEL
+    print("\n[PHASE 2] Extracting weapon damage data from Excel...")
+    print("-" * 80)
     
-    # Try checking if any excel weapon name contains the normalized string
-    for excel_name in weapon_variants_mapping.keys():
-        # Remove all non-alphanumeric for fuzzy matching
-        excel_clean = ''.join(c for c in excel_name.lower() if c.isalnum())
-        xml_clean = ''.join(c for c in normalized if c.isalnum())
-        if excel_clean == xml_clean:
-            return excel_name
+    if cached:
+        weapon_data = cached['weapon_data']
+    else:
+        weapon_data = extract_weapon_damage(sheets)
     
-    return None
+    print(f"✓ Extracted damage data from {len(weapon_data)} weapon sheets")
+    
+    # PHASE 3: BUILD STAT BONUS MAPPING
+    print("\n[PHASE 3] Building stat bonus mapping...")
+    print("-" * 80)
+    
+    if cached:
+        tier1_bonuses = cached['tier1_bonuses']
+        tier2_bonuses = cached['tier2_bonuses']
+    else:
+        tier1_bonuses = build_tier_bonuses(tier1_headers, tier1_data)
+        tier2_bonuses = build_tier_bonuses(tier2_headers, tier2_data)
+    
+    # Build weapon variants mapping
+    weapon_variants_mapping = {}
+    for weapon, variants in variant_stats.items():
+        weapon_variants_mapping[weapon] = variants
+    
+    extraction = {
+        'weapon_variants_mapping': weapon_variants_mapping,
+        'stat_name_mapping': stat_name_mapping,
+        'tier1_bonuses': tier1_bonuses,
+        'tier2_bonuses': tier2_bonuses,
+        'tier1_headers': tier1_headers,
+        'tier2_headers': tier2_headers,
+        'weapon_data': weapon_data,
+    }
+    if use_cache and not cached:
+        excel_cache.save_cache(workbook_digest, extraction, cache_path)
+        stats['files_written'] = stats.get('files_written', 0) + 1
+        stats['bytes_written'] = stats.get('bytes_written', 0) + os.path.getsize(cache_path)
+        print(f"✓ Extraction cached to {cache_path}")
+    
+    print(f"✓ Stat name mapping: {len(stat_name_mapping)} entries")
+    print(f"✓ Tier 1 bonuses: {len(tier1_headers)} stats × 6 levels")
+    print(f"✓ Tier 2 bonuses: {len(tier2_headers)} stats × 6 levels")
+    
+    return extraction
+
+# ============================================================================
+# NAME RESOLUTION
+# ============================================================================
+
+def build_context(extraction):
+    """Build the lookup context shared by phases 4-6
+
+    Name-resolution indexes are built once here, so every weapon, stat and
+    bonus lookup in the per-level loops is a few dict probes.
+    """
+    return {
+        'weapon_data': extraction['weapon_data'],
+        'weapon_variants_mapping': extraction['weapon_variants_mapping'],
+        'weapon_name_index': NameIndex(
+            ((name, name) for name in extraction['weapon_variants_mapping']),
+            WEAPON_NORMALIZERS,
+            overrides=WEAPON_NAME_MAPPING,
+        ),
+        'stat_name_index': NameIndex(stat_name_mapping.items(), STAT_NORMALIZERS),
+        'tier1_bonus_indexes': build_bonus_indexes(extraction['tier1_bonuses']),
+        'tier2_bonus_indexes': build_bonus_indexes(extraction['tier2_bonuses']),
+        'empty_bonus_index': BonusIndex({}),
+    }
+
+def find_excel_weapon_name(ctx, xml_base):
+    """Find the Excel weapon name for a given XML weapon base (case-insensitive)"""
+    return ctx['weapon_name_index'].get(xml_base)
+
+def find_stat_value_in_bonuses(stat_name, bonus_index):
+    """Find a stat value in a level's bonuses, handling both simple and composite keys"""
+    return bonus_index.get(stat_name)
+
+def map_excel_stat_to_xml(ctx, excel_stat_name):
+    """Map a single Excel stat name to XML stat name (case-insensitive)"""
+    return ctx['stat_name_index'].get(excel_stat_name)
+
+def report_unresolved(ctx):
+    """Print the names that never resolved during phases 4-5, once"""
+    ctx['weapon_name_index'].report_unresolved("weapon bases (no Excel match)")
+    ctx['stat_name_index'].report_unresolved("Excel stat names (no XML stat)")
+    report_unresolved_bonuses("stat names (no tier bonus value)",
+                              [*ctx['tier1_bonus_indexes'].values(), *ctx['tier2_bonus_indexes'].values(),
+                               ctx['empty_bonus_index']])
 
 # ============================================================================
 # PHASE 4: UPDATE WEAPON DAMAGE VALUES IN XML FILES
 # ============================================================================
-print("\n[PHASE 4] Updating weapon damage values...")
-print("-" * 80)
 
-def update_weapon_damage(file_path):
+def record_damage_change(session, file_path, item_id, level_id, old, new):
+    """Record the changed BaseDamage Min/Max values of a level; returns the Change records"""
+    return [
+        session.record_change(file_path, item_id, level_id, f'BaseDamage@{name}', old_value, str(new_value))
+        for name, old_value, new_value in zip(('Min', 'Max'), old, new)
+        if old_value != str(new_value)
+    ]
+
+def update_weapon_damage(ctx, session, file_path):
     """Process an ItemDefinitions XML file and update damage values"""
-    tree = ET.parse(file_path)
+    tree = session.get(file_path)
     root = tree.getroot()
     
     damage_changes = []
@@ -394,15 +498,15 @@ def update_weapon_damage(file_path):
         is_offhand = weapon_base in OFFHAND_WEAPONS
         
         # Find the Excel weapon name
-        excel_weapon_name = find_excel_weapon_name(weapon_base)
+        excel_weapon_name = find_excel_weapon_name(ctx, weapon_base)
         if not excel_weapon_name:
             continue
         
         # Get damage data for this weapon
-        if excel_weapon_name not in weapon_data:
+        if excel_weapon_name not in ctx['weapon_data']:
             continue
         
-        levels_data = weapon_data[excel_weapon_name]['levels']
+        levels_data = ctx['weapon_data'][excel_weapon_name]['levels']
         
         # Process all level variants
         level_variations = item.find('LevelVariations')
@@ -441,113 +545,47 @@ def update_weapon_damage(file_path):
             # Find or create BaseDamage element
             base_damage = level_elem.find('BaseDamage')
             if base_damage is None:
-                base_damage = ET.SubElement(level_elem, 'BaseDamage')
+                base_damage = ET.Element('BaseDamage')
+                session.append_child(file_path, level_elem, base_damage)
             
             old_min = base_damage.get('Min')
             old_max = base_damage.get('Max')
             
             # Update damage values
             if old_min != str(new_min) or old_max != str(new_max):
-                base_damage.set('Min', str(new_min))
-                base_damage.set('Max', str(new_max))
-                damage_changes.append({
-                    'weapon_id': item_id,
-                    'level': level_id,
-                    'excel_level': excel_level,
-                    'old': f"{old_min}-{old_max}" if old_min else "None",
-                    'new': f"{new_min}-{new_max}"
-                })
+                session.set_attributes(file_path, base_damage, {'Min': str(new_min), 'Max': str(new_max)})
+                damage_changes += record_damage_change(session, file_path, item_id, level_id_str,
+                                                       (old_min, old_max), (new_min, new_max))
                 update_count += 1
     
-    # Write the updated XML
-    tree.write(file_path, encoding='utf-8', xml_declaration=True)
+    if update_count:
+        session.mark_dirty(file_path)
     
     return update_count, damage_changes
 
-# Process all weapon files for damage updates
-all_damage_changes = []
-total_damage_updates = 0
-
-files_to_process_damage = [
-    '../../modded_files/ItemDefinitions_Weapons',
-    '../../modded_files/ItemDefinitions_DLC1',
-    '../../modded_files/ItemDefinitions_DLC2',
-]
-
-for file_path in files_to_process_damage:
-    print(f"\nProcessing {file_path}...")
-    update_count, changes = update_weapon_damage(file_path)
-    all_damage_changes.extend(changes)
-    total_damage_updates += update_count
-    print(f"  ✓ Updated {update_count} weapon damage values")
-
-print(f"\n✓ Total weapon damage updates: {total_damage_updates}")
-
-# ============================================================================
-# PHASE 5: UPDATE WEAPON STAT BONUSES IN XML FILES
-# ============================================================================
-print("\n[PHASE 5] Updating weapon stat bonuses...")
-print("-" * 80)
-
-def parse_composite_value(value_str):
-    """Parse composite values like '7;2' or '40;8' into a list"""
-    if isinstance(value_str, str) and ';' in value_str:
-        try:
-            return [int(float(v.strip())) for v in value_str.split(';')]
-        except:
-            return []
-    elif isinstance(value_str, (int, float)):
-        return [int(value_str)]
-    return []
-
-def find_stat_value_in_bonuses(stat_name, bonuses_dict):
-    """Find a stat value in bonuses dict, handling both simple and composite keys"""
-    # First, try exact match
-    if stat_name in bonuses_dict:
-        return bonuses_dict[stat_name]
-    
-    # Try case-insensitive match
-    for key, value in bonuses_dict.items():
-        if key.lower() == stat_name.lower():
-            return value
+def run_damage_phase(ctx, session, file_paths):
+    """Phase 4: update weapon damage values in every weapon file"""
+    print("\n[PHASE 4] Updating weapon damage values...")
+    print("-" * 80)
     
-    # Try with/without spaces (e.g., "CriticalPower" vs "Critical Power")
-    stat_name_no_space = stat_name.replace(' ', '')
-    for key, value in bonuses_dict.items():
-        if key.replace(' ', '').lower() == stat_name_no_space.lower():
-            return value
+    all_damage_changes = []
+    total_damage_updates = 0
     
-    # Try to find in composite keys (e.g., "Mana;Mana Regen")
-    for key, value in bonuses_dict.items():
-        if ';' in key:
-            parts = [p.strip() for p in key.split(';')]
-            for i, part in enumerate(parts):
-                if part.lower() == stat_name.lower() or part.replace(' ', '').lower() == stat_name_no_space.lower():
-                    values = parse_composite_value(value)
-                    if i < len(values):
-                        return values[i]
+    for file_path in file_paths:
+        print(f"\nProcessing {file_path}...")
+        update_count, changes = update_weapon_damage(ctx, session, file_path)
+        all_damage_changes.extend(changes)
+        total_damage_updates += update_count
+        print(f"  ✓ Updated {update_count} weapon damage values")
     
-    return None
+    print(f"\n✓ Total weapon damage updates: {total_damage_updates}")
+    return total_damage_updates, all_damage_changes
 
-def map_excel_stat_to_xml(excel_stat_name):
-    """Map a single Excel stat name to XML stat name (case-insensitive)"""
-    if excel_stat_name in stat_name_mapping:
-        return stat_name_mapping[excel_stat_name]
-    
-    # Try case-insensitive match
-    for key, val in stat_name_mapping.items():
-        if key.lower() == excel_stat_name.lower():
-            return val
-    
-    # Try with/without spaces (e.g., "CriticalPower" vs "Critical Power")
-    excel_stat_no_space = excel_stat_name.replace(' ', '')
-    for key, val in stat_name_mapping.items():
-        if key.replace(' ', '').lower() == excel_stat_no_space.lower():
-            return val
-    
-    return None
+# ============================================================================
+# PHASE 5: UPDATE WEAPON STAT BONUSES IN XML FILES
+# ============================================================================
 
-def create_base_stat_bonuses(weapon_id, variant_id, level_id, excel_weapon_name):
+def create_base_stat_bonuses(ctx, weapon_id, variant_id, level_id, excel_weapon_name):
     """Create BaseStatBonuses element for a weapon variant"""
     
     # Weapons ending in 0-1 should not have bonuses (except WarShield which always gets -20 Dodge)
@@ -562,7 +600,7 @@ def create_base_stat_bonuses(weapon_id, variant_id, level_id, excel_weapon_name)
             return None
     
     # Get the stat names for this variant
-    variant_mapping = weapon_variants_mapping.get(excel_weapon_name)
+    variant_mapping = ctx['weapon_variants_mapping'].get(excel_weapon_name)
     if not variant_mapping:
         return None
     
@@ -578,9 +616,9 @@ def create_base_stat_bonuses(weapon_id, variant_id, level_id, excel_weapon_name)
     
     # Determine which tier to use
     if variant_id in [2, 3]:
-        bonuses_dict = tier1_bonuses.get(level_id, {})
+        bonus_index = ctx['tier1_bonus_indexes'].get(level_id, ctx['empty_bonus_index'])
     elif variant_id in [4, 5]:
-        bonuses_dict = tier2_bonuses.get(level_id, {})
+        bonus_index = ctx['tier2_bonus_indexes'].get(level_id, ctx['empty_bonus_index'])
     else:
         return None
     
@@ -591,12 +629,12 @@ def create_base_stat_bonuses(weapon_id, variant_id, level_id, excel_weapon_name)
         excel_stat_name = excel_stat_name.strip()
         
         # Map to XML stat name
-        xml_stat_name = map_excel_stat_to_xml(excel_stat_name)
+        xml_stat_name = map_excel_stat_to_xml(ctx, excel_stat_name)
         if not xml_stat_name:
             continue
         
         # Find the value in bonuses dict
-        value = find_stat_value_in_bonuses(excel_stat_name, bonuses_dict)
+        value = find_stat_value_in_bonuses(excel_stat_name, bonus_index)
         if value is None:
             continue
         
@@ -631,14 +669,13 @@ def create_base_stat_bonuses(weapon_id, variant_id, level_id, excel_weapon_name)
     
     return base_stat_bonuses if len(base_stat_bonuses) > 0 else None
 
-def process_xml_file(file_path):
+def process_xml_file(ctx, session, file_path):
     """Process an ItemDefinitions XML file and update stat bonuses"""
-    tree = ET.parse(file_path)
+    tree = session.get(file_path)
     root = tree.getroot()
     
     changes = []
     update_count = 0
-    skipped_weapons = []
     
     for item in root.findall('.//ItemDefinition'):
         item_id = item.get('Id')
@@ -658,10 +695,8 @@ def process_xml_file(file_path):
             continue
         
         # Find the Excel weapon name (case-insensitive)
-        excel_weapon_name = find_excel_weapon_name(weapon_base)
+        excel_weapon_name = find_excel_weapon_name(ctx, weapon_base)
         if not excel_weapon_name:
-            if weapon_base not in [w[0] for w in skipped_weapons]:
-                skipped_weapons.append((weapon_base, item_id))
             continue
         
         # Process all level variants
@@ -680,219 +715,156 @@ def process_xml_file(file_path):
                 continue
             
             # Create new BaseStatBonuses
-            new_base_stat_bonuses = create_base_stat_bonuses(item_id, variant_id, level_id, excel_weapon_name)
+            new_base_stat_bonuses = create_base_stat_bonuses(ctx, item_id, variant_id, level_id, excel_weapon_name)
             
-            # Remove old BaseStatBonuses if it exists
+            # Replace the old BaseStatBonuses (if any) with the new one (if any)
             old_bsb = level_elem.find('BaseStatBonuses')
-            if old_bsb is not None:
-                level_elem.remove(old_bsb)
+            old_source = compact_element(old_bsb)
+            new_source = compact_element(new_base_stat_bonuses)
+            session.replace_child(file_path, level_elem, old_bsb, new_base_stat_bonuses)
+            if old_source != new_source:
+                changes.append(session.record_change(file_path, item_id, level_id_str, 'BaseStatBonuses',
+                                                     old_source, new_source))
             
-            # Add new BaseStatBonuses
             if new_base_stat_bonuses is not None:
-                level_elem.append(new_base_stat_bonuses)
-                
-                # Log the change
-                bonus_str = ', '.join([
-                    f"{stat.get('Stat')}={stat.text}"
-                    for stat in new_base_stat_bonuses.findall('BaseStatBonus')
-                ])
-                changes.append({
-                    'weapon_id': item_id,
-                    'variant_id': variant_id,
-                    'level': level_id,
-                    'bonuses': bonus_str
-                })
                 update_count += 1
     
-    # Validate tree has content before writing
+    # Validate tree has content before it is queued for writing
     item_count = len(root.findall('.//ItemDefinition'))
     if item_count == 0:
-        print(f"  ⚠ ERROR: Tree is empty, aborting write for {file_path}")
+        print(f"  ⚠ ERROR: Tree is empty, not saving {file_path}")
         return update_count, changes
     
-    original_size = os.path.getsize(file_path)
+    # Written once by the session after phase 7 (size checks happen there)
+    session.mark_dirty(file_path)
+    print(f"  ✓ Updated in memory: {item_count} items")
     
-    # Write the updated XML
-    tree.write(file_path, encoding='utf-8', xml_declaration=True)
+    return update_count, changes
+
+def run_stat_bonus_phase(ctx, session, file_paths):
+    """Phase 5: rebuild BaseStatBonuses in every weapon file"""
+    print("\n[PHASE 5] Updating weapon stat bonuses...")
+    print("-" * 80)
     
-    # Verify file was written successfully
-    new_size = os.path.getsize(file_path)
-    if new_size < original_size * 0.5:  # File shrank by more than 50%
-        print(f"  ⚠ ERROR: File size dropped from {original_size} to {new_size} bytes - aborting")
-        return update_count, changes
+    all_stat_changes = []
+    total_stat_updates = 0
     
-    print(f"  ✓ File saved: {item_count} items, {new_size} bytes")
+    for file_path in file_paths:
+        print(f"\nProcessing {file_path}...")
+        update_count, changes = process_xml_file(ctx, session, file_path)
+        all_stat_changes.extend(changes)
+        total_stat_updates += update_count
+        print(f"  ✓ Updated {update_count} BaseStatBonuses")
     
-    # Print skipped weapons for debugging
-    if skipped_weapons:
-        print(f"\n  DEBUG: Skipped {len(skipped_weapons)} weapon bases (no Excel match):")
-        for weapon_base, example_id in skipped_weapons[:10]:
-            print(f"    {weapon_base} (e.g., {example_id})")
+    print(f"\n✓ Total stat bonus updates: {total_stat_updates}")
     
-    return update_count, changes
-
-# Process all weapon files
-all_stat_changes = []
-total_stat_updates = 0
-
-files_to_process = [
-    '../../modded_files/ItemDefinitions_Weapons',
-    '../../modded_files/ItemDefinitions_DLC1',
-    '../../modded_files/ItemDefinitions_DLC2',
-]
-
-for file_path in files_to_process:
-    print(f"\nProcessing {file_path}...")
-    update_count, changes = process_xml_file(file_path)
-    all_stat_changes.extend(changes)
-    total_stat_updates += update_count
-    print(f"  ✓ Updated {update_count} BaseStatBonuses")
-
-print(f"\n✓ Total stat bonus updates: {total_stat_updates}")
+    report_unresolved(ctx)
+    return total_stat_updates, all_stat_changes
 
 # ============================================================================
 # PHASE 6: UPDATE SCROLL ITEM DAMAGE VALUES IN XML FILES
 # ============================================================================
-print("\n[PHASE 6] Updating scroll item damage values...")
-print("-" * 80)
 
-scroll_mapping = {
-    'AxeBoomerangScroll': ('1h Axe', 'Axe'),
-    'ThrowingDaggersScroll': ('Dagger', 'Dagger'),
-    'ChargeScroll': ('2h sword', '2HSword'),
-    'SwordBlastScroll': ('2h sword', '2HSword'),
-    'SuperSpinScroll': ('2H AXE', '2HAxe'),
-    'GroundSmashScroll': ('2H Hammer', '2HHammer'),
-    'TripleSwipeScroll': ('Spear', 'Spear'),
-    'GrapeshotScroll': ('Pistol', 'Pistol'),
-    'RainOfArrowsScroll': ('Shortbow', 'Shortbow'),
-    'ExplosiveBoltScroll': ('Crossbow', 'Crossbow'),
-    'AssassinateScroll': ('Rifle', 'Rifle'),
-    'MagicMissilesScroll': ('Wand', 'Wand'),
-    'HammerOfFaithScroll': ('Scepter', 'Scepter'),
-    'DeathRayScroll': ('Magic orb', 'Magic orb'),
-    'ScorchingWaveScroll': ('power staff', 'power staff'),
-    'FireThrowerScroll': ('power staff', 'power staff'),
-    'FireballScroll': ('Tome of Secrets', 'Tome of Secrets'),
-    'LightningStrikeScroll': ('Tome of Secrets', 'Tome of Secrets'),
-    'BeeStingScroll': ('druid staff', 'druid staff'),
-    'TeleportationScroll': None,
-}
-
-tree = ET.parse('../../modded_files/ItemDefinitions_Usables')
-root = tree.getroot()
-
-scroll_changes = []
-total_scroll_updated = 0
-total_removed = 0
-
-for item_def in root.findall('ItemDefinition'):
-    item_id = item_def.get('Id')
+def run_scroll_phase(ctx, session, file_path):
+    """Phase 6: copy weapon damage onto the scroll items in ItemDefinitions_Usables"""
+    print("\n[PHASE 6] Updating scroll item damage values...")
+    print("-" * 80)
+    
+    tree = session.get(file_path)
+    root = tree.getroot()
+    
+    scroll_changes = []
+    total_updated = 0
+    total_removed = 0
+    
+    for item_def in root.findall('ItemDefinition'):
+        item_id = item_def.get('Id')
+    
+        if item_id not in scroll_mapping:
+            continue
     
-    if item_id not in scroll_mapping:
-        continue
+        mapping = scroll_mapping[item_id]
+    
+        # Special case: TeleportationScroll should not have BaseDamage elements
+        if mapping is None:
+            print(f"\n{item_id}: removing damage values")
+            level_variations = item_def.find('LevelVariations')
+            if level_variations is not None:
+                for level_elem in level_variations.findall('Level'):
+                    base_damage = level_elem.find('BaseDamage')
+                    if base_damage is not None:
+                        level_id = level_elem.get('Id')
+                        scroll_changes.append(session.record_change(file_path, item_id, level_id, 'BaseDamage',
+                                                                    compact_element(base_damage), None))
+                        session.remove_child(file_path, level_elem, base_damage)
+                        total_removed += 1
+                        session.mark_dirty(file_path)
+            continue
+    
+        excel_sheet, weapon_prefix = mapping
+    
+        if excel_sheet not in ctx['weapon_data']:
+            print(f"Warning: {excel_sheet} not in weapon data")
+            continue
+    
+        levels = ctx['weapon_data'][excel_sheet]['levels']
+        print(f"\n{item_id} (from {excel_sheet}):")
     
-    mapping = scroll_mapping[item_id]
+        # Scrolls use Excel levels 0-5 (same as weapons ending in 1-5, NOT like weapons ending in 0)
+        level_mapping = {0: 0, 1: 1, 2: 2, 3: 3, 4: 4, 5: 5}
     
-    # Special case: TeleportationScroll should not have BaseDamage elements
-    if mapping is None:
-        print(f"\n{item_id}: removing damage values")
         level_variations = item_def.find('LevelVariations')
-        if level_variations is not None:
-            for level_elem in level_variations.findall('Level'):
-                base_damage = level_elem.find('BaseDamage')
-                if base_damage is not None:
-                    level_id = level_elem.get('Id')
-                    level_elem.remove(base_damage)
-                    total_removed += 1
-        continue
-    
-    excel_sheet, weapon_prefix = mapping
-    
-    if excel_sheet not in weapon_data:
-        print(f"Warning: {excel_sheet} not in weapon data")
-        continue
-    
-    levels = weapon_data[excel_sheet]['levels']
-    print(f"\n{item_id} (from {excel_sheet}):")
-    
-    # Scrolls use Excel levels 0-5 (same as weapons ending in 1-5, NOT like weapons ending in 0)
-    level_mapping = {0: 0, 1: 1, 2: 2, 3: 3, 4: 4, 5: 5}
-    
-    level_variations = item_def.find('LevelVariations')
-    if level_variations is None:
-        continue
-    
-    updated_count = 0
-    for level_elem in level_variations.findall('Level'):
-        level_id = level_elem.get('Id')
-        try:
-            level_id_int = int(level_id)
-        except (ValueError, TypeError):
+        if level_variations is None:
             continue
+    
+        updated_count = 0
+        for level_elem in level_variations.findall('Level'):
+            level_id = level_elem.get('Id')
+            try:
+                level_id_int = int(level_id)
+            except (ValueError, TypeError):
+                continue
         
-        if level_id_int not in level_mapping:
-            continue
+            if level_id_int not in level_mapping:
+                continue
         
-        excel_level = level_mapping[level_id_int]
+            excel_level = level_mapping[level_id_int]
         
-        if excel_level not in levels:
-            continue
+            if excel_level not in levels:
+                continue
         
-        base_damage = level_elem.find('BaseDamage')
-        if base_damage is None:
-            continue
+            base_damage = level_elem.find('BaseDamage')
+            if base_damage is None:
+                continue
+        
+            old_min = base_damage.get('Min')
+            old_max = base_damage.get('Max')
+            new_min = levels[excel_level]['min']
+            new_max = levels[excel_level]['max']
+        
+            if old_min != str(new_min) or old_max != str(new_max):
+                session.set_attributes(file_path, base_damage, {'Min': str(new_min), 'Max': str(new_max)})
+                scroll_changes += record_damage_change(session, file_path, item_id, level_id,
+                                                       (old_min, old_max), (new_min, new_max))
+                updated_count += 1
+                total_updated += 1
+                session.mark_dirty(file_path)
+                print(f"  Level {level_id}: {old_min}-{old_max} -> {new_min}-{new_max}")
         
-        old_min = base_damage.get('Min')
-        old_max = base_damage.get('Max')
-        new_min = levels[excel_level]['min']
-        new_max = levels[excel_level]['max']
-        
-        if old_min != str(new_min) or old_max != str(new_max):
-            base_damage.set('Min', str(new_min))
-            base_damage.set('Max', str(new_max))
-            scroll_changes.append({
-                'scroll': item_id,
-                'level': level_id,
-                'old': f"{old_min}-{old_max}",
-                'new': f"{new_min}-{new_max}"
-            })
-            updated_count += 1
-            total_scroll_updated += 1
-            print(f"  Level {level_id}: {old_min}-{old_max} -> {new_min}-{new_max}")
-    
-    if updated_count == 0:
-        print(f"  No updates needed")
-
-tree.write('../../modded_files/ItemDefinitions_Usables', encoding='utf-8', xml_declaration=True)
-print(f"\nUpdated {total_scroll_updated} scroll damage values")
-print(f"Removed {total_removed} damage values from special scrolls")
+        if updated_count == 0:
+            print(f"  No updates needed")
+    
+    print(f"\nUpdated {total_updated} scroll damage values")
+    print(f"Removed {total_removed} damage values from special scrolls")
+    return total_updated, total_removed, scroll_changes
 
 # ============================================================================
 # PHASE 7: REFORMAT ALL XML FILES
 # ============================================================================
-print("\n[PHASE 7] Reformatting XML files...")
-print("-" * 80)
-
-def indent_xml(elem, level=0):
-    """Add proper indentation to XML elements"""
-    indent = "\n" + level * "  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = indent + "  "
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = indent
-        for child in elem:
-            indent_xml(child, level + 1)
-        if not child.tail or not child.tail.strip():
-            child.tail = indent
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = indent
 
-def reformat_xml_file(file_path):
-    """Reformat an XML file with proper indentation and spacing"""
-    tree = ET.parse(file_path)
+def reformat_xml_file(session, file_path):
+    """Reformat a session document with proper indentation and spacing"""
+    tree = session.get(file_path)
     root = tree.getroot()
     indent_xml(root)
     
@@ -902,32 +874,139 @@ def reformat_xml_file(file_path):
             # Add extra newline for spacing between ItemDefinitions
             item_def.tail = '\n\n' + (root.tag == item_def.tag and '' or '  ')
     
-    tree.write(file_path, encoding='utf-8', xml_declaration=True)
-
-# Reformat all modified files
-files_to_reformat = [
-    '../../modded_files/ItemDefinitions_Weapons',
-    '../../modded_files/ItemDefinitions_DLC1',
-    '../../modded_files/ItemDefinitions_DLC2',
-    '../../modded_files/ItemDefinitions_Usables',
-]
+    session.mark_dirty(file_path)
 
-for file_path in files_to_reformat:
-    try:
-        reformat_xml_file(file_path)
-        print(f"Reformatted {file_path}")
-    except Exception as e:
-        print(f"Error reformatting {file_path}: {e}")
+def run_reformat_phase(session, file_paths):
+    """Phase 7: reformat the documents, then write every modified one once"""
+    print("\n[PHASE 7] Reformatting XML files...")
+    print("-" * 80)
+    
+    if session.patch:
+        # Patch mode splices the edits into the original bytes; nothing to re-indent
+        print("Patch mode: only the changed spans are rewritten")
+    else:
+        for file_path in file_paths:
+            try:
+                reformat_xml_file(session, file_path)
+                print(f"Reformatted {file_path}")
+            except Exception as e:
+                print(f"Error reformatting {file_path}: {e}")
+    
+    # Write every modified document exactly once
+    for file_path, item_count, size in session.save():
+        print(f"  ✓ File saved: {file_path} ({item_count} items, {size} bytes)")
+    print(f"Parsed {session.files_read} files, wrote {session.files_written} files ({session.bytes_written} bytes)")
 
 # ============================================================================
-# FINAL SUMMARY
+# MAIN
 # ============================================================================
-print("\n" + "=" * 80)
-print("CONSOLIDATION COMPLETE")
-print("=" * 80)
-print(f"Weapon damage updates: {total_damage_updates}")
-print(f"Stat bonus updates: {total_stat_updates}")
-print(f"Scroll damage updates: {total_scroll_updated}")
-print(f"Scroll removals: {total_removed}")
-print(f"All XML files have been updated, synchronized, and reformatted")
-print("=" * 80)
+
+def build_tasks(session, use_cache=True, weapon_files=None, usables_path=None):
+    """Declare phases 1-7 as phase_graph Tasks with the files they read and write
+
+    Phases 4-5 and phase 6 touch disjoint files, so the scheduler can run
+    them concurrently; phase 7 waits for every phase that edits a file.
+    """
+    if weapon_files is None:
+        weapon_files = [os.path.join(MODDED_DIR, name) for name in WEAPON_FILES]
+    if usables_path is None:
+        usables_path = os.path.join(MODDED_DIR, USABLES_FILE)
+    all_files = weapon_files + [usables_path]
+
+    def excel(values, stats):
+        # Pass --no-cache to force a fresh extraction from the workbook
+        return run_excel_phases(WORKBOOK_PATH, use_cache=use_cache, stats=stats)
+
+    def reformat_and_save(values, stats):
+        # Only the documents the phases of this run loaded
+        run_reformat_phase(session, [path for path in all_files if session.is_loaded(path)])
+
+    return [
+        Task('excel_extraction', excel, reads=[WORKBOOK_PATH]),
+        Task('build_indexes', lambda values, stats: build_context(values['excel_extraction']),
+             requires=['excel_extraction']),
+        Task('damage_update', lambda values, stats: run_damage_phase(values['build_indexes'], session, weapon_files),
+             requires=['build_indexes'], reads=weapon_files, writes=weapon_files),
+        Task('stat_bonus_update', lambda values, stats: run_stat_bonus_phase(values['build_indexes'], session, weapon_files),
+             requires=['build_indexes'], reads=weapon_files, writes=weapon_files),
+        Task('scroll_update', lambda values, stats: run_scroll_phase(values['build_indexes'], session, usables_path),
+             requires=['build_indexes'], reads=[usables_path], writes=[usables_path]),
+        Task('reformat_and_save', reformat_and_save, reads=all_files, writes=all_files),
+    ]
+
+
+def main(argv):
+    print("=" * 80)
+    print("WEAPON DATA CONSOLIDATION SCRIPT")
+    print("=" * 80)
+    
+    # The phases are GIL-bound, so threads give no speedup, and overlapping
+    # phases make the per-phase numbers of the run report wrong
+    workers = 1
+    args = iter(argv)
+    for arg in args:
+        if arg == '--workers':
+            workers = int(next(args))
+    if workers > 1:
+        print(f"⚠ {workers} workers: the per-phase CPU, memory and I/O in the run report include overlapping phases")
+    
+    # Every phase is timed and measured; --no-memory skips tracemalloc (it slows the run)
+    report = RunReport('extract_from_excel.py', trace_memory='--no-memory' not in argv)
+    
+    # Shared by phases 4-7: each file is parsed once and written once after phase 7.
+    # --patch splices only the changed spans into the original files. The
+    # changes are journaled before the files are replaced (see change_journal.py)
+    session = DocumentSession(patch='--patch' in argv, journal=ChangeJournal(script='extract_from_excel.py'))
+    
+    # Phases whose inputs are unchanged since the last run are skipped; --force runs everything
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    graph = PhaseGraph(build_tasks(session, use_cache='--no-cache' not in argv),
+                       sources=[os.path.join(script_dir, name) for name in PIPELINE_SOURCES],
+                       salt='patch' if session.patch else '')
+    results, statuses = graph.run(force='--force' in argv, workers=workers, report=report, session=session)
+    
+    def result(name, index):
+        """A phase's count, or None when the phase did not run (see phase_status)"""
+        return results[name][index] if statuses[name] == 'ran' else None
+    
+    def shown(name, value):
+        if value is not None:
+            return value
+        return statuses[name] + (" (inputs unchanged)" if statuses[name] == 'skipped' else "")
+    
+    total_damage_updates = result('damage_update', 0)
+    total_stat_updates = result('stat_bonus_update', 0)
+    total_scroll_updated = result('scroll_update', 0)
+    total_removed = result('scroll_update', 1)
+    
+    # FINAL SUMMARY
+    print("\n" + "=" * 80)
+    print("CONSOLIDATION COMPLETE")
+    print("=" * 80)
+    print(f"Weapon damage updates: {shown('damage_update', total_damage_updates)}")
+    print(f"Stat bonus updates: {shown('stat_bonus_update', total_stat_updates)}")
+    print(f"Scroll damage updates: {shown('scroll_update', total_scroll_updated)}")
+    print(f"Scroll removals: {shown('scroll_update', total_removed)}")
+    if all(status == 'skipped' for status in statuses.values()):
+        print("All inputs unchanged since the last run, nothing to do (--force to rerun)")
+    else:
+        print(f"All XML files have been updated, synchronized, and reformatted")
+    print("=" * 80)
+    
+    # Counts are None for the phases that did not run; phase_status says why
+    report.results = {
+        'weapon_damage_updates': total_damage_updates,
+        'stat_bonus_updates': total_stat_updates,
+        'scroll_damage_updates': total_scroll_updated,
+        'scroll_removals': total_removed,
+        'phase_status': statuses,
+    }
+    report.print_summary()
+    print(f"Run report saved to {report.write(RUN_REPORT_FILE)}")
+    return 1 if any(status in ('failed', 'blocked') for status in statuses.values()) else 0
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-phase instrumentation for the weapon data scripts.
+Each phase records wall time, CPU time, peak traced memory (tracemalloc),
+files read/written and bytes read/written, and the whole run is saved as
+one JSON run report.
+"""
+
+import contextlib
+import json
+import sys
+import time
+import tracemalloc
+
+RUN_REPORT_FILE = 'run_report.json'
+
+IO_COUNTERS = ('files_read', 'bytes_read', 'files_written', 'bytes_written')
+
+
+def _session_counters(session):
+    if session is None:
+        return dict.fromkeys(IO_COUNTERS, 0)
+    return {name: getattr(session, name) for name in IO_COUNTERS}
+
+
+class RunReport:
+    """Collects one record per phase and writes them as a JSON run report"""
+
+    def __init__(self, script, trace_memory=True):
+        self.script = script
+        self.trace_memory = trace_memory
+        self.started = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.argv = sys.argv[1:]
+        self.phases = []
+        self.results = {}
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name, session=None):
+        """Time a phase; I/O is taken from the session counters plus the yielded dict
+
+        Work outside the session (workbook, cache files) is added by the caller
+        to the yielded stats dict.
+        """
+        stats = dict.fromkeys(IO_COUNTERS, 0)
+        before = _session_counters(session)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield stats
+        finally:
+            record = {
+                'phase': name,
+                'wall_time': round(time.perf_counter() - start_wall, 6),
+                'cpu_time': round(time.process_time() - start_cpu, 6),
+                'peak_memory_bytes': tracemalloc.get_traced_memory()[1] if self.trace_memory else None,
+            }
+            after = _session_counters(session)
+            for counter in IO_COUNTERS:
+                record[counter] = stats[counter] + after[counter] - before[counter]
+            self.phases.append(record)
+
+    def to_dict(self):
+        totals = {
+            'wall_time': round(time.perf_counter() - self._start_wall, 6),
+            'cpu_time': round(time.process_time() - self._start_cpu, 6),
+            'peak_memory_bytes': max((p['peak_memory_bytes'] or 0 for p in self.phases), default=0),
+        }
+        for counter in IO_COUNTERS:
+            totals[counter] = sum(p[counter] for p in self.phases)
+        return {
+            'script': self.script,
+            'started': self.started,
+            'argv': self.argv,
+            'totals': totals,
+            'phases': self.phases,
+            'results': self.results,
+        }
+
+    def print_summary(self):
+        print(f"\n{'Phase':28} {'Wall':>9} {'CPU':>9} {'Peak mem':>10} {'Read':>5} {'Written':>12}")
+        for p in self.phases:
+            peak = f"{p['peak_memory_bytes'] / 1024:.0f} KB" if p['peak_memory_bytes'] is not None else '-'
+            print(f"{p['phase']:28} {p['wall_time']:8.3f}s {p['cpu_time']:8.3f}s {peak:>10} "
+                  f"{p['files_read']:>5} {p['bytes_written']:>10} B")
+
+    def write(self, path=RUN_REPORT_FILE):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precomputed name-resolution indexes for the weapon data scripts.
+Weapon names, stat names and tier bonus headers are normalized once when the
+index is built, so every lookup in the per-item/per-level loops is a handful
+of dict probes instead of a linear scan. Names that fail to resolve are
+collected and can be reported in one batch at the end of a phase.
+"""
+
+_MISSING = object()
+
+
+def lower(name):
+    return name.lower()
+
+
+def lower_no_spaces(name):
+    return name.replace(' ', '').lower()
+
+
+def lower_no_spaces_or_hyphens(name):
+    return name.lower().replace(' ', '').replace('-', '')
+
+
+def lower_alnum(name):
+    return ''.join(c for c in name.lower() if c.isalnum())
+
+
+# Normalizer chains, tried in order after an exact match
+WEAPON_NORMALIZERS = (lower, lower_no_spaces_or_hyphens, lower_alnum)
+STAT_NORMALIZERS = (lower, lower_no_spaces)
+
+
+def parse_composite_value(value_str):
+    """Parse composite values like '7;2' or '40;8' into a list"""
+    if isinstance(value_str, str) and ';' in value_str:
+        try:
+            return [int(float(v.strip())) for v in value_str.split(';')]
+        except:
+            return []
+    elif isinstance(value_str, (int, float)):
+        return [int(value_str)]
+    return []
+
+
+class NameIndex:
+    """Resolve a name by exact match, then by each normalizer in turn
+
+    When several names share a normalized form the first one wins, matching
+    the first-match order of the linear scans this replaces.
+    """
+
+    def __init__(self, items, normalizers=(lower,), overrides=None):
+        self.overrides = dict(overrides or {})
+        self.exact = {}
+        self.normalized = [(normalize, {}) for normalize in normalizers]
+        for name, target in items:
+            self.exact.setdefault(name, target)
+            for normalize, table in self.normalized:
+                table.setdefault(normalize(name), target)
+        self._resolved = {}
+        self.unresolved = {}
+
+    def _resolve(self, name):
+        if name in self.overrides:
+            return self.overrides[name]
+        if name in self.exact:
+            return self.exact[name]
+        for normalize, table in self.normalized:
+            target = table.get(normalize(name), _MISSING)
+            if target is not _MISSING:
+                return target
+        return _MISSING
+
+    def get(self, name, default=None):
+        """Return the target for name, or default (and record the miss)"""
+        target = self._resolved.get(name, _MISSING)
+        if target is _MISSING:
+            target = self._resolve(name)
+            self._resolved[name] = target
+        if target is _MISSING:
+            self.unresolved[name] = self.unresolved.get(name, 0) + 1
+            return default
+        return target
+
+    def report_unresolved(self, label, limit=20):
+        """Print every name that failed to resolve, once, with its miss count"""
+        if not self.unresolved:
+            return
+        print(f"\n  Unresolved {label}: {len(self.unresolved)}")
+        for name, count in list(self.unresolved.items())[:limit]:
+            print(f"    {name} ({count} lookups)")
+        if len(self.unresolved) > limit:
+            print(f"    ... and {len(self.unresolved) - limit} more")
+
+
+class BonusIndex(NameIndex):
+    """NameIndex over one level's tier bonuses, including composite keys
+
+    Each component of a composite header such as "Mana;Mana Regen" is indexed
+    (with the loosest normalizer) to the matching part of its parsed value.
+    """
+
+    def __init__(self, bonuses, normalizers=STAT_NORMALIZERS):
+        super().__init__(bonuses.items(), normalizers)
+        self.component_normalizer = normalizers[-1]
+        self.components = {}
+        for key, value in bonuses.items():
+            if ';' not in key:
+                continue
+            values = parse_composite_value(value)
+            for i, part in enumerate(p.strip() for p in key.split(';')):
+                self.components.setdefault(self.component_normalizer(part), []).append((values, i))
+
+    def _resolve(self, name):
+        target = super()._resolve(name)
+        if target is not _MISSING:
+            return target
+        for values, i in self.components.get(self.component_normalizer(name), ()):
+            if i < len(values):
+                return values[i]
+        return _MISSING
+
+
+def build_bonus_indexes(tier_bonuses, normalizers=STAT_NORMALIZERS):
+    """Build a BonusIndex for every level of a tier bonuses dictionary"""
+    return {level: BonusIndex(bonuses, normalizers) for level, bonuses in tier_bonuses.items()}
+
+
+def report_unresolved_bonuses(label, bonus_indexes, limit=20):
+    """Merge the misses of several BonusIndexes into one report"""
+    merged = NameIndex(())
+    for index in bonus_indexes:
+        for name, count in index.unresolved.items():
+            merged.unresolved[name] = merged.unresolved.get(name, 0) + count
+    merged.report_unresolved(label, limit)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dependency-aware phase scheduler for the weapon data scripts.
+A pass is a list of Tasks, each declaring the task results it needs
+(requires) and the files it reads and writes. The graph orders tasks by
+those declarations: a task waits for the tasks whose results it needs, and
+for earlier tasks that write a file it reads or writes, or read a file it
+writes. Independent tasks run concurrently on a thread pool.
+
+Each task has a fingerprint: a hash of its input files, the fingerprints of
+the tasks it waits for and the pipeline source files. Fingerprints are saved
+after a run (computed on the files as written), and a task whose fingerprint
+is unchanged is skipped on the next run, unless a task that does run needs
+its result. Nothing here is specific to the weapon files, so passes over
+Skill/Perk/Spawn files can be declared the same way.
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+STATE_FILE = 'pipeline_state.json'
+
+
+class Task:
+    """One pipeline phase
+
+    func(values, stats) receives {name: result} for the tasks in requires and
+    the I/O stats dict of its run report phase, and returns the task result.
+    """
+
+    def __init__(self, name, func, requires=(), reads=(), writes=()):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+        self.reads = tuple(os.path.normpath(p) for p in reads)
+        self.writes = tuple(os.path.normpath(p) for p in writes)
+
+    def __repr__(self):
+        return f"Task({self.name!r})"
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents, or 'missing'"""
+    if not os.path.exists(path):
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _TaskOutput:
+    """Stands in for sys.stdout and keeps each worker thread's output in its own buffer"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers = {}
+
+    def write(self, text):
+        return self.buffers.get(threading.get_ident(), self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class PhaseGraph:
+    """Tasks plus the dependency edges derived from their declarations"""
+
+    def __init__(self, tasks, state_path=STATE_FILE, sources=(), salt=''):
+        self.tasks = {task.name: task for task in tasks}
+        self.order = [task.name for task in tasks]
+        self.state_path = state_path
+        self.sources = tuple(sources)
+        self.salt = salt
+        self.dependencies = {}
+        for i, task in enumerate(tasks):
+            missing = [name for name in task.requires if name not in self.tasks]
+            if missing:
+                raise ValueError(f"Task {task.name} requires unknown tasks {missing}")
+            deps = set(task.requires)
+            for earlier in tasks[:i]:
+                if (set(earlier.writes) & set(task.reads + task.writes)) or (set(earlier.reads) & set(task.writes)):
+                    deps.add(earlier.name)
+            if any(self.order.index(name) > i for name in deps):
+                raise ValueError(f"Task {task.name} requires a task declared after it")
+            self.dependencies[task.name] = deps
+
+    def fingerprints(self):
+        """{task: fingerprint} for the files as they are now"""
+        digests = {}
+        version = hashlib.sha256(self.salt.encode())
+        for path in self.sources:
+            version.update(file_digest(path).encode())
+        result = {}
+        for name in self.order:
+            task = self.tasks[name]
+            h = hashlib.sha256(version.digest() + name.encode())
+            for path in task.reads:
+                if path not in digests:
+                    digests[path] = file_digest(path)
+                h.update(f"{path}={digests[path]}".encode())
+            for dep in sorted(self.dependencies[name]):
+                h.update(f"{dep}:{result[dep]}".encode())
+            result[name] = h.hexdigest()
+        return result
+
+    def load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self, state):
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def plan(self, force=False):
+        """Return the set of task names to run"""
+        state = self.load_state()
+        current = self.fingerprints()
+        run = {name for name in self.order if force or state.get(name) != current[name]}
+        # A task that runs needs the results of the tasks it requires, changed or not
+        for name in reversed(self.order):
+            if name in run:
+                run.update(self.tasks[name].requires)
+        return run
+
+    def run(self, force=False, workers=1, report=None, session=None):
+        """Run the planned tasks; return ({name: result}, {name: status})
+
+        status is 'ran', 'skipped', 'failed' or 'blocked' (a dependency
+        failed). With workers > 1, concurrent tasks buffer their output and
+        print it when they finish. Their run report phases overlap: CPU time,
+        peak memory and session I/O are process-wide, so each phase's numbers
+        include the work of the phases running next to it.
+        """
+        planned = self.plan(force)
+        results = {}
+        statuses = {}
+
+        def execute(name):
+            task = self.tasks[name]
+            values = {dep: results[dep] for dep in task.requires}
+            if report is None:
+                return task.func(values, {})
+            with report.phase(name, session) as stats:
+                return task.func(values, stats)
+
+        def record(name, call):
+            try:
+                results[name] = call()
+                statuses[name] = 'ran'
+            except Exception as e:
+                statuses[name] = 'failed'
+                print(f"\n⚠ Phase {name} failed: {type(e).__name__}: {e}")
+
+        def start(name):
+            """Settle a ready task without running it; return True when it has to run"""
+            if any(statuses[dep] in ('failed', 'blocked') for dep in self.dependencies[name]):
+                statuses[name] = 'blocked'
+            elif name not in planned:
+                statuses[name] = 'skipped'
+            else:
+                return True
+            return False
+
+        if workers <= 1:
+            for name in self.order:
+                if start(name):
+                    record(name, lambda: execute(name))
+        else:
+            output = _TaskOutput(sys.stdout)
+            buffers = {}
+
+            def buffered(name):
+                output.buffers[threading.get_ident()] = buffers[name] = io.StringIO()
+                try:
+                    return execute(name)
+                finally:
+                    del output.buffers[threading.get_ident()]
+
+            remaining = list(self.order)
+            sys.stdout = output
+            try:
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    running = {}
+                    while remaining or running:
+                        for name in [n for n in remaining if all(d in statuses for d in self.dependencies[n])]:
+                            remaining.remove(name)
+                            if start(name):
+                                running[pool.submit(buffered, name)] = name
+                        if not running:
+                            continue
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            name = running.pop(future)
+                            output.stream.write(buffers.pop(name).getvalue())
+                            record(name, future.result)
+            finally:
+                sys.stdout = output.stream
+
+        # Remember what the files look like now, for every task that is up to date
+        state = self.load_state()
+        current = self.fingerprints()
+        for name in self.order:
+            if statuses[name] in ('ran', 'skipped'):
+                state[name] = current[name]
+            else:
+                state.pop(name, None)
+        self.save_state(state)
+        return results, statuses
+
+    def describe(self):
+        """One line per task: name, dependencies, files read and written"""
+        lines = []
+        for name in self.order:
+            task = self.tasks[name]
+            deps = ', '.join(sorted(self.dependencies[name])) or '-'
+            lines.append(f"{name:20} after: {deps}; reads {len(task.reads)} / writes {len(task.writes)} files")
+        return lines
@@ -2,6 +2,9 @@ import json
 import xml.etree.ElementTree as ET
 from pathlib import Path
 
+from name_index import (NameIndex, BonusIndex, WEAPON_NORMALIZERS, lower,
+                        build_bonus_indexes, parse_composite_value, report_unresolved_bonuses)
+
 # Load the mapping data
 with open('weapon_stat_bonuses.json', 'r') as f:
     mapping_data = json.load(f)
@@ -31,83 +34,28 @@ WEAPON_NAME_MAPPING = {
     'WarShield': 'War Shield',
 }
 
-# Build a case-insensitive mapping from Excel weapon names
-excel_weapons_lower = {k.lower(): k for k in weapon_variants_mapping.keys()}
+# Name-resolution indexes, built once per run
+weapon_name_index = NameIndex(
+    ((name, name) for name in weapon_variants_mapping),
+    WEAPON_NORMALIZERS,
+    overrides=WEAPON_NAME_MAPPING,
+)
+stat_name_index = NameIndex(stat_name_mapping.items(), (lower,))
+tier1_bonus_indexes = build_bonus_indexes(tier1_bonuses, (lower,))
+tier2_bonus_indexes = build_bonus_indexes(tier2_bonuses, (lower,))
+empty_bonus_index = BonusIndex({}, (lower,))
 
 def find_excel_weapon_name(xml_base):
     """Find the Excel weapon name for a given XML weapon base (case-insensitive)"""
-    # Check manual mapping first
-    if xml_base in WEAPON_NAME_MAPPING:
-        return WEAPON_NAME_MAPPING[xml_base]
-    
-    # Normalize the XML base name for comparison
-    normalized = xml_base.lower()
-    
-    # Try direct lookup
-    if normalized in excel_weapons_lower:
-        return excel_weapons_lower[normalized]
-    
-    # Try removing hyphens and spaces from Excel names for comparison
-    for excel_name, excel_name_lower in excel_weapons_lower.items():
-        if excel_name_lower.replace(' ', '').replace('-', '') == normalized.replace(' ', '').replace('-', ''):
-            return excel_name
-    
-    # Try checking if any excel weapon name contains the normalized string
-    for excel_name, excel_name_lower in excel_weapons_lower.items():
-        # Remove all non-alphanumeric for fuzzy matching
-        excel_clean = ''.join(c for c in excel_name_lower if c.isalnum())
-        xml_clean = ''.join(c for c in normalized if c.isalnum())
-        if excel_clean == xml_clean:
-            return excel_name
-    
-    return None
+    return weapon_name_index.get(xml_base)
 
-def parse_composite_value(value_str):
-    """Parse composite values like '7;2' or '40;8' into a list"""
-    if isinstance(value_str, str) and ';' in value_str:
-        try:
-            return [int(float(v.strip())) for v in value_str.split(';')]
-        except:
-            return []
-    elif isinstance(value_str, (int, float)):
-        return [int(value_str)]
-    return []
-
-def find_stat_value_in_bonuses(stat_name, bonuses_dict):
-    """Find a stat value in bonuses dict, handling both simple and composite keys"""
-    # First, try exact match
-    if stat_name in bonuses_dict:
-        return bonuses_dict[stat_name]
-    
-    # Try case-insensitive match
-    for key, value in bonuses_dict.items():
-        if key.lower() == stat_name.lower():
-            return value
-    
-    # Try to find in composite keys (e.g., "Mana;Mana Regen")
-    for key, value in bonuses_dict.items():
-        if ';' in key:
-            parts = [p.strip() for p in key.split(';')]
-            for i, part in enumerate(parts):
-                if part.lower() == stat_name.lower():
-                    # Return the corresponding part of the value
-                    values = parse_composite_value(value)
-                    if i < len(values):
-                        return values[i]
-    
-    return None
+def find_stat_value_in_bonuses(stat_name, bonus_index):
+    """Find a stat value in a level's bonuses, handling both simple and composite keys"""
+    return bonus_index.get(stat_name)
 
 def map_excel_stat_to_xml(excel_stat_name):
     """Map a single Excel stat name to XML stat name (case-insensitive)"""
-    if excel_stat_name in stat_name_mapping:
-        return stat_name_mapping[excel_stat_name]
-    
-    # Try case-insensitive match
-    for key, val in stat_name_mapping.items():
-        if key.lower() == excel_stat_name.lower():
-            return val
-    
-    return None
+    return stat_name_index.get(excel_stat_name)
 
 def create_base_stat_bonuses(weapon_id, variant_id, level_id, excel_weapon_name):
     """Create BaseStatBonuses element for a weapon variant"""
@@ -141,9 +89,9 @@ def create_base_stat_bonuses(weapon_id, variant_id, level_id, excel_weapon_name)
     
     # Determine which tier to use
     if variant_id in [2, 3]:
-        bonuses_dict = tier1_bonuses.get(level_id, {})
+        bonus_index = tier1_bonus_indexes.get(level_id, empty_bonus_index)
     elif variant_id in [4, 5]:
-        bonuses_dict = tier2_bonuses.get(level_id, {})
+        bonus_index = tier2_bonus_indexes.get(level_id, empty_bonus_index)
     else:
         return None
     
@@ -159,7 +107,7 @@ def create_base_stat_bonuses(weapon_id, variant_id, level_id, excel_weapon_name)
             continue
         
         # Find the value in bonuses dict
-        value = find_stat_value_in_bonuses(excel_stat_name, bonuses_dict)
+        value = find_stat_value_in_bonuses(excel_stat_name, bonus_index)
         if value is None:
             continue
         
@@ -291,6 +239,12 @@ for file_path, display_name in files_to_process:
     total_updates += update_count
     print(f"\n[+] Updated {update_count} BaseStatBonuses in {file_path}")
 
+# Names that never resolved, reported once
+weapon_name_index.report_unresolved("weapon bases (no Excel match)")
+stat_name_index.report_unresolved("Excel stat names (no XML stat)")
+report_unresolved_bonuses("stat names (no tier bonus value)",
+                          [*tier1_bonus_indexes.values(), *tier2_bonus_indexes.values(), empty_bonus_index])
+
 # Save changes log
 with open('stat_bonus_changes.json', 'w') as f:
     json.dump(all_changes, f, indent=2)
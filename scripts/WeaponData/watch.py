@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Watch mode for the weapon data pipeline.
+Polls the pipeline inputs and, when one changes, reruns only the phases that
+consume it against a warm in-memory state (extraction context and parsed
+documents are kept between runs):
+  tls_weapon_docs.xlsx        -> phases 1-6 on every file
+  a weapon ItemDefinitions_*  -> phases 4-5 on that file
+  ItemDefinitions_Usables     -> phase 6 only
+Modified files are then saved by phase 7. A file counts as changed when its
+SHA-256 changes; the hash is only recomputed when its mtime or size moved,
+and the pipeline's own writes are not reported back as changes.
+
+Usage (from the script directory):
+  python watch.py [--interval 1.0] [--patch]
+"""
+
+import hashlib
+import os
+import sys
+import time
+
+from change_journal import ChangeJournal
+from document_session import DocumentSession
+from extract_from_excel import (MODDED_DIR, USABLES_FILE, WEAPON_FILES, WORKBOOK_PATH, build_context,
+                                run_damage_phase, run_excel_phases, run_reformat_phase, run_scroll_phase,
+                                run_stat_bonus_phase)
+
+WEAPON_PATHS = [os.path.join(MODDED_DIR, name) for name in WEAPON_FILES]
+USABLES_PATH = os.path.join(MODDED_DIR, USABLES_FILE)
+
+
+def file_signature(path, previous=None):
+    """(mtime_ns, size, sha256) of a file, reusing previous's hash when mtime and size match"""
+    stat = os.stat(path)
+    if previous and previous[:2] == (stat.st_mtime_ns, stat.st_size):
+        return previous
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return stat.st_mtime_ns, stat.st_size, digest.hexdigest()
+
+
+class PipelineWatcher:
+    """Warm pipeline state plus the last seen signature of every input"""
+
+    def __init__(self, patch=False):
+        self.inputs = [WORKBOOK_PATH] + WEAPON_PATHS + [USABLES_PATH]
+        self.session = DocumentSession(patch=patch, journal=ChangeJournal(script='watch.py'))
+        self.ctx = None
+        self.signatures = {}
+
+    def poll(self):
+        """Return the inputs whose contents changed since the last poll"""
+        changed = []
+        for path in self.inputs:
+            previous = self.signatures.get(path)
+            try:
+                signature = file_signature(path, previous)
+            except OSError:
+                continue  # Missing or being replaced; picked up on a later poll
+            if previous is None or signature[2] != previous[2]:
+                changed.append(path)
+            self.signatures[path] = signature
+        return changed
+
+    def plan(self, changed):
+        """Return (rerun extraction, weapon files for phases 4-5, run phase 6)"""
+        if WORKBOOK_PATH in changed or self.ctx is None:
+            return True, list(WEAPON_PATHS), True
+        weapon_paths = [path for path in WEAPON_PATHS if path in changed]
+        return False, weapon_paths, USABLES_PATH in changed
+
+    def run(self, changed):
+        """Rerun the phases affected by the changed inputs"""
+        extract, weapon_paths, scroll = self.plan(changed)
+        for path in changed:
+            if path != WORKBOOK_PATH:
+                self.session.discard(path)  # Edited outside the pipeline: parse again
+
+        if extract:
+            self.ctx = build_context(run_excel_phases(WORKBOOK_PATH))
+        if weapon_paths:
+            run_damage_phase(self.ctx, self.session, weapon_paths)
+            run_stat_bonus_phase(self.ctx, self.session, weapon_paths)
+        if scroll:
+            run_scroll_phase(self.ctx, self.session, USABLES_PATH)
+        written = weapon_paths + ([USABLES_PATH] if scroll else [])
+        run_reformat_phase(self.session, written)
+
+        # The pipeline's own writes are not changes to react to
+        for path in written:
+            self.signatures[path] = file_signature(path, self.signatures.get(path))
+        return extract, weapon_paths, scroll
+
+
+def describe(extract, weapon_paths, scroll):
+    phases = []
+    if extract:
+        phases.append('1-3')
+    if weapon_paths:
+        phases.append(f"4-5 ({', '.join(os.path.basename(p) for p in weapon_paths)})")
+    if scroll:
+        phases.append('6')
+    return ', '.join(phases + ['7'])
+
+
+def main(argv):
+    interval = 1.0
+    patch = '--patch' in argv
+
+    args = iter(argv)
+    for arg in args:
+        if arg == '--interval':
+            interval = float(next(args))
+
+    watcher = PipelineWatcher(patch=patch)
+    print("=" * 80)
+    print(f"WATCHING {len(watcher.inputs)} inputs every {interval:g}s (Ctrl+C to stop)")
+    print("=" * 80)
+
+    try:
+        while True:
+            changed = watcher.poll()
+            if not changed:
+                time.sleep(interval)
+                continue
+            # Let multi-step saves settle before rerunning
+            while True:
+                time.sleep(interval)
+                more = watcher.poll()
+                if not more:
+                    break
+                changed += [path for path in more if path not in changed]
+
+            start = time.perf_counter()
+            try:
+                plan = watcher.run(changed)
+            except Exception as e:
+                print(f"\n⚠ Run failed: {e!r}; waiting for the next change")
+                continue
+            print("\n" + "=" * 80)
+            print(f"✓ Changed: {', '.join(os.path.basename(p) for p in changed)}")
+            print(f"✓ Phases {describe(*plan)} in {time.perf_counter() - start:.2f}s")
+            print("=" * 80)
+    except KeyboardInterrupt:
+        print("\nStopped")
+    return 0
+
+
+if __name__ == '__main__':
+    # Fix encoding for Windows
+    if sys.stdout.encoding != 'utf-8':
+        sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming, window-bounded reader for tls_weapon_docs.xlsx.
+The workbook is opened in openpyxl read-only mode and each sheet is streamed
+once with iter_rows, bounded to the row/column windows declared for it, so the
+full cell model is never built. Only the declared cells are kept in memory.
+"""
+
+import openpyxl
+
+# A window is (min_row, max_row, min_col, max_col), all 1-based and inclusive
+
+
+def _bounding_window(windows):
+    return (min(w[0] for w in windows), max(w[1] for w in windows),
+            min(w[2] for w in windows), max(w[3] for w in windows))
+
+
+def read_sheet_windows(ws, windows):
+    """Stream the rows covered by windows once; return {(row, col): value}"""
+    min_row, max_row, min_col, max_col = _bounding_window(windows)
+    cells = {}
+    rows = ws.iter_rows(min_row=min_row, max_row=max_row,
+                        min_col=min_col, max_col=max_col, values_only=True)
+    for row_idx, row in enumerate(rows, start=min_row):
+        for w_min_row, w_max_row, w_min_col, w_max_col in windows:
+            if not w_min_row <= row_idx <= w_max_row:
+                continue
+            for col_idx in range(w_min_col, w_max_col + 1):
+                offset = col_idx - min_col
+                value = row[offset] if offset < len(row) else None
+                if value is not None:
+                    cells[(row_idx, col_idx)] = value
+    return cells
+
+
+def read_workbook_windows(workbook_path, sheet_windows, all_sheet_windows=()):
+    """Read the declared windows of every sheet in a workbook
+
+    sheet_windows maps a sheet name to its windows; all_sheet_windows are
+    added to every sheet. Returns {sheet_name: {(row, col): value}} in
+    workbook sheet order. Sheets with no windows are never streamed.
+    """
+    wb = openpyxl.load_workbook(workbook_path, read_only=True, data_only=True)
+    try:
+        sheets = {}
+        for sheet_name in wb.sheetnames:
+            windows = list(all_sheet_windows) + list(sheet_windows.get(sheet_name, ()))
+            if not windows:
+                continue
+            sheets[sheet_name] = read_sheet_windows(wb[sheet_name], windows)
+        return sheets
+    finally:
+        wb.close()